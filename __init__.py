@@ -40,7 +40,7 @@ if "bpy" in locals():
     importlib.reload(importer)
     importlib.reload(geom)
     importlib.reload(bones)
-    importlib.reload(rigify_mapping_data)
+    importlib.reload(utils.lazy_import("rigify_mapping_data"))
     importlib.reload(rigging)
     importlib.reload(sculpting)
     importlib.reload(hair)
@@ -71,7 +71,6 @@ from . import exporter
 from . import importer
 from . import geom
 from . import bones
-from . import rigify_mapping_data
 from . import rigging
 from . import sculpting
 from . import hair
@@ -166,19 +165,36 @@ classes = (
 
 def register():
 
-    addon_updater_ops.register(bl_info)
+    # headless (background) sessions never check for or install updates
+    if not bpy.app.background:
+        addon_updater_ops.register(bl_info)
+
+    # validates (and compiles) the shader matrix expressions, this only takes about a millisecond
+    shaders.compile_shader_matrix()
 
     for cls in classes:
         bpy.utils.register_class(cls)
 
     bpy.types.Scene.CC3ImportProps = bpy.props.PointerProperty(type=properties.CC3ImportProps)
 
+    bpy.app.handlers.load_post.append(properties.clear_cache_index_handler)
+    bpy.app.handlers.undo_post.append(properties.undo_redo_handler)
+    bpy.app.handlers.redo_post.append(properties.undo_redo_handler)
+
 
 def unregister():
 
-    addon_updater_ops.unregister()
+    if not bpy.app.background:
+        addon_updater_ops.unregister()
 
     for cls in classes:
         bpy.utils.unregister_class(cls)
 
     del(bpy.types.Scene.CC3ImportProps)
+
+    bpy.app.handlers.load_post.remove(properties.clear_cache_index_handler)
+    bpy.app.handlers.undo_post.remove(properties.undo_redo_handler)
+    bpy.app.handlers.redo_post.remove(properties.undo_redo_handler)
+    properties.clear_cache_index()
+    properties.clear_property_updates()
+    utils.reset_log_sinks()
@@ -28,12 +28,8 @@ __version__ = "1.0.9"
 import errno
 import traceback
 import platform
-import ssl
-import urllib.request
-import urllib
 import os
 import json
-import zipfile
 import shutil
 import threading
 import fnmatch
@@ -644,6 +640,10 @@ class Singleton_updater(object):
 	# all API calls to base url
 	def get_raw(self, url):
 		# print("Raw request:", url)
+		# network modules are imported on first use, to keep add-on registration fast
+		import ssl
+		import urllib.request
+		import urllib.error
 		request = urllib.request.Request(url)
 		try:
 			context = ssl._create_unverified_context()
@@ -719,6 +719,8 @@ class Singleton_updater(object):
 
 	# create a working directory and download the new files
 	def stage_repository(self, url):
+		import ssl
+		import urllib.request
 
 		local = os.path.join(self._updater_path,"update_staging")
 		error = None
@@ -843,6 +845,7 @@ class Singleton_updater(object):
 
 	def unpack_staged_zip(self,clean=False):
 		"""Unzip the downloaded file, and validate contents"""
+		import zipfile
 		if os.path.isfile(self._source_zip) == False:
 			if self._verbose: print("Error, update zip not found")
 			self._error = "Install failed"
@@ -16,7 +16,7 @@
 
 import bpy
 import os
-from mathutils import Vector
+import numpy
 from . import nodeutils, utils, params
 
 old_samples = 64
@@ -148,12 +148,13 @@ def get_bake_image(mat, channel_id, width, height, shader_node, socket_name, bak
             i += 1
             old_name = image_name
             image_name = base_name + "_" + str(i)
-            utils.log_info(f"Image: {old_name} in use, trying: {image_name}")
+            utils.log_info("Image: %s in use, trying: %s", old_name, image_name)
             image = get_image_target(image_name, width, height, bake_dir, is_data, alpha)
 
     return image, image_name
 
 
+@utils.profiled("bake_node_socket_input")
 def bake_node_socket_input(node, socket_name, mat, channel_id, bake_dir, name_prefix = "",
                            override_size = 0, size_override_node = None, size_override_socket = None):
     # determine the size of the image to bake onto
@@ -179,6 +180,7 @@ def bake_node_socket_input(node, socket_name, mat, channel_id, bake_dir, name_pr
     return image
 
 
+@utils.profiled("bake_node_socket_output")
 def bake_node_socket_output(node, socket_name, mat, channel_id, bake_dir, name_prefix = "",
                             override_size = 0, size_override_node = None, size_override_socket = None):
     # determine the size of the image to bake onto
@@ -201,6 +203,7 @@ def bake_node_socket_output(node, socket_name, mat, channel_id, bake_dir, name_p
     return image
 
 
+@utils.profiled("bake_rl_bump_and_normal")
 def bake_rl_bump_and_normal(shader_node, bsdf_node, normal_socket_name, bump_socket_name,
                             normal_strength_socket_name, bump_distance_socket_name,
                             mat, channel_id, bake_dir, name_prefix = "", override_size = 0):
@@ -252,6 +255,7 @@ def bake_rl_bump_and_normal(shader_node, bsdf_node, normal_socket_name, bump_soc
     return image
 
 
+@utils.profiled("bake_bsdf_normal")
 def bake_bsdf_normal(bsdf_node, mat, channel_id, bake_dir, name_prefix = "", override_size = 0):
     # determine the size of the image to bake onto
     width, height = get_texture_size(bsdf_node, override_size, "Normal")
@@ -279,6 +283,7 @@ def bake_bsdf_normal(bsdf_node, mat, channel_id, bake_dir, name_prefix = "", ove
     return image
 
 
+@utils.profiled("bake_value_image")
 def bake_value_image(value, mat, channel_id, bake_dir, name_prefix = "", size = 64):
     width = height = size
     image, image_name = get_bake_image(mat, channel_id, width, height, None, "", bake_dir, name_prefix = name_prefix)
@@ -299,18 +304,19 @@ def bake_value_image(value, mat, channel_id, bake_dir, name_prefix = "", size =
     return image
 
 
+@utils.profiled("bake_output")
 def bake_output(mat, source_node, source_socket, image : bpy.types.Image, image_name):
     nodes = mat.node_tree.nodes
     links = mat.node_tree.links
 
-    output_node = nodeutils.find_node_by_type(nodes, "OUTPUT_MATERIAL")
+    output_node = nodeutils.get_output_node(nodes)
     output_source, output_source_socket = nodeutils.get_node_and_socket_connected_to_input(output_node, "Surface")
 
     image_node = nodeutils.make_image_node(nodes, image, "bake")
     image_node.name = image_name
 
     bpy.context.scene.cycles.samples = BAKE_SAMPLES
-    utils.log_info("Baking: " + image_name)
+    utils.log_info("Baking: %s", image_name)
 
     bake = prep_bake(mat)
 
@@ -333,17 +339,18 @@ def bake_output(mat, source_node, source_socket, image : bpy.types.Image, image_
     return image_node
 
 
+@utils.profiled("bake_normal_output")
 def bake_normal_output(mat, bsdf_node, image, image_name):
     nodes = mat.node_tree.nodes
     links = mat.node_tree.links
 
-    output_node = nodeutils.find_node_by_type(nodes, "OUTPUT_MATERIAL")
+    output_node = nodeutils.get_output_node(nodes)
 
     image_node = nodeutils.make_image_node(nodes, image, "bake")
     image_node.name = image_name
 
     bpy.context.scene.cycles.samples = BAKE_SAMPLES
-    utils.log_info("Baking normal: " + image_name)
+    utils.log_info("Baking normal: %s", image_name)
 
     bake = prep_bake(mat)
 
@@ -466,20 +473,20 @@ def get_image_target(image_name, width, height, dir, data = True, alpha = False,
                     same_path = False
 
                 if img.file_format == format and img.depth == depth and same_path:
-                    utils.log_info("Reusing image: " + image_name)
+                    utils.log_info("Reusing image: %s", image_name)
                     try:
                         if img.size[0] != width or img.size[1] != height:
                             img.scale(width, height)
                         return img
                     except:
-                        utils.log_info("Bad image: " + img.name)
+                        utils.log_info("Bad image: %s", img.name)
                         bpy.data.images.remove(img)
                 else:
-                    utils.log_info("Wrong path or format: " + img.name + ", " + img_path + "==" + dir + "?, " + img.file_format + "==" + format + "?, depth: " + str(depth) + "==" + str(img.depth) + "?")
+                    utils.log_info("Wrong path or format: %s, %s==%s?, %s==%s?, depth: %s==%s?", img.name, img_path, dir, img.file_format, format, depth, img.depth)
                     bpy.data.images.remove(img)
 
     # or just make a new one:
-    utils.log_info("Creating new image: " + image_name + " size: " + str(width))
+    utils.log_info("Creating new image: %s size: %s", image_name, width)
     img = make_new_image(image_name, width, height, format, ext, dir, data, alpha)
     return img
 
@@ -490,10 +497,11 @@ def make_new_image(name, width, height, format, ext, dir, data, has_alpha):
     img.file_format = format
     full_dir = os.path.normpath(dir)
     full_path = os.path.normpath(os.path.join(full_dir, name + ext))
-    utils.log_info(f"   Path: {full_path}")
+    utils.log_info("   Path: %s", full_path)
     os.makedirs(full_dir, exist_ok=True)
     img.filepath_raw = full_path
     img.save()
+    utils.index_image_path(img)
     return img
 
 
@@ -502,6 +510,7 @@ def get_bake_dir(chr_cache):
     return bake_path
 
 
+@utils.profiled("combine_normal")
 def combine_normal(chr_cache, mat_cache):
 
     init_bake(5001)
@@ -558,6 +567,7 @@ def combine_normal(chr_cache, mat_cache):
         utils.set_active_object(active)
 
 
+@utils.profiled("bake_flow_to_normal")
 def bake_flow_to_normal(chr_cache, mat_cache):
 
     init_bake(4001)
@@ -595,14 +605,14 @@ def bake_flow_to_normal(chr_cache, mat_cache):
 
                 try:
 
-                    utils.log_info("Found existing normal image: " + normal_image.name + ": " + normal_image.filepath)
+                    utils.log_info("Found existing normal image: %s: %s", normal_image.name, normal_image.filepath)
                     if normal_image.size[0] != width or normal_image.size[1] != height:
-                        utils.log_info("Resizing normal image: " + str(width) + " x " + str(height))
+                        utils.log_info("Resizing normal image: %s x %s", width, height)
                         normal_image.scale(width, height)
 
                 except:
 
-                    utils.log_info("Removing bad normal image: " + normal_image.name)
+                    utils.log_info("Removing bad normal image: %s", normal_image.name)
                     bpy.data.images.remove(normal_image)
 
         # if no existing normal image, create one and link it to the shader
@@ -625,43 +635,45 @@ def bake_flow_to_normal(chr_cache, mat_cache):
             utils.set_active_object(active)
 
 
+@utils.profiled("convert_flow_to_normal")
 def convert_flow_to_normal(flow_image: bpy.types.Image, normal_image: bpy.types.Image, tangent, flip_y):
 
-    # fetching a copy of the normal pixels as a list gives us the fastest write speed:
-    normal_pixels = list(normal_image.pixels)
-    # fetching the flow pixels as a tuple with slice notation gives the fastest read speed:
-    flow_pixels = flow_image.pixels[:]
+    width = flow_image.size[0]
+    height = flow_image.size[1]
 
-    #tangent_vector = Vector(tangent)
+    # fetch the flow pixels straight into a float32 buffer:
+    flow_pixels = numpy.empty(width * height * 4, dtype=numpy.float32)
+    flow_image.pixels.foreach_get(flow_pixels)
+    flow_pixels = flow_pixels.reshape(-1, 4)
 
     if flip_y:
         flip = -1
     else:
         flip = 1
 
-    l = len(flow_pixels)
-    for i in range(0, l, 4):
-
-        # rgb -> flow_vector
-        flow_vector = Vector((flow_pixels[i + 0] * 2 - 1,
-                             (flow_pixels[i + 1] * 2 - 1) * flip,
-                              flow_pixels[i + 2] * 2 - 1))
-        tangent_vector = Vector((-flow_vector.y, flow_vector.x, 0))
-
-        # calculate normal vector
-        normal_vector = flow_vector.cross(tangent_vector)
-        normal_vector.x *= 0.35
-        normal_vector.y *= 0.35
-        normal_vector.normalize()
-
-        # normal_vector -> rgb
-        normal_pixels[i + 0] = (normal_vector[0] + 1) / 2
-        normal_pixels[i + 1] = (normal_vector[1] + 1) / 2
-        normal_pixels[i + 2] = (normal_vector[2] + 1) / 2
-        normal_pixels[i + 3] = 1
-
-    # replace-in-place all the pixels from the list:
-    normal_image.pixels[:] = normal_pixels
+    # rgb -> flow_vector
+    fx = flow_pixels[:, 0] * 2 - 1
+    fy = (flow_pixels[:, 1] * 2 - 1) * flip
+    fz = flow_pixels[:, 2] * 2 - 1
+
+    # normal_vector = flow_vector x tangent_vector, where tangent_vector = (-fy, fx, 0)
+    normal_pixels = numpy.empty((width * height, 4), dtype=numpy.float32)
+    nx = -fz * fx * 0.35
+    ny = -fz * fy * 0.35
+    nz = fx * fx + fy * fy
+
+    # normalize, leaving zero length vectors as zero (as Vector.normalize() does)
+    length = numpy.sqrt(nx * nx + ny * ny + nz * nz)
+    length[length == 0] = 1
+
+    # normal_vector -> rgb
+    normal_pixels[:, 0] = (nx / length + 1) / 2
+    normal_pixels[:, 1] = (ny / length + 1) / 2
+    normal_pixels[:, 2] = (nz / length + 1) / 2
+    normal_pixels[:, 3] = 1
+
+    # replace-in-place all the pixels from the buffer:
+    normal_image.pixels.foreach_set(normal_pixels.ravel())
     normal_image.update()
     normal_image.save()
 
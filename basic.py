@@ -32,7 +32,7 @@ def reset_shader(nodes, links, shader_label, shader_name):
         if n.type == "BSDF_PRINCIPLED":
 
             if not bsdf_node:
-                utils.log_info("Keeping old BSDF: " + n.name)
+                utils.log_info("Keeping old BSDF: %s", n.name)
                 bsdf_node = n
             else:
                 nodes.remove(n)
@@ -52,7 +52,7 @@ def reset_shader(nodes, links, shader_label, shader_name):
         bsdf_node.name = utils.unique_name(bsdf_id)
         bsdf_node.label = shader_label
         bsdf_node.width = 240
-        utils.log_info("Creating new BSDF: " + bsdf_node.name)
+        utils.log_info("Creating new BSDF: %s", bsdf_node.name)
 
     if not output_node:
         output_node = nodes.new("ShaderNodeOutputMaterial")
@@ -0,0 +1,661 @@
+# Copyright (C) 2021 Victor Soupday
+# This file is part of CC/iC Blender Tools <https://github.com/soupday/cc_blender_tools>
+#
+# CC/iC Blender Tools is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# CC/iC Blender Tools is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with CC/iC Blender Tools.  If not, see <https://www.gnu.org/licenses/>.
+
+"""Microbenchmarks of the pure logic hot paths, run under plain CPython through the bpy shim:
+
+       python benchmarks/microbenchmarks.py [--filter hair] [--json results.json] [--check]
+       python benchmarks/microbenchmarks.py --only hair_cards_to_loops --cards 50000
+       python benchmarks/microbenchmarks.py --only flow_to_normal --sizes 1024 2048 4096
+
+   Each bench_*(benchmark) case calls benchmark(func, *args) once, in the style of the
+   pytest-benchmark fixture, so the cases can also be collected by pytest-benchmark with:
+
+       pytest benchmarks/microbenchmarks.py -o python_files=microbenchmarks.py -o python_functions=bench_*
+
+   The reference_* cases time the per element implementations (benchmarks/reference.py) that the
+   vectorized code replaced, on smaller inputs, and --check verifies both give the same results.
+   The shim's mathutils.Vector is pure python, so the reference_* timings run slower than they
+   would against Blender's C mathutils. The numpy paths are unaffected.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+import types
+import numpy
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import shim
+
+shim.install()
+
+from mathutils import Matrix, Vector
+
+params = shim.import_addon_module("params")
+jsonutils = shim.import_addon_module("jsonutils")
+shaders = shim.import_addon_module("shaders")
+hair = shim.import_addon_module("hair")
+geom = shim.import_addon_module("geom")
+bake = shim.import_addon_module("bake")
+meshutils = shim.import_addon_module("meshutils")
+properties = shim.import_addon_module("properties")
+rigify_mapping_data = shim.import_addon_module("rigify_mapping_data")
+
+import reference
+
+
+# configuration, set from the command line by main()
+CONFIG = {
+    "cards": 5000,
+    "reference_cards": 1000,
+    "segments": 8,
+    "sizes": [256, 1024],
+    "reference_sizes": [256],
+    "grid": 32,
+    "min_time": 0.2,
+    "max_rounds": 100,
+}
+
+# a downward hair card dir in uv space, as used by the hair tools (roots at the top of the uv tile)
+CARD_DIR = Vector((0, -1, 0))
+
+
+class Benchmark():
+    """A minimal stand-in for the pytest-benchmark fixture: times repeated calls of func."""
+
+    def __init__(self, name, min_time, max_rounds):
+        self.name = name
+        self.min_time = min_time
+        self.max_rounds = max_rounds
+        self.times = []
+        self.result = None
+
+    def __call__(self, func, *args, **kwargs):
+        start = time.perf_counter()
+        self.result = func(*args, **kwargs)
+        self.times.append(time.perf_counter() - start)
+        total = self.times[0]
+        while total < self.min_time and len(self.times) < self.max_rounds:
+            start = time.perf_counter()
+            func(*args, **kwargs)
+            duration = time.perf_counter() - start
+            self.times.append(duration)
+            total += duration
+        return self.result
+
+    def stats(self):
+        return {
+            "name": self.name,
+            "rounds": len(self.times),
+            "min": min(self.times),
+            "median": statistics.median(self.times),
+            "mean": statistics.mean(self.times),
+        }
+
+
+# synthetic data
+#
+
+def card_geometry(num_cards, segments):
+    """Vertex coords, quad faces, per face loop uvs and edges of num_cards hanging hair cards.
+       Each card is a 2 x (segments + 1) vertex strip with its own uv island, roots at v = 1.
+    """
+    rows = segments + 1
+    verts_per_card = 2 * rows
+    edges_per_card = rows + 2 * segments
+    rng = numpy.random.default_rng(0)
+
+    c = numpy.arange(num_cards)
+    r = numpy.arange(rows)
+    k = numpy.arange(2)
+    # co[card, row, side]
+    root = numpy.stack([(c % 250) * 0.004, (c // 250) * 0.004, rng.uniform(1.6, 1.7, num_cards)], axis = 1)
+    sway = rng.uniform(-0.02, 0.02, (num_cards, 2))
+    co = numpy.empty((num_cards, rows, 2, 3), dtype = numpy.float64)
+    t = r / segments
+    co[..., 0] = root[:, None, None, 0] + k[None, None, :] * 0.003 + sway[:, None, None, 0] * t[None, :, None] ** 2
+    co[..., 1] = root[:, None, None, 1] + sway[:, None, None, 1] * t[None, :, None] ** 2
+    co[..., 2] = root[:, None, None, 2] - 0.2 * t[None, :, None]
+    uv = numpy.empty((num_cards, rows, 2, 2), dtype = numpy.float64)
+    uv[..., 0] = ((c % 8) * 0.125)[:, None, None] + k[None, None, :] * 0.1
+    uv[..., 1] = (1 - t)[None, :, None]
+
+    def vert(card, row, side):
+        return card * verts_per_card + row * 2 + side
+
+    # quads: (r, 0) -> (r, 1) -> (r + 1, 1) -> (r + 1, 0)
+    cc, rr = numpy.meshgrid(c, numpy.arange(segments), indexing = "ij")
+    cc = cc.reshape(-1)
+    rr = rr.reshape(-1)
+    faces = numpy.stack([vert(cc, rr, 0), vert(cc, rr, 1), vert(cc, rr + 1, 1), vert(cc, rr + 1, 0)], axis = 1)
+
+    # edges: rungs (r, 0)-(r, 1) then the rails (r, side)-(r + 1, side) of each side
+    rung = numpy.arange(rows)
+    rail = numpy.arange(segments)
+    card_edges = numpy.concatenate([
+        numpy.stack([rung * 2, rung * 2 + 1], axis = 1),
+        numpy.stack([rail * 2, rail * 2 + 2], axis = 1),
+        numpy.stack([rail * 2 + 1, rail * 2 + 3], axis = 1),
+    ])
+    edges = (card_edges[None, :, :] + (c * verts_per_card)[:, None, None]).reshape(-1, 2)
+    edge_base = cc * edges_per_card
+    face_edges = numpy.stack([edge_base + rr,
+                              edge_base + rows + segments + rr,
+                              edge_base + rr + 1,
+                              edge_base + rows + rr], axis = 1)
+
+    return co.reshape(-1, 3), faces, uv.reshape(-1, 2)[faces], edges, face_edges
+
+
+def make_card_data(num_cards, segments):
+    """The card_data arrays hair.get_card_mesh_data() would gather from a synthetic card mesh."""
+    co, faces, face_uvs, edges, face_edges = card_geometry(num_cards, segments)
+    num_faces = len(faces)
+    return {
+        "face_select": numpy.ones(num_faces, dtype = bool),
+        "loop_starts": numpy.arange(num_faces, dtype = numpy.int64) * 4,
+        "loop_totals": numpy.full(num_faces, 4, dtype = numpy.int64),
+        "loop_faces": numpy.repeat(numpy.arange(num_faces), 4),
+        "loop_verts": faces.reshape(-1).astype(numpy.int64),
+        "loop_edges": face_edges.reshape(-1).astype(numpy.int64),
+        "loop_uvs": face_uvs.reshape(-1, 2).astype(numpy.float32),
+        "edge_verts": edges.astype(numpy.int64),
+        "world_co": co,
+    }
+
+
+def make_card_bmesh(num_cards, segments):
+    """The same synthetic card mesh as a (shim) bmesh, for the reference implementation."""
+    co, faces, face_uvs, edges, face_edges = card_geometry(num_cards, segments)
+    # match the float32 uv precision of the mesh uv layer
+    face_uvs = face_uvs.astype(numpy.float32).astype(numpy.float64)
+    bm = shim.make_bmesh(co.tolist(), faces.tolist(), face_uvs.tolist())
+    for face in bm.faces:
+        face.select = True
+    return bm
+
+
+def make_flow_image(size):
+    flow_image = shim.Image("flow", size, size)
+    rng = numpy.random.default_rng(size)
+    flow_pixels = rng.random((size * size, 4), dtype = numpy.float32)
+    flow_pixels[:, 3] = 1
+    flow_image.pixels.foreach_set(flow_pixels.ravel())
+    return flow_image
+
+
+def make_uv_grid(grid):
+    """A triangulated grid bmesh spanning the uv tile, with uvs equal to the xy coords."""
+    coords = [ (x / grid, y / grid, 0.0) for y in range(grid + 1) for x in range(grid + 1) ]
+    faces = []
+    face_uvs = []
+    for y in range(grid):
+        for x in range(grid):
+            a = y * (grid + 1) + x
+            for tri in [(a, a + 1, a + grid + 2), (a, a + grid + 2, a + grid + 1)]:
+                faces.append(tri)
+                face_uvs.append([ coords[v][:2] for v in tri ])
+    return shim.make_bmesh(coords, faces, face_uvs)
+
+
+def make_eye_object(grid):
+    """A mesh object with a left and a right eye material, each a quad grid with a random uv per vertex
+       (shared by all the loops of the vertex), so the vertex weights are all distinct."""
+    rng = numpy.random.default_rng(0)
+    num_grid_verts = (grid + 1) * (grid + 1)
+    vert_uvs = rng.random((2 * num_grid_verts, 2)).tolist()
+    faces = []
+    material_indices = []
+    for side in range(2):
+        offset = side * num_grid_verts
+        for y in range(grid):
+            for x in range(grid):
+                a = offset + y * (grid + 1) + x
+                faces.append((a, a + 1, a + grid + 2, a + grid + 1))
+                material_indices.append(side)
+    face_uvs = [ [ vert_uvs[v] for v in face ] for face in faces ]
+    materials = [ shim.Material("Std_Eye_L"), shim.Material("Std_Eye_R") ]
+    obj = shim.make_mesh_object("CC_Base_Eye", 2 * num_grid_verts, faces, face_uvs, materials, material_indices)
+    return obj, materials, numpy.array(vert_uvs, dtype = numpy.float32)
+
+
+def make_character_json(num_objects, num_materials):
+    chr_json = { "Meshes": {} }
+    for o in range(num_objects):
+        materials_json = {}
+        for m in range(num_materials):
+            materials_json[f"Std_Material_{o}_{m}"] = { "Material Type": "Pbr", "Textures": {} }
+        chr_json["Meshes"][f"CC_Base_Object_{o}"] = { "Materials": materials_json }
+    return chr_json
+
+
+# hair pipeline (the per island part of hair.selected_cards_to_loops, without the edit mode selection)
+#
+
+def cards_to_loops(card_data, card_dir, one_loop_per_card = True):
+    all_loops = []
+    for island in hair.get_selected_islands(card_data):
+        island_loops = hair.get_island_loops(card_data, island)
+        island_verts, uv_map = hair.get_island_uv_map(card_data, island_loops)
+        edges = hair.get_aligned_edges(card_data, island_loops, island_verts, card_dir, uv_map)
+        loops = hair.get_ordered_vertex_loops(card_data, island_verts, edges, card_dir, uv_map)
+        if one_loop_per_card:
+            loop = hair.merge_loops(loops)
+            if loop is not None:
+                all_loops.append(loop)
+        else:
+            all_loops.extend(loops)
+    return all_loops
+
+
+def resample_loops(loops, segments):
+    facs = numpy.linspace(0.0, 1.0, segments + 1)
+    return [ hair.sample_loop(loop, hair.get_loop_arc_lengths(loop), facs) for loop in loops ]
+
+
+def reference_resample_loops(loops, segments):
+    return [ reference.loop_to_bone_points(loop, reference.loop_length(loop), segments) for loop in loops ]
+
+
+def flow_to_normal(flow_image, normal_image):
+    bake.convert_flow_to_normal(flow_image, normal_image, None, False)
+    return normal_image.pixels.data
+
+
+# cases
+#
+
+def get_sizes(benchmark, sizes):
+    # a pytest-benchmark fixture can only time one call per case, so only the largest size is timed there
+    if isinstance(benchmark, SizedBenchmark):
+        return sizes
+    return sizes[-1:]
+
+
+def time_sized(benchmark, size, func, *args):
+    if isinstance(benchmark, SizedBenchmark):
+        return benchmark.sized(size, func, *args)
+    return benchmark(func, *args)
+
+
+def bench_params_texture_lookups(benchmark):
+    json_ids = [ tex_info[1] for tex_info in params.TEXTURE_TYPES ]
+    tex_types = [ tex_info[0] for tex_info in params.TEXTURE_TYPES ]
+
+    def lookups():
+        for json_id in json_ids:
+            params.get_texture_type(json_id)
+        for tex_type in tex_types:
+            params.get_texture_json_id(tex_type)
+            params.get_texture_suffix_list(tex_type)
+
+    benchmark(lookups)
+
+
+def bench_params_shader_defs(benchmark):
+    shader_names = [ shader[2] for shader in params.SHADER_LOOKUP ]
+
+    def lookups():
+        for shader_name in shader_names:
+            shader_def = params.get_shader_def(shader_name)
+            if shader_def:
+                for tex_info in params.TEXTURE_TYPES:
+                    params.get_shader_texture_socket(shader_def, tex_info[0])
+
+    benchmark(lookups)
+
+
+def bench_params_prop_update_plans(benchmark):
+    prop_names = list(params.PROP_MATRIX.keys())
+
+    def plans():
+        params.PROP_UPDATE_PLANS.clear()
+        for shader_def in params.SHADER_MATRIX:
+            for prop_name in prop_names:
+                params.get_prop_update_plan(shader_def, prop_name)
+
+    benchmark(plans)
+
+
+def bench_shaders_compile_matrix(benchmark):
+
+    def compile_matrix():
+        shaders.SHADER_MATRIX_COMPILED = False
+        shaders.COMPILED_FUNCS.clear()
+        shaders.COMPILED_CODE.clear()
+        return shaders.compile_shader_matrix()
+
+    assert benchmark(compile_matrix)
+
+
+def bench_jsonutils_material_lookups(benchmark):
+    chr_json = make_character_json(20, 10)
+    # blender duplicate suffixes, as on imported objects and materials
+    objects = [ types.SimpleNamespace(name = name + ".001") for name in chr_json["Meshes"].keys() ]
+
+    def lookups():
+        found = 0
+        for obj in objects:
+            obj_json = jsonutils.get_object_json(chr_json, obj)
+            for mat_name in obj_json["Materials"].keys():
+                if jsonutils.get_material_json(obj_json, types.SimpleNamespace(name = mat_name + ".002")):
+                    found += 1
+        return found
+
+    assert benchmark(lookups) == 200
+
+
+def bench_rigify_mapping_tables(benchmark):
+    generations = ["G3", "G3Plus", "ActorCore", "GameBase", "NonStandardG3"]
+
+    def mappings():
+        bone_map = {}
+        for generation in generations:
+            rigify_data = rigify_mapping_data.get_mapping_for_generation(generation)
+            for mapping in rigify_data.bone_mapping:
+                bone_map.setdefault(mapping[1].lstrip("-"), []).append(mapping[0])
+        return bone_map
+
+    benchmark(mappings)
+
+
+def bench_geom_uv_lookups(benchmark):
+    grid = CONFIG["grid"]
+    bm = make_uv_grid(grid)
+    obj = types.SimpleNamespace(name = "Grid", matrix_world = Matrix.Identity(4))
+    rng = numpy.random.default_rng(1)
+    uvs = [ Vector((u, v, 0)) for u, v in rng.random((16, 2)) ]
+
+    def lookups():
+        return [ geom.mesh_world_point_from_uv(obj, bm, 0, uv) for uv in uvs ]
+
+    points = benchmark(lookups)
+    for uv, co in zip(uvs, points):
+        assert abs(co.x - uv.x) < 1e-6 and abs(co.y - uv.y) < 1e-6
+
+
+def bench_hair_islands(benchmark):
+    card_data = make_card_data(CONFIG["cards"], CONFIG["segments"])
+    islands = benchmark(hair.get_selected_islands, card_data)
+    assert len(islands) == CONFIG["cards"]
+
+
+def bench_hair_cards_to_loops(benchmark):
+    card_data = make_card_data(CONFIG["cards"], CONFIG["segments"])
+    loops = benchmark(cards_to_loops, card_data, CARD_DIR)
+    assert len(loops) == CONFIG["cards"]
+
+
+def bench_hair_resample_loops(benchmark):
+    loops = cards_to_loops(make_card_data(CONFIG["cards"], CONFIG["segments"]), CARD_DIR)
+    benchmark(resample_loops, loops, CONFIG["segments"] * 2)
+
+
+def bench_flow_to_normal(benchmark):
+    for size in get_sizes(benchmark, CONFIG["sizes"]):
+        flow_image = make_flow_image(size)
+        normal_image = shim.Image("normal", size, size)
+        time_sized(benchmark, size, flow_to_normal, flow_image, normal_image)
+
+
+def bench_reference_hair_islands(benchmark):
+    bm = make_card_bmesh(CONFIG["reference_cards"], CONFIG["segments"])
+    islands = benchmark(reference.get_selected_islands, bm, 0)
+    assert len(islands) == CONFIG["reference_cards"]
+
+
+def bench_reference_hair_cards_to_loops(benchmark):
+    bm = make_card_bmesh(CONFIG["reference_cards"], CONFIG["segments"])
+    threshold = shim.PREFERENCES.hair_curve_dir_threshold
+    loops = benchmark(reference.selected_cards_to_loops, bm, CARD_DIR, threshold)
+    assert len(loops) == CONFIG["reference_cards"]
+
+
+def bench_reference_hair_resample_loops(benchmark):
+    bm = make_card_bmesh(CONFIG["reference_cards"], CONFIG["segments"])
+    loops = reference.selected_cards_to_loops(bm, CARD_DIR, shim.PREFERENCES.hair_curve_dir_threshold)
+    benchmark(reference_resample_loops, loops, CONFIG["segments"] * 2)
+
+
+def bench_reference_flow_to_normal(benchmark):
+    for size in get_sizes(benchmark, CONFIG["reference_sizes"]):
+        flow_pixels = make_flow_image(size).pixels.data.tolist()
+        time_sized(benchmark, size, reference.convert_flow_to_normal_pixels, flow_pixels, False)
+
+
+# checks, the vectorized paths against the reference implementations (run with --check)
+#
+
+def loop_key(points):
+    return tuple(numpy.round(numpy.asarray(points[0], dtype = numpy.float64), 6))
+
+
+def check_hair_cards():
+    num_cards = 200
+    segments = 6
+    card_data = make_card_data(num_cards, segments)
+    bm = make_card_bmesh(num_cards, segments)
+    threshold = shim.PREFERENCES.hair_curve_dir_threshold
+
+    islands = hair.get_selected_islands(card_data)
+    reference_islands = reference.get_selected_islands(bm, 0)
+    assert sorted(sorted(island.tolist()) for island in islands) == sorted(sorted(island) for island in reference_islands)
+
+    for one_loop_per_card in [True, False]:
+        loops = cards_to_loops(card_data, CARD_DIR, one_loop_per_card)
+        reference_loops = reference.selected_cards_to_loops(bm, CARD_DIR, threshold, one_loop_per_card)
+        assert len(loops) == len(reference_loops)
+        loops = sorted(loops, key = loop_key)
+        reference_loops = sorted(reference_loops, key = loop_key)
+        for loop, reference_loop in zip(loops, reference_loops):
+            assert numpy.allclose(loop, numpy.array([ tuple(co) for co in reference_loop ]), atol = 1e-9)
+
+    loops = cards_to_loops(card_data, CARD_DIR)
+    reference_loops = reference.selected_cards_to_loops(bm, CARD_DIR, threshold)
+    loops = sorted(loops, key = loop_key)
+    reference_loops = sorted(reference_loops, key = loop_key)
+    bone_segments = segments * 2 + 1
+    for points, reference_points in zip(resample_loops(loops, bone_segments),
+                                        reference_resample_loops(reference_loops, bone_segments)):
+        heads = numpy.array([ tuple(head) for head, tail in reference_points ])
+        tails = numpy.array([ tuple(tail) for head, tail in reference_points ])
+        assert numpy.allclose(points[:-1], heads, atol = 1e-6)
+        assert numpy.allclose(points[1:], tails, atol = 1e-6)
+
+
+def check_flow_to_normal():
+    size = 64
+    flow_image = make_flow_image(size)
+    for flip_y in [False, True]:
+        normal_image = shim.Image("normal", size, size)
+        bake.convert_flow_to_normal(flow_image, normal_image, None, flip_y)
+        reference_pixels = reference.convert_flow_to_normal_pixels(flow_image.pixels.data.tolist(), flip_y)
+        assert numpy.allclose(normal_image.pixels.data, numpy.array(reference_pixels, dtype = numpy.float32), atol = 1e-6)
+
+
+def assert_vertex_group_weights(vertex_group, indices, weights, levels = 1024):
+    assert vertex_group.add_calls <= levels + 1
+    stored = numpy.array([ vertex_group.weights[i] for i in indices.tolist() ])
+    assert numpy.allclose(stored, numpy.clip(weights, 0.0, 1.0), atol = 0.5 / levels + 1e-6)
+
+
+def check_eye_occlusion_vertex_groups():
+    grid = 40
+    obj, (mat_left, mat_right), vert_uvs = make_eye_object(grid)
+    meshutils.generate_eye_occlusion_vertex_groups(obj, mat_left, mat_right)
+    meshutils.generate_tearline_vertex_groups(obj, mat_left, mat_right)
+    num_grid_verts = (grid + 1) * (grid + 1)
+    for side, suffix in enumerate(["_L", "_R"]):
+        indices = numpy.arange(side * num_grid_verts, (side + 1) * num_grid_verts)
+        uvs = vert_uvs[indices]
+        x = numpy.clip(numpy.abs(uvs[:, 0] - 0.5) / 0.1, 0.0, 1.0)
+        expected = [ (meshutils.vars.OCCLUSION_GROUP_INNER, uvs[:, 0]),
+                     (meshutils.vars.OCCLUSION_GROUP_OUTER, 1.0 - uvs[:, 0]),
+                     (meshutils.vars.OCCLUSION_GROUP_TOP, uvs[:, 1]),
+                     (meshutils.vars.OCCLUSION_GROUP_BOTTOM, 1.0 - uvs[:, 1]),
+                     (meshutils.vars.TEARLINE_GROUP_INNER, 1.0 - x * x * (3 - 2 * x)) ]
+        for group_name, weights in expected:
+            assert_vertex_group_weights(obj.vertex_groups[group_name + suffix], indices, weights)
+
+
+def check_eye_vertex_groups():
+    grid = 40
+    obj, (mat_left, mat_right), vert_uvs = make_eye_object(grid)
+    shim.PREFERENCES.eye_displacement_group = "CC_Eye_Displacement"
+    parameters = types.SimpleNamespace(eye_iris_scale = 1.0, eye_iris_radius = 0.15, eye_iris_depth_radius = 2.5)
+    mat_cache = types.SimpleNamespace(parameters = parameters)
+    radius = 1.0 * 0.15 * 2.5
+    num_grid_verts = (grid + 1) * (grid + 1)
+    uv_data = obj.data.uv_layers[0].data
+    # the second pass edits the uvs, which must not reuse the cached radial distances of the first
+    for uv_offset in [0.0, 0.25]:
+        uvs = numpy.mod(vert_uvs + uv_offset, 1.0)
+        uv_data.attributes["uv"] = uvs[numpy.asarray(obj.data.loops.attributes["vertex_index"])]
+        meshutils.generate_eye_vertex_groups(obj, mat_left, mat_right, mat_cache, mat_cache)
+        for side, suffix in enumerate(["_L", "_R"]):
+            indices = numpy.arange(side * num_grid_verts, (side + 1) * num_grid_verts)
+            radial = numpy.sqrt(numpy.sum((uvs[indices] - 0.5) ** 2, axis = 1))
+            vertex_group = obj.vertex_groups[shim.PREFERENCES.eye_displacement_group + suffix]
+            assert_vertex_group_weights(vertex_group, indices, 1.0 - radial / radius)
+            vertex_group.add_calls = 0
+
+
+def check_material_vertex_cache():
+    obj, materials, vert_uvs = make_eye_object(8)
+    polygons = obj.data.polygons
+    for reassign in [False, True]:
+        if reassign:
+            # move half the left eye's faces to the right eye's slot, keeping the counts and slots the same
+            material_indices = numpy.array(polygons.attributes["material_index"])
+            material_indices[:32] = 1
+            polygons.attributes["material_index"] = material_indices
+        for mat in materials:
+            cached = meshutils.get_material_vertex_index_array(obj, mat, use_cache = True)
+            assert numpy.array_equal(cached, meshutils.get_material_vertex_index_array(obj, mat))
+
+
+def check_property_updates_undo():
+    bpy = shim.install()
+    chr_cache = types.SimpleNamespace(name = "Character", parameters = types.SimpleNamespace(skin_ao = 1.0))
+    bpy.context.scene.CC3ImportProps = types.SimpleNamespace(import_cache = [ chr_cache ])
+    nodes = {}
+
+    def apply_update(chr_cache, context_obj, context_mat, prop_name, update_mode):
+        nodes[prop_name] = getattr(chr_cache.parameters, prop_name)
+
+    try:
+        properties.clear_cache_index_handler()
+        # the deferred flush writes the nodes after the undo step (with the new parameter value) is pushed
+        chr_cache.parameters.skin_ao = 0.5
+        properties.queue_property_update(apply_update, chr_cache, None, None, "skin_ao", "UPDATE_SELECTED")
+        properties.property_update_timer()
+        assert nodes["skin_ao"] == 0.5
+        # undo restores the parameters from the previous step, without touching the nodes
+        chr_cache.parameters.skin_ao = 1.0
+        properties.undo_redo_handler()
+        assert nodes["skin_ao"] == 1.0
+        # redo restores the new parameter value, with the old node values
+        chr_cache.parameters.skin_ao = 0.5
+        properties.undo_redo_handler()
+        assert nodes["skin_ao"] == 0.5
+        # loading a file forgets the flushed updates
+        properties.clear_cache_index_handler()
+        chr_cache.parameters.skin_ao = 1.0
+        properties.undo_redo_handler()
+        assert nodes["skin_ao"] == 0.5
+    finally:
+        properties.clear_cache_index_handler()
+        del bpy.context.scene.CC3ImportProps
+
+
+# runner
+#
+
+class SizedBenchmark(Benchmark):
+    """Benchmark that can also time a case at several input sizes, reported as name[size]."""
+
+    def __init__(self, name, min_time, max_rounds):
+        super().__init__(name, min_time, max_rounds)
+        self.sized_results = []
+
+    def sized(self, size, func, *args, **kwargs):
+        benchmark = Benchmark(f"{self.name}[{size}]", self.min_time, self.max_rounds)
+        benchmark(func, *args, **kwargs)
+        self.sized_results.append(benchmark.stats())
+        return benchmark.result
+
+    def all_stats(self):
+        if self.sized_results:
+            return self.sized_results
+        return [ self.stats() ]
+
+
+def get_functions(prefix, filters, only):
+    functions = []
+    for name, func in list(globals().items()):
+        if name.startswith(prefix) and callable(func):
+            case_name = name[len(prefix):]
+            if only and case_name not in only:
+                continue
+            if filters and not any(f in case_name for f in filters):
+                continue
+            functions.append((case_name, func))
+    return functions
+
+
+def main(argv = None):
+    parser = argparse.ArgumentParser(description = "CC/iC Blender Tools pure logic microbenchmarks (no Blender required).")
+    parser.add_argument("--filter", nargs = "*", default = [], help = "run the cases whose name contains any of these")
+    parser.add_argument("--only", nargs = "*", default = [], help = "run exactly these cases")
+    parser.add_argument("--json", help = "write the results to this json file")
+    parser.add_argument("--check", action = "store_true", help = "verify the vectorized paths against the reference implementations first")
+    for key, value in CONFIG.items():
+        if isinstance(value, list):
+            parser.add_argument("--" + key.replace("_", "-"), type = int, nargs = "*", default = value)
+        else:
+            parser.add_argument("--" + key.replace("_", "-"), type = type(value), default = value)
+    args = parser.parse_args(argv)
+
+    for key in CONFIG.keys():
+        CONFIG[key] = getattr(args, key)
+
+    if args.check:
+        for check_name, check in get_functions("check_", [], []):
+            check()
+            print(f"check passed: {check_name}")
+
+    results = []
+    for case_name, func in get_functions("bench_", args.filter, args.only):
+        benchmark = SizedBenchmark(case_name, args.min_time, args.max_rounds)
+        func(benchmark)
+        for stats in benchmark.all_stats():
+            results.append(stats)
+            print(f"{stats['name']:<40} min {stats['min'] * 1000:11.3f} ms   median {stats['median'] * 1000:11.3f} ms   rounds {stats['rounds']}")
+
+    if args.json:
+        with open(args.json, "w") as write_file:
+            json.dump({ "python": sys.version, "numpy": numpy.__version__, "config": CONFIG, "results": results },
+                      write_file, indent = 4)
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,272 @@
+# Copyright (C) 2021 Victor Soupday
+# This file is part of CC/iC Blender Tools <https://github.com/soupday/cc_blender_tools>
+#
+# CC/iC Blender Tools is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# CC/iC Blender Tools is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with CC/iC Blender Tools.  If not, see <https://www.gnu.org/licenses/>.
+
+"""The per-element python implementations that the vectorized code paths replaced,
+   kept (logic unchanged) for before/after timings and to check the vectorized results against.
+"""
+
+from mathutils import Vector
+
+
+# bake.convert_flow_to_normal (per pixel loop)
+#
+
+def convert_flow_to_normal_pixels(flow_pixels, flip_y):
+    normal_pixels = [0.0] * len(flow_pixels)
+
+    if flip_y:
+        flip = -1
+    else:
+        flip = 1
+
+    l = len(flow_pixels)
+    for i in range(0, l, 4):
+
+        # rgb -> flow_vector
+        flow_vector = Vector((flow_pixels[i + 0] * 2 - 1,
+                             (flow_pixels[i + 1] * 2 - 1) * flip,
+                              flow_pixels[i + 2] * 2 - 1))
+        tangent_vector = Vector((-flow_vector.y, flow_vector.x, 0))
+
+        # calculate normal vector
+        normal_vector = flow_vector.cross(tangent_vector)
+        normal_vector.x *= 0.35
+        normal_vector.y *= 0.35
+        normal_vector.normalize()
+
+        # normal_vector -> rgb
+        normal_pixels[i + 0] = (normal_vector[0] + 1) / 2
+        normal_pixels[i + 1] = (normal_vector[1] + 1) / 2
+        normal_pixels[i + 2] = (normal_vector[2] + 1) / 2
+        normal_pixels[i + 3] = 1
+
+    return normal_pixels
+
+
+# hair island and loop parsing (bmesh based)
+#
+
+def parse_island_non_recursive(bm, face_indices, faces_left, island, face_map, vert_map):
+    levels = 0
+    while face_indices:
+        levels += 1
+        next_indices = set()
+        for face_index in face_indices:
+            faces_left.remove(face_index)
+            island.append(face_index)
+        for face_index in face_indices:
+            for uv_id in face_map[face_index]:
+                connected_faces = vert_map[uv_id]
+                if connected_faces:
+                    for cf_index in connected_faces:
+                        if cf_index not in island:
+                            next_indices.add(cf_index)
+        face_indices = next_indices
+
+
+def get_island_uv_map(bm, ul, island):
+    uv_map = {}
+    for face_index in island:
+        face = bm.faces[face_index]
+        for loop in face.loops:
+            uv_map[loop.vert.index] = loop[ul].uv
+    return uv_map
+
+
+def get_selected_islands(bm, ul):
+    face_map = {}
+    vert_map = {}
+    uv_map = {}
+
+    selected_faces = [f for f in bm.faces if f.select]
+
+    for face in selected_faces:
+        for loop in face.loops:
+            uv_id = loop[ul].uv.to_tuple(5), loop.vert.index
+            uv_map[loop.vert.index] = loop[ul].uv
+            if face.index not in face_map:
+                face_map[face.index] = set()
+            if uv_id not in vert_map:
+                vert_map[uv_id] = set()
+            face_map[face.index].add(uv_id)
+            vert_map[uv_id].add(face.index)
+
+    islands = []
+    faces_left = set(face_map.keys())
+
+    while len(faces_left) > 0:
+        current_island = []
+        face_index = list(faces_left)[0]
+        face_indices = set()
+        face_indices.add(face_index)
+        parse_island_non_recursive(bm, face_indices, faces_left, current_island, face_map, vert_map)
+        islands.append(current_island)
+
+    return islands
+
+
+def get_aligned_edges(bm, island, dir, uv_map, threshold):
+    edges = set()
+
+    for i in island:
+        face = bm.faces[i]
+        for edge in face.edges:
+            edges.add(edge.index)
+
+    aligned = set()
+
+    for e in edges:
+        edge = bm.edges[e]
+        uv0 = uv_map[edge.verts[0].index]
+        uv1 = uv_map[edge.verts[1].index]
+        V = Vector(uv1) - Vector(uv0)
+        V.normalize()
+        dot = dir.dot(V)
+        if abs(dot) >= threshold:
+            aligned.add(e)
+
+    return aligned
+
+
+def get_aligned_edge_map(bm, edges):
+    edge_map = {}
+    for e in edges:
+        edge = bm.edges[e]
+        for vert in edge.verts:
+            for linked_edge in vert.link_edges:
+                if linked_edge != edge and linked_edge.index in edges:
+                    if e not in edge_map:
+                        edge_map[e] = set()
+                    edge_map[e].add(linked_edge.index)
+    return edge_map
+
+
+def parse_loop(bm, edge_index, edges_left, loop, edge_map):
+    if edge_index in edges_left:
+        edges_left.remove(edge_index)
+        edge = bm.edges[edge_index]
+        loop.add(edge.verts[0].index)
+        loop.add(edge.verts[1].index)
+        if edge.index in edge_map:
+            for ce in edge_map[edge.index]:
+                parse_loop(bm, ce, edges_left, loop, edge_map)
+
+
+def sort_verts_by_uv(bm, loop, uv_map, dir):
+    sorted = []
+    for vert in loop:
+        uv = uv_map[vert]
+        sorted.append([vert, uv])
+    if dir.x > 0:
+        sorted.sort(reverse=False, key=lambda pair: pair[1].x)
+    elif dir.x < 0:
+        sorted.sort(reverse=True, key=lambda pair: pair[1].x)
+    elif dir.y > 0:
+        sorted.sort(reverse=False, key=lambda pair: pair[1].y)
+    else:
+        sorted.sort(reverse=True, key=lambda pair: pair[1].y)
+    return [ bm.verts[v].co for v, uv in sorted ]
+
+
+def get_ordered_vertex_loops(bm, edges, dir, uv_map, edge_map):
+    edges_left = set(edges)
+    loops = []
+
+    while len(edges_left) > 0:
+        loop = set()
+        edge_index = list(edges_left)[0]
+        parse_loop(bm, edge_index, edges_left, loop, edge_map)
+        loops.append(sort_verts_by_uv(bm, loop, uv_map, dir))
+
+    return loops
+
+
+def selected_cards_to_loops(bm, card_dir, threshold, one_loop_per_card = True):
+    ul = 0
+    all_loops = []
+    for island in get_selected_islands(bm, ul):
+        uv_map = get_island_uv_map(bm, ul, island)
+        edges = get_aligned_edges(bm, island, card_dir, uv_map, threshold)
+        edge_map = get_aligned_edge_map(bm, edges)
+        loops = get_ordered_vertex_loops(bm, edges, card_dir, uv_map, edge_map)
+        if one_loop_per_card:
+            loop = merge_loops(loops)
+            if loop:
+                all_loops.append(loop)
+        else:
+            all_loops.extend(loops)
+    return all_loops
+
+
+# hair loop evaluation
+#
+
+def merge_loops(loops):
+    size = len(loops[0])
+
+    for loop in loops:
+        if len(loop) != size:
+            return None
+
+    num = len(loops)
+    loop = []
+
+    for i in range(0, size):
+        co = Vector((0,0,0))
+        for l in range(0, num):
+            co += loops[l][i]
+        co /= num
+        loop.append(co)
+
+    return loop
+
+
+def loop_length(loop):
+    p0 = loop[0]
+    d = 0
+    for i in range(1, len(loop)):
+        p1 = loop[i]
+        d += (p1 - p0).length
+        p0 = p1
+    return d
+
+
+def eval_loop_at(loop, length, fac):
+    p0 = loop[0]
+    f0 = 0
+    for i in range(1, len(loop)):
+        p1 = loop[i]
+        v = p1 - p0
+        fl = v.length / length
+        f1 = f0 + fl
+        if fac <= f1 and fac >= f0:
+            df = fac - f0
+            return p0 + v * (df / fl)
+        f0 = f1
+        p0 = p1
+        f1 += fl
+    return p0
+
+
+def loop_to_bone_points(loop, length, segments):
+    """The bone head and tail positions loop_to_bones() evaluated for each segment."""
+    points = []
+    fac = 0
+    df = 1.0 / segments
+    for s in range(0, segments):
+        points.append((eval_loop_at(loop, length, fac), eval_loop_at(loop, length, fac + df)))
+        fac += df
+    return points
@@ -0,0 +1,331 @@
+# Copyright (C) 2021 Victor Soupday
+# This file is part of CC/iC Blender Tools <https://github.com/soupday/cc_blender_tools>
+#
+# CC/iC Blender Tools is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# CC/iC Blender Tools is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with CC/iC Blender Tools.  If not, see <https://www.gnu.org/licenses/>.
+
+"""Headless benchmark of the add-on's main operations on a synthetic CC3+ character (benchmarks/synthetic.py):
+
+       blender -b --factory-startup --python benchmarks/run_benchmarks.py -- --output results.json
+       blender -b --factory-startup --python benchmarks/run_benchmarks.py -- --texture-size 4096 --trace trace.json
+       blender -b --factory-startup --python benchmarks/run_benchmarks.py -- --update-thresholds
+
+   Stages, each timed in order on the same character:
+       generate, import_build, update_all_properties, find_duplicate_material, attach_weight_maps,
+       flow_to_normal, rigify_meta_rig, export_standard, export_unity
+
+   The results json has the wall time of each stage, the add-on's profiler summary of the phases inside
+   them (utils.Profiler) and the run configuration. --trace also writes the Chrome trace of the phases.
+
+   Regression thresholds (benchmarks/thresholds.json, or --thresholds) are stage times in ms with a
+   tolerance: a stage slower than threshold * (1 + tolerance), or any failed stage, exits with 1.
+   Thresholds recorded with a different configuration are not compared and exit with 2.
+   --update-thresholds writes the thresholds from this run, so record them on the machine that runs
+   the comparisons.
+"""
+
+import argparse
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+import traceback
+
+import bpy
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import synthetic
+
+DEFAULT_THRESHOLDS = os.path.join(synthetic.BENCHMARK_DIR, "thresholds.json")
+
+STAGES = [
+    "generate",
+    "import_build",
+    "update_all_properties",
+    "find_duplicate_material",
+    "attach_weight_maps",
+    "flow_to_normal",
+    "rigify_meta_rig",
+    "export_standard",
+    "export_unity",
+]
+
+
+class SkipStage(Exception):
+    pass
+
+
+class BenchmarkRun():
+    """Runs the stages in order on one synthetic character, stopping at the first failed stage
+       the rest depend on (generate, import_build)."""
+
+    def __init__(self, work_dir, character_config, character_dir):
+        self.work_dir = work_dir
+        self.character_config = character_config
+        self.character_dir = character_dir
+        self.fbx_path = None
+        self.chr_cache = None
+        self.utils = synthetic.addon_module("utils")
+        self.stages = {}
+
+    def run(self):
+        required = ["generate", "import_build"]
+        for stage in STAGES:
+            result = self.run_stage(stage)
+            if result["status"] == "failed" and stage in required:
+                for remaining in STAGES[STAGES.index(stage) + 1:]:
+                    self.stages[remaining] = { "status": "skipped", "ms": 0.0, "reason": f"{stage} failed" }
+                break
+        return self.stages
+
+    def run_stage(self, stage):
+        func = getattr(self, "stage_" + stage)
+        result = { "status": "ok", "ms": 0.0 }
+        start = time.perf_counter()
+        try:
+            with self.utils.profile_phase("benchmark." + stage):
+                info = func()
+            result["ms"] = (time.perf_counter() - start) * 1000
+            if info:
+                result["info"] = info
+        except SkipStage as e:
+            result["status"] = "skipped"
+            result["reason"] = str(e)
+        except Exception as e:
+            result["status"] = "failed"
+            result["ms"] = (time.perf_counter() - start) * 1000
+            result["error"] = traceback.format_exc()
+        self.stages[stage] = result
+        print(f"{stage:<24} {result['status']:<8} {result['ms']:11.1f} ms   {result.get('info', result.get('reason', ''))}")
+        if result["status"] == "failed":
+            print(result["error"])
+        return result
+
+    def get_mesh_materials(self):
+        for obj in self.chr_cache.get_all_objects(include_armature = False):
+            if obj.type == "MESH":
+                for mat in obj.data.materials:
+                    if mat:
+                        yield obj, mat
+
+    def select_character(self):
+        # the operators work on the context character
+        scene = synthetic.addon_module("scene")
+        self.utils.set_mode("OBJECT")
+        scene.active_select_body(self.chr_cache)
+
+    def stage_generate(self):
+        if self.character_dir:
+            self.fbx_path = os.path.join(self.character_dir, self.character_config["name"] + ".fbx")
+            if not os.path.exists(self.fbx_path):
+                raise FileNotFoundError(self.fbx_path)
+            raise SkipStage(f"using {self.fbx_path}")
+        self.fbx_path = synthetic.generate_character(os.path.join(self.work_dir, "character"), self.character_config)
+
+    def stage_import_build(self):
+        props = bpy.context.scene.CC3ImportProps
+        bpy.ops.cc3.importer(filepath = self.fbx_path, param = "IMPORT_QUALITY")
+        if len(props.import_cache) == 0:
+            raise RuntimeError("No character was imported")
+        self.chr_cache = props.import_cache[-1]
+        return { "generation": self.chr_cache.generation,
+                 "objects": len(self.chr_cache.get_all_objects()),
+                 "materials": len(list(self.get_mesh_materials())),
+                 "images": len(bpy.data.images) }
+
+    def stage_update_all_properties(self):
+        properties = synthetic.addon_module("properties")
+        self.select_character()
+        properties.update_all_properties(bpy.context)
+
+    def stage_find_duplicate_material(self):
+        materials = synthetic.addon_module("materials")
+        processed_materials = {}
+        duplicates = 0
+        for obj, mat in self.get_mesh_materials():
+            if materials.find_duplicate_material(self.chr_cache, mat, processed_materials):
+                duplicates += 1
+        return { "duplicates": duplicates }
+
+    def stage_attach_weight_maps(self):
+        imageutils = synthetic.addon_module("imageutils")
+        physics = synthetic.addon_module("physics")
+        weight_maps = 0
+        weighted_objects = []
+        for obj, mat in self.get_mesh_materials():
+            weight_map = imageutils.find_material_image(mat, "WEIGHTMAP")
+            if weight_map:
+                physics.attach_material_weight_map(obj, mat, weight_map)
+                weight_maps += 1
+                if obj not in weighted_objects:
+                    weighted_objects.append(obj)
+        if weight_maps == 0:
+            raise RuntimeError("No weight maps found on the character")
+        # write the pin groups from the weight maps, as at the end of each weight map paint
+        for obj in weighted_objects:
+            physics.sample_pin_weights(obj, bake = False)
+        return { "weight_maps": weight_maps }
+
+    def stage_flow_to_normal(self):
+        imageutils = synthetic.addon_module("imageutils")
+        bake = synthetic.addon_module("bake")
+        converted = 0
+        for obj, mat in self.get_mesh_materials():
+            flow_image = imageutils.find_material_image(mat, "HAIRFLOW")
+            if flow_image:
+                width, height = flow_image.size
+                normal_image = bpy.data.images.new(mat.name + "_FlowNormal", width, height, is_data = True)
+                bake.convert_flow_to_normal(flow_image, normal_image, None, False)
+                bpy.data.images.remove(normal_image)
+                converted += 1
+        if converted == 0:
+            raise RuntimeError("No hair flow maps found on the character")
+        return { "flow_maps": converted }
+
+    def stage_rigify_meta_rig(self):
+        import addon_utils
+        if not addon_utils.enable("rigify", default_set = True, handle_error = None):
+            raise SkipStage("rigify add-on is not available")
+        if not self.chr_cache.can_be_rigged():
+            raise RuntimeError(f"Generation {self.chr_cache.generation} can not be rigged")
+        self.select_character()
+        bpy.ops.cc3.rigifier(param = "META_RIG")
+        meta_rig = self.chr_cache.rig_meta_rig
+        if not meta_rig:
+            raise RuntimeError("No meta-rig was generated")
+        # remove the meta-rig again so the exports are not affected
+        self.chr_cache.rig_meta_rig = None
+        bpy.data.objects.remove(meta_rig)
+
+    def stage_export_standard(self):
+        self.select_character()
+        export_path = os.path.join(self.work_dir, "export_standard", self.character_config["name"] + ".fbx")
+        os.makedirs(os.path.dirname(export_path), exist_ok = True)
+        bpy.ops.cc3.exporter(param = "EXPORT_CC3", filepath = export_path, include_selected = False)
+        if not os.path.exists(export_path):
+            raise RuntimeError("Nothing was exported")
+
+    def stage_export_unity(self):
+        prefs = bpy.context.preferences.addons[synthetic.ADDON_PACKAGE].preferences
+        prefs.export_unity_mode = "FBX"
+        self.select_character()
+        export_path = os.path.join(self.work_dir, "export_unity", self.character_config["name"] + ".fbx")
+        os.makedirs(os.path.dirname(export_path), exist_ok = True)
+        bpy.ops.cc3.exporter(param = "EXPORT_UNITY", filepath = export_path, include_selected = False, include_anim = False)
+        if not os.path.exists(export_path):
+            raise RuntimeError("Nothing was exported")
+
+
+def read_thresholds(path):
+    if not os.path.exists(path):
+        return None
+    with open(path, "r") as read_file:
+        return json.load(read_file)
+
+
+def write_thresholds(path, results, tolerance):
+    thresholds = { "tolerance": tolerance,
+                   "blender": results["blender"],
+                   "config": results["config"],
+                   "stages": {} }
+    for stage, result in results["stages"].items():
+        if result["status"] == "ok":
+            thresholds["stages"][stage] = round(result["ms"], 1)
+    with open(path, "w") as write_file:
+        json.dump(thresholds, write_file, indent = 4)
+    print(f"Thresholds written to: {path}")
+
+
+def compare_thresholds(results, thresholds):
+    """Returns the regressions: [stage, ms, threshold_ms] of the stages slower than their threshold (with tolerance)."""
+    tolerance = thresholds.get("tolerance", 0.0)
+    regressions = []
+    for stage, threshold_ms in thresholds["stages"].items():
+        result = results["stages"].get(stage)
+        if result and result["status"] == "ok" and result["ms"] > threshold_ms * (1.0 + tolerance):
+            regressions.append([stage, result["ms"], threshold_ms])
+    return regressions
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description = "CC/iC Blender Tools headless benchmarks (run inside blender -b).")
+    parser.add_argument("--output", default = "benchmark_results.json", help = "write the results to this json file")
+    parser.add_argument("--trace", help = "write the Chrome trace of the profiled phases to this json file")
+    parser.add_argument("--character", help = "use the character already generated in this folder")
+    parser.add_argument("--work-dir", help = "folder for the generated character and the exports (default: a temporary folder)")
+    parser.add_argument("--keep", action = "store_true", help = "keep the work folder")
+    parser.add_argument("--thresholds", default = DEFAULT_THRESHOLDS, help = "regression thresholds json")
+    parser.add_argument("--update-thresholds", action = "store_true", help = "write the thresholds from this run")
+    parser.add_argument("--tolerance", type = float, default = 0.25, help = "allowed slow down over the thresholds, when updating them")
+    for key, value in synthetic.CONFIG.items():
+        parser.add_argument("--" + key.replace("_", "-"), type = type(value), default = value)
+    args = parser.parse_args(argv)
+
+    character_config = { key: getattr(args, key) for key in synthetic.CONFIG.keys() }
+    work_dir = args.work_dir or tempfile.mkdtemp(prefix = "cc3_benchmark_")
+
+    synthetic.enable_addon()
+    utils = synthetic.addon_module("utils")
+
+    utils.start_profiling()
+    try:
+        stages = BenchmarkRun(work_dir, character_config, args.character).run()
+    finally:
+        profiler = utils.stop_profiling(args.trace)
+
+    results = { "blender": bpy.app.version_string,
+                "python": sys.version,
+                "platform": platform.platform(),
+                "config": character_config,
+                "stages": stages,
+                "phases": profiler.summary() if profiler else {} }
+
+    exit_code = 0
+    failed = [ stage for stage, result in stages.items() if result["status"] == "failed" ]
+    if failed:
+        print(f"Failed stages: {', '.join(failed)}")
+        exit_code = 1
+
+    if args.update_thresholds:
+        write_thresholds(args.thresholds, results, args.tolerance)
+    else:
+        thresholds = read_thresholds(args.thresholds)
+        if thresholds is None:
+            print(f"No thresholds to compare with: {args.thresholds} (record them with --update-thresholds)")
+        elif thresholds.get("config") != character_config:
+            print(f"Thresholds were recorded with a different configuration: {thresholds.get('config')}")
+            exit_code = exit_code or 2
+        else:
+            results["regressions"] = compare_thresholds(results, thresholds)
+            for stage, ms, threshold_ms in results["regressions"]:
+                print(f"Regression: {stage} took {ms:.1f} ms, threshold {threshold_ms:.1f} ms (+{thresholds.get('tolerance', 0.0):.0%})")
+            if results["regressions"]:
+                exit_code = 1
+
+    with open(args.output, "w") as write_file:
+        json.dump(results, write_file, indent = 4)
+    print(f"Results written to: {args.output}")
+
+    if not args.keep and not args.work_dir:
+        shutil.rmtree(work_dir, ignore_errors = True)
+
+    return exit_code
+
+
+if __name__ == "__main__":
+    argv = sys.argv[sys.argv.index("--") + 1:] if "--" in sys.argv else []
+    sys.exit(main(argv))
@@ -0,0 +1,675 @@
+# Copyright (C) 2021 Victor Soupday
+# This file is part of CC/iC Blender Tools <https://github.com/soupday/cc_blender_tools>
+#
+# CC/iC Blender Tools is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# CC/iC Blender Tools is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with CC/iC Blender Tools.  If not, see <https://www.gnu.org/licenses/>.
+
+"""Lightweight stand-ins for bpy, mathutils, bmesh, bpy_extras and rna_prop_ui, so the pure logic
+   modules of the add-on (params, jsonutils, shaders, hair, geom, rigify_mapping_data...) can be
+   imported and benchmarked under plain CPython:
+
+       import shim
+       hair = shim.import_addon_module("hair")
+
+   Only what those modules touch at import time (and in their pure logic) is modelled:
+   any other attribute of bpy resolves to a harmless placeholder. Inside Blender the real modules are used.
+"""
+
+import importlib
+import importlib.util
+import math
+import os
+import sys
+import tempfile
+import types
+import numpy
+
+ADDON_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# the add-on is loaded as a namespace package under this name, without running its __init__ (registration)
+ADDON_PACKAGE = "cc_blender_tools"
+
+# add-on preferences seen by bpy.context.preferences.addons[...].preferences, set attributes as needed
+PREFERENCES = types.SimpleNamespace(
+    log_level = "ERRORS",
+    hair_curve_dir_threshold = 0.9,
+    hair_hint = "hair,scalp,beard,mustache,sideburns,ponytail,braid,!bow,!band,!tie,!ribbon,!ring,!butterfly,!flower",
+    hair_scalp_hint = "scalp,base,skullcap",
+    render_target = "EEVEE",
+    physics_group = "CC_Physics",
+)
+
+
+# mathutils
+#
+
+class Vector():
+    """Minimal pure python mathutils.Vector (2, 3 or 4 components)."""
+
+    __slots__ = ("_v",)
+
+    def __init__(self, seq = (0.0, 0.0, 0.0)):
+        self._v = [ float(x) for x in seq ]
+
+    def __len__(self):
+        return len(self._v)
+
+    def __iter__(self):
+        return iter(self._v)
+
+    def __getitem__(self, i):
+        return self._v[i]
+
+    def __setitem__(self, i, value):
+        self._v[i] = float(value)
+
+    def __repr__(self):
+        return f"Vector({tuple(self._v)})"
+
+    def __eq__(self, other):
+        return isinstance(other, Vector) and self._v == other._v
+
+    def __hash__(self):
+        return hash(tuple(self._v))
+
+    def _get(i):
+        return property(lambda self: self._v[i], lambda self, value: self._v.__setitem__(i, float(value)))
+
+    x = _get(0)
+    y = _get(1)
+    z = _get(2)
+    w = _get(3)
+    del _get
+
+    def __add__(self, other):
+        return Vector(a + b for a, b in zip(self._v, other))
+
+    def __sub__(self, other):
+        return Vector(a - b for a, b in zip(self._v, other))
+
+    def __neg__(self):
+        return Vector(-a for a in self._v)
+
+    def __mul__(self, other):
+        if isinstance(other, Vector):
+            return Vector(a * b for a, b in zip(self._v, other._v))
+        return Vector(a * other for a in self._v)
+
+    __rmul__ = __mul__
+
+    def __truediv__(self, other):
+        return Vector(a / other for a in self._v)
+
+    def __iadd__(self, other):
+        self._v = [ a + b for a, b in zip(self._v, other) ]
+        return self
+
+    def __isub__(self, other):
+        self._v = [ a - b for a, b in zip(self._v, other) ]
+        return self
+
+    def __imul__(self, other):
+        self._v = [ a * other for a in self._v ]
+        return self
+
+    def __itruediv__(self, other):
+        self._v = [ a / other for a in self._v ]
+        return self
+
+    def dot(self, other):
+        return sum(a * b for a, b in zip(self._v, other))
+
+    def cross(self, other):
+        ax, ay, az = self._v[0], self._v[1], self._v[2] if len(self._v) > 2 else 0.0
+        bx, by, bz = other[0], other[1], other[2] if len(other) > 2 else 0.0
+        return Vector((ay * bz - az * by, az * bx - ax * bz, ax * by - ay * bx))
+
+    @property
+    def length(self):
+        return math.sqrt(sum(a * a for a in self._v))
+
+    @property
+    def length_squared(self):
+        return sum(a * a for a in self._v)
+
+    def normalize(self):
+        length = self.length
+        if length > 0:
+            self._v = [ a / length for a in self._v ]
+
+    def normalized(self):
+        v = self.copy()
+        v.normalize()
+        return v
+
+    def copy(self):
+        return Vector(self._v)
+
+    def to_tuple(self, precision = -1):
+        if precision < 0:
+            return tuple(self._v)
+        return tuple(round(a, precision) for a in self._v)
+
+    def to_2d(self):
+        return Vector(self._v[:2])
+
+    def to_3d(self):
+        return Vector((self._v + [0.0, 0.0, 0.0])[:3])
+
+    def lerp(self, other, factor):
+        return Vector(a + (b - a) * factor for a, b in zip(self._v, other))
+
+
+class Matrix():
+    """Minimal pure python mathutils.Matrix (4x4 affine)."""
+
+    def __init__(self, rows = None):
+        if rows is None:
+            rows = [ [ 1.0 if i == j else 0.0 for j in range(4) ] for i in range(4) ]
+        self.rows = [ [ float(x) for x in row ] for row in rows ]
+
+    @classmethod
+    def Identity(cls, size = 4):
+        return cls()
+
+    @classmethod
+    def Translation(cls, vector):
+        m = cls()
+        for i in range(3):
+            m.rows[i][3] = vector[i]
+        return m
+
+    def __getitem__(self, i):
+        return self.rows[i]
+
+    def __len__(self):
+        return len(self.rows)
+
+    def __iter__(self):
+        return iter(self.rows)
+
+    def __matmul__(self, other):
+        if isinstance(other, Matrix):
+            return Matrix([ [ sum(self.rows[i][k] * other.rows[k][j] for k in range(4)) for j in range(4) ] for i in range(4) ])
+        v = list(other) + [0.0] * (3 - len(other))
+        p = [ v[0], v[1], v[2], 1.0 ]
+        return Vector(sum(self.rows[i][k] * p[k] for k in range(4)) for i in range(3))
+
+    def inverted(self):
+        # affine inverse: transpose the rotation/scale part (via a general 3x3 inverse) and negate the translation
+        a = [ row[:3] for row in self.rows[:3] ]
+        det = (a[0][0] * (a[1][1] * a[2][2] - a[1][2] * a[2][1]) -
+               a[0][1] * (a[1][0] * a[2][2] - a[1][2] * a[2][0]) +
+               a[0][2] * (a[1][0] * a[2][1] - a[1][1] * a[2][0]))
+        inv = [ [ (a[(j + 1) % 3][(i + 1) % 3] * a[(j + 2) % 3][(i + 2) % 3] -
+                   a[(j + 1) % 3][(i + 2) % 3] * a[(j + 2) % 3][(i + 1) % 3]) / det for j in range(3) ] for i in range(3) ]
+        t = [ row[3] for row in self.rows[:3] ]
+        rows = [ inv[i] + [ -sum(inv[i][k] * t[k] for k in range(3)) ] for i in range(3) ]
+        return Matrix(rows + [ [0.0, 0.0, 0.0, 1.0] ])
+
+
+def _barycentric(p, a, b, c):
+    v0 = (b[0] - a[0], b[1] - a[1], (b[2] if len(b) > 2 else 0.0) - (a[2] if len(a) > 2 else 0.0))
+    v1 = (c[0] - a[0], c[1] - a[1], (c[2] if len(c) > 2 else 0.0) - (a[2] if len(a) > 2 else 0.0))
+    v2 = (p[0] - a[0], p[1] - a[1], (p[2] if len(p) > 2 else 0.0) - (a[2] if len(a) > 2 else 0.0))
+    d00 = sum(x * x for x in v0)
+    d01 = sum(x * y for x, y in zip(v0, v1))
+    d11 = sum(x * x for x in v1)
+    d20 = sum(x * y for x, y in zip(v2, v0))
+    d21 = sum(x * y for x, y in zip(v2, v1))
+    denom = d00 * d11 - d01 * d01
+    if denom == 0:
+        return None
+    v = (d11 * d20 - d01 * d21) / denom
+    w = (d00 * d21 - d01 * d20) / denom
+    return 1.0 - v - w, v, w
+
+
+def intersect_point_tri_2d(p, a, b, c):
+    bary = _barycentric((p[0], p[1]), (a[0], a[1]), (b[0], b[1]), (c[0], c[1]))
+    return bary is not None and min(bary) >= 0
+
+
+def intersect_point_tri(p, a, b, c):
+    bary = _barycentric(p, a, b, c)
+    if bary is None or min(bary) < 0:
+        return None
+    return Vector(a[i] * bary[0] + b[i] * bary[1] + c[i] * bary[2] for i in range(3))
+
+
+def barycentric_transform(p, a1, b1, c1, a2, b2, c2):
+    bary = _barycentric(p, a1, b1, c1)
+    if bary is None:
+        return Vector((0.0, 0.0, 0.0))
+    return Vector(a2[i] * bary[0] + b2[i] * bary[1] + c2[i] * bary[2] for i in range(3))
+
+
+def distance_point_to_plane(p, plane_co, plane_no):
+    return sum((p[i] - plane_co[i]) * plane_no[i] for i in range(3))
+
+
+# bmesh
+#
+
+class BMVert():
+    def __init__(self, index, co):
+        self.index = index
+        self.co = Vector(co)
+        self.link_edges = []
+        self.select = False
+
+
+class BMEdge():
+    def __init__(self, index, verts):
+        self.index = index
+        self.verts = verts
+        self.select = False
+        for vert in verts:
+            vert.link_edges.append(self)
+
+
+class BMLoop():
+    def __init__(self, vert, face, uv):
+        self.vert = vert
+        self.face = face
+        self.layers = { 0: types.SimpleNamespace(uv = Vector(uv)) }
+
+    def __getitem__(self, layer):
+        return self.layers[layer]
+
+
+class BMFace():
+    def __init__(self, index, verts, uvs, material_index = 0):
+        self.index = index
+        self.verts = verts
+        self.loops = [ BMLoop(vert, self, uv) for vert, uv in zip(verts, uvs) ]
+        self.edges = []
+        self.material_index = material_index
+        self.select = False
+        a, b, c = verts[0].co, verts[1].co, verts[2].co
+        normal = (b - a).cross(c - a)
+        normal.normalize()
+        self.normal = normal
+
+
+class BMSeq(list):
+    def ensure_lookup_table(self):
+        pass
+
+
+class BMesh():
+    """Minimal bmesh with verts, faces and loops (with a single uv layer, index 0)."""
+
+    def __init__(self):
+        self.verts = BMSeq()
+        self.faces = BMSeq()
+        self.edges = BMSeq()
+        self.loops = types.SimpleNamespace(layers = types.SimpleNamespace(uv = [0]))
+
+    def from_mesh(self, mesh):
+        pass
+
+    def to_mesh(self, mesh):
+        pass
+
+    def free(self):
+        pass
+
+
+def make_bmesh(coords, faces, face_uvs, material_indices = None):
+    """Builds a minimal BMesh from vertex coords, face vertex index lists and per face loop uvs."""
+    bm = BMesh()
+    edge_index = {}
+    for i, co in enumerate(coords):
+        bm.verts.append(BMVert(i, co))
+    for i, (face, uvs) in enumerate(zip(faces, face_uvs)):
+        material_index = material_indices[i] if material_indices else 0
+        bm_face = BMFace(i, [ bm.verts[v] for v in face ], uvs, material_index)
+        bm.faces.append(bm_face)
+        for a, b in zip(face, list(face[1:]) + [face[0]]):
+            key = (min(a, b), max(a, b))
+            if key not in edge_index:
+                edge_index[key] = len(bm.edges)
+                bm.edges.append(BMEdge(len(bm.edges), [ bm.verts[key[0]], bm.verts[key[1]] ]))
+            bm_face.edges.append(bm.edges[edge_index[key]])
+    return bm
+
+
+# bpy
+#
+
+class Placeholder():
+    """Stands in for any bpy attribute that isn't modelled: callable, subscriptable, iterable (empty)."""
+
+    def __init__(self, name = "bpy"):
+        self._name = name
+
+    def __getattr__(self, name):
+        if name.startswith("__"):
+            raise AttributeError(name)
+        return Placeholder(self._name + "." + name)
+
+    def __call__(self, *args, **kwargs):
+        return { "FINISHED" }
+
+    def __getitem__(self, key):
+        return Placeholder(f"{self._name}[{key!r}]")
+
+    def __iter__(self):
+        return iter(())
+
+    def __len__(self):
+        return 0
+
+    def __bool__(self):
+        return False
+
+    def __repr__(self):
+        return f"<shim {self._name}>"
+
+
+class PlaceholderModule(types.ModuleType):
+    def __getattr__(self, name):
+        if name.startswith("__"):
+            raise AttributeError(name)
+        return Placeholder(self.__name__ + "." + name)
+
+
+class TypesModule(types.ModuleType):
+    """bpy.types: every type is a distinct (sub-classable) class."""
+
+    def __getattr__(self, name):
+        if name.startswith("__"):
+            raise AttributeError(name)
+        cls = type(name, (), { "__module__": "bpy.types" })
+        setattr(self, name, cls)
+        return cls
+
+
+class PropsModule(types.ModuleType):
+    """bpy.props: property definitions just record their arguments."""
+
+    def __getattr__(self, name):
+        if name.startswith("__"):
+            raise AttributeError(name)
+        def prop(*args, **kwargs):
+            return (name, kwargs)
+        return prop
+
+
+class DataCollection(list):
+    """A bpy.data collection: a list with lookup by name."""
+
+    def get(self, name, default = None):
+        for item in self:
+            if getattr(item, "name", None) == name:
+                return item
+        return default
+
+    def __contains__(self, item):
+        if isinstance(item, str):
+            return self.get(item) is not None
+        return list.__contains__(self, item)
+
+    def __getitem__(self, key):
+        if isinstance(key, str):
+            item = self.get(key)
+            if item is None:
+                raise KeyError(key)
+            return item
+        return list.__getitem__(self, key)
+
+    def remove(self, item, **kwargs):
+        list.remove(self, item)
+
+
+class BlendData():
+    def __getattr__(self, name):
+        if name.startswith("__"):
+            raise AttributeError(name)
+        collection = DataCollection()
+        setattr(self, name, collection)
+        return collection
+
+
+class Addons(dict):
+    def __missing__(self, key):
+        return types.SimpleNamespace(preferences = PREFERENCES, module = key)
+
+    def __contains__(self, key):
+        return True
+
+
+class PixelBuffer():
+    """Image.pixels: a flat float32 buffer supporting foreach_get/foreach_set and slicing."""
+
+    def __init__(self, size):
+        self.data = numpy.zeros(size, dtype = numpy.float32)
+
+    def __len__(self):
+        return len(self.data)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return tuple(self.data[i].tolist())
+        return float(self.data[i])
+
+    def __setitem__(self, i, value):
+        self.data[i] = value
+
+    def __iter__(self):
+        return iter(self.data.tolist())
+
+    def foreach_get(self, buffer):
+        buffer[:] = self.data
+
+    def foreach_set(self, buffer):
+        self.data[:] = buffer
+
+
+class Image():
+    """Minimal bpy.types.Image with size, channels and pixels."""
+
+    def __init__(self, name, width, height, channels = 4):
+        self.name = name
+        self.size = (width, height)
+        self.channels = channels
+        self.pixels = PixelBuffer(width * height * channels)
+        self.filepath = ""
+        self.filepath_raw = ""
+        self.type = "IMAGE"
+        self.is_dirty = False
+
+    def update(self):
+        pass
+
+    def save(self):
+        pass
+
+    def scale(self, width, height):
+        self.size = (width, height)
+        self.pixels = PixelBuffer(width * height * self.channels)
+
+
+class Material():
+    def __init__(self, name):
+        self.name = name
+
+    def as_pointer(self):
+        return id(self)
+
+
+class ArrayCollection():
+    """A mesh element collection (polygons, loops, uv layer data) with foreach_get of numpy backed attributes."""
+
+    def __init__(self, length, **attributes):
+        self.length = length
+        self.attributes = attributes
+
+    def __len__(self):
+        return self.length
+
+    def foreach_get(self, attribute, buffer):
+        buffer[:] = numpy.asarray(self.attributes[attribute]).reshape(-1)
+
+
+class UVLayers(DataCollection):
+    @property
+    def active(self):
+        return self[0] if self else None
+
+
+class VertexGroup():
+    """bpy.types.VertexGroup that records its weights and counts the add calls."""
+
+    def __init__(self, name, index):
+        self.name = name
+        self.index = index
+        self.weights = {}
+        self.add_calls = 0
+
+    def add(self, index, weight, type):
+        self.add_calls += 1
+        for i in index:
+            self.weights[i] = weight
+
+
+class VertexGroups(DataCollection):
+    def new(self, name = "Group"):
+        vertex_group = VertexGroup(name, len(self))
+        self.append(vertex_group)
+        return vertex_group
+
+
+class Mesh():
+    """Minimal bpy.types.Mesh: vertex count, polygons (material_index, loop_total), loops (vertex_index)
+       and uv layers (uv), all read with foreach_get."""
+
+    def __init__(self, name, num_verts, faces, face_uvs, material_indices):
+        self.name = name
+        self.vertices = [ None ] * num_verts
+        self.polygons = ArrayCollection(len(faces), material_index = material_indices,
+                                        loop_total = [ len(face) for face in faces ])
+        loop_verts = [ v for face in faces for v in face ]
+        loop_uvs = [ uv for uvs in face_uvs for uv in uvs ]
+        self.loops = ArrayCollection(len(loop_verts), vertex_index = loop_verts)
+        self.uv_layers = UVLayers([ types.SimpleNamespace(name = "UVMap", data = ArrayCollection(len(loop_uvs), uv = loop_uvs)) ])
+
+    def as_pointer(self):
+        return id(self)
+
+
+def make_mesh_object(name, num_verts, faces, face_uvs, materials, material_indices):
+    """Builds a minimal mesh bpy.types.Object with material slots and vertex groups."""
+    mesh = Mesh(name, num_verts, faces, face_uvs, material_indices)
+    mesh.materials = list(materials)
+    return types.SimpleNamespace(name = name, type = "MESH", data = mesh,
+                                 material_slots = [ types.SimpleNamespace(material = mat) for mat in materials ],
+                                 vertex_groups = VertexGroups())
+
+
+def install():
+    """Installs the stand-in modules into sys.modules (unless running inside Blender). Returns the bpy module."""
+    if "bpy" in sys.modules:
+        return sys.modules["bpy"]
+
+    mathutils = types.ModuleType("mathutils")
+    mathutils.Vector = Vector
+    mathutils.Matrix = Matrix
+    mathutils.Color = Vector
+    mathutils.Euler = Vector
+    mathutils.Quaternion = Vector
+    geometry = types.ModuleType("mathutils.geometry")
+    geometry.intersect_point_tri_2d = intersect_point_tri_2d
+    geometry.intersect_point_tri = intersect_point_tri
+    geometry.barycentric_transform = barycentric_transform
+    geometry.distance_point_to_plane = distance_point_to_plane
+    mathutils.geometry = geometry
+
+    bmesh = PlaceholderModule("bmesh")
+    bmesh.new = BMesh
+    bmesh.types = types.SimpleNamespace(BMesh = BMesh, BMVert = BMVert, BMFace = BMFace, BMLoop = BMLoop, BMEdge = BMEdge)
+    bmesh.ops = Placeholder("bmesh.ops")
+
+    bpy = PlaceholderModule("bpy")
+    bpy.types = TypesModule("bpy.types")
+    bpy.props = PropsModule("bpy.props")
+    bpy.data = BlendData()
+    handlers = PlaceholderModule("bpy.app.handlers")
+    handlers.persistent = lambda func: func
+    for handler in ["load_post", "load_pre", "undo_post", "redo_post", "save_pre", "depsgraph_update_post"]:
+        setattr(handlers, handler, [])
+    bpy.app = types.SimpleNamespace(version = (3, 6, 0), version_string = "3.6.0 (shim)", background = True,
+                                    binary_path = "", handlers = handlers,
+                                    timers = types.SimpleNamespace(register = lambda *args, **kwargs: None,
+                                                                   unregister = lambda *args, **kwargs: None,
+                                                                   is_registered = lambda *args, **kwargs: False))
+    bpy.context = types.SimpleNamespace(preferences = types.SimpleNamespace(addons = Addons()),
+                                        scene = types.SimpleNamespace(), object = None, active_object = None,
+                                        selected_objects = [], view_layer = Placeholder("bpy.context.view_layer"))
+    bpy.path = types.SimpleNamespace(abspath = lambda path, **kwargs: path[2:] if path.startswith("//") else path,
+                                     basename = os.path.basename,
+                                     clean_name = lambda name, **kwargs: name)
+    resource_dir = os.path.join(tempfile.gettempdir(), "cc_blender_tools_shim")
+    bpy.utils = types.SimpleNamespace(register_class = lambda cls: None, unregister_class = lambda cls: None,
+                                      user_resource = lambda *args, **kwargs: resource_dir,
+                                      script_paths = lambda *args, **kwargs: [])
+    bpy.ops = Placeholder("bpy.ops")
+
+    bpy_extras = PlaceholderModule("bpy_extras")
+    bpy_extras.mesh_utils = PlaceholderModule("bpy_extras.mesh_utils")
+    bpy_extras.io_utils = PlaceholderModule("bpy_extras.io_utils")
+    rna_prop_ui = PlaceholderModule("rna_prop_ui")
+    addon_utils = PlaceholderModule("addon_utils")
+
+    sys.modules.update({
+        "bpy": bpy,
+        "bpy.types": bpy.types,
+        "bpy.props": bpy.props,
+        "bpy.app": bpy.app,
+        "bpy.app.handlers": handlers,
+        "mathutils": mathutils,
+        "mathutils.geometry": geometry,
+        "bmesh": bmesh,
+        "bpy_extras": bpy_extras,
+        "bpy_extras.mesh_utils": bpy_extras.mesh_utils,
+        "bpy_extras.io_utils": bpy_extras.io_utils,
+        "rna_prop_ui": rna_prop_ui,
+        "addon_utils": addon_utils,
+    })
+    return bpy
+
+
+def load_addon(init = False):
+    """Registers the add-on folder as a package, without executing its __init__ (and so without importing
+       all the modules), or with init, importing the add-on as Blender would (but not calling register())."""
+    install()
+    package = sys.modules.get(ADDON_PACKAGE)
+    if package is None:
+        init_path = os.path.join(ADDON_DIR, "__init__.py")
+        if init:
+            spec = importlib.util.spec_from_file_location(ADDON_PACKAGE, init_path, submodule_search_locations = [ ADDON_DIR ])
+            package = importlib.util.module_from_spec(spec)
+            sys.modules[ADDON_PACKAGE] = package
+            spec.loader.exec_module(package)
+        else:
+            package = types.ModuleType(ADDON_PACKAGE)
+            package.__path__ = [ ADDON_DIR ]
+            package.__file__ = init_path
+            sys.modules[ADDON_PACKAGE] = package
+    return package
+
+
+def import_addon_module(name):
+    """Imports a single module of the add-on (and the modules it imports) under plain CPython."""
+    load_addon()
+    return importlib.import_module(ADDON_PACKAGE + "." + name)
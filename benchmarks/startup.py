@@ -0,0 +1,122 @@
+# Copyright (C) 2021 Victor Soupday
+# This file is part of CC/iC Blender Tools <https://github.com/soupday/cc_blender_tools>
+#
+# CC/iC Blender Tools is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# CC/iC Blender Tools is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with CC/iC Blender Tools.  If not, see <https://www.gnu.org/licenses/>.
+
+"""Measures the add-on's startup cost: importing the package and calling register().
+
+   Inside Blender (one fresh Blender process per measurement):
+
+       blender -b --factory-startup --python benchmarks/startup.py
+
+   Under plain CPython, through the bpy shim (registration is then a no-op, so this measures
+   the module imports and any work done in register() itself), over several fresh processes:
+
+       python benchmarks/startup.py [--runs 20] [--modules 8]
+
+   Each measurement also reports which of the heavy data modules were actually executed,
+   and the CPython measurement lists the add-on modules with the largest import times (python -X importtime).
+   These include compiling the module when its bytecode isn't cached (a first run, or a read only add-on folder).
+"""
+
+import os
+import subprocess
+import sys
+import time
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+ADDON_DIR = os.path.dirname(BENCHMARK_DIR)
+
+# modules that should only load on first use
+LAZY_MODULES = ["rigify_mapping_data"]
+
+
+def is_loaded(module):
+    # a lazily imported module keeps its lazy module type until the first attribute access (which would load it)
+    return module is not None and type(module).__name__ != "_LazyModule"
+
+
+def measure_blender():
+    import addon_utils
+    package = os.path.basename(ADDON_DIR)
+    sys.path.insert(0, os.path.dirname(ADDON_DIR))
+    start = time.perf_counter()
+    addon_utils.enable(package, default_set = False)
+    duration = time.perf_counter() - start
+    loaded = [ name for name in LAZY_MODULES if is_loaded(sys.modules.get(package + "." + name)) ]
+    print(f"enable: {duration * 1000:.1f} ms, lazy modules loaded: {loaded}")
+    return duration
+
+
+def measure_shim():
+    sys.path.insert(0, BENCHMARK_DIR)
+    import shim
+    shim.install()
+    start = time.perf_counter()
+    package = shim.load_addon(init = True)
+    imported = time.perf_counter()
+    package.register()
+    registered = time.perf_counter()
+    loaded = [ name for name in LAZY_MODULES if is_loaded(sys.modules.get(shim.ADDON_PACKAGE + "." + name)) ]
+    print(f"{(imported - start) * 1000:.3f} {(registered - imported) * 1000:.3f} {','.join(loaded)}")
+
+
+def measure_module_imports(count):
+    """Returns the [name, self ms, cumulative ms] of the add-on modules with the largest self import times."""
+    sys.path.insert(0, BENCHMARK_DIR)
+    import shim
+    prefix = shim.ADDON_PACKAGE + "."
+    stderr = subprocess.run([sys.executable, "-X", "importtime", os.path.abspath(__file__), "--child"],
+                            capture_output = True, text = True, check = True).stderr
+    modules = []
+    for line in stderr.splitlines():
+        fields = line.split("|")
+        if len(fields) == 3 and fields[2].strip().startswith(prefix):
+            self_us = int(fields[0].split(":")[1])
+            cumulative_us = int(fields[1])
+            modules.append([fields[2].strip()[len(prefix):], self_us / 1000, cumulative_us / 1000])
+    modules.sort(key = lambda module: module[1], reverse = True)
+    return modules[:count]
+
+
+def main(argv):
+    runs = 10
+    modules = 8
+    if "--runs" in argv:
+        runs = int(argv[argv.index("--runs") + 1])
+    if "--modules" in argv:
+        modules = int(argv[argv.index("--modules") + 1])
+    imports = []
+    registers = []
+    loaded = ""
+    for i in range(runs):
+        output = subprocess.run([sys.executable, os.path.abspath(__file__), "--child"],
+                                capture_output = True, text = True, check = True).stdout.split()
+        imports.append(float(output[0]))
+        registers.append(float(output[1]))
+        loaded = output[2] if len(output) > 2 else ""
+    print(f"import:   min {min(imports):8.2f} ms   median {sorted(imports)[runs // 2]:8.2f} ms")
+    print(f"register: min {min(registers):8.2f} ms   median {sorted(registers)[runs // 2]:8.2f} ms")
+    print(f"lazy modules loaded at startup: {loaded or 'none'}")
+    for name, self_ms, cumulative_ms in measure_module_imports(modules):
+        print(f"  {name:<24} self {self_ms:8.2f} ms   cumulative {cumulative_ms:8.2f} ms")
+
+
+if __name__ == "__main__":
+    if "bpy" in sys.modules:
+        measure_blender()
+    elif "--child" in sys.argv:
+        measure_shim()
+    else:
+        main(sys.argv)
@@ -0,0 +1,561 @@
+# Copyright (C) 2021 Victor Soupday
+# This file is part of CC/iC Blender Tools <https://github.com/soupday/cc_blender_tools>
+#
+# CC/iC Blender Tools is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# CC/iC Blender Tools is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with CC/iC Blender Tools.  If not, see <https://www.gnu.org/licenses/>.
+
+"""Procedurally generates a CC3+ style test character inside Blender, for the headless benchmarks:
+
+       blender -b --factory-startup --python benchmarks/synthetic.py -- --output /tmp/synthetic [--texture-size 2048]
+
+   The character is exported as <output>/<name>.fbx with:
+     - an armature with the CC_Base_* bones the rigify mappings expect (rigify_mapping_data.G3_BONE_MAPPINGS),
+     - CC_Base_Body/Eye/Teeth/Tongue/EyeOcclusion/TearLine meshes with the Std_* materials, weighted to the bones,
+     - a hair card object (with a hair flow map), a cloth object (with a physics weight map)
+       and two accessories that share their textures (duplicate materials),
+     - a <name>.json sidecar built from the shader json templates in params, as jsonutils reads it,
+       with the textures at the requested size in the textures/<name>/<object>/<mesh>/<material> folders.
+
+   The meshes are simple tubes and spheres around the bones: only the names, the structure and the
+   sizes (vertex, material and texture counts) are meant to match a real character.
+"""
+
+import copy
+import importlib
+import math
+import os
+import sys
+import numpy
+
+import bpy
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+ADDON_DIR = os.path.dirname(BENCHMARK_DIR)
+ADDON_PACKAGE = os.path.basename(ADDON_DIR)
+
+# configuration of the generated character
+CONFIG = {
+    "name": "Synthetic",
+    "texture_size": 1024,
+    # number of vertices around each body part, the rings along each part scale with it
+    "detail": 24,
+    "hair_cards": 1000,
+    "hair_segments": 8,
+}
+
+# CC3+ generation, as in the json from Character Creator (see vars.CHARACTER_GENERATION)
+GENERATION = "RL_CC3_Plus"
+
+# [bone_name, parent_name, head, tail] in meters (z up, facing -y),
+# the left side bones (_L_) are mirrored to the right side (_R_)
+SPINE_BONES = [
+    ["CC_Base_BoneRoot", None, (0, 0, 0), (0, 0, 0.1)],
+    ["CC_Base_Hip", "CC_Base_BoneRoot", (0, 0, 1.0), (0, 0, 1.05)],
+    ["CC_Base_Pelvis", "CC_Base_Hip", (0, 0, 1.0), (0, 0, 0.9)],
+    ["CC_Base_Waist", "CC_Base_Hip", (0, 0, 1.05), (0, 0, 1.15)],
+    ["CC_Base_Spine01", "CC_Base_Waist", (0, 0, 1.15), (0, 0, 1.27)],
+    ["CC_Base_Spine02", "CC_Base_Spine01", (0, 0, 1.27), (0, 0, 1.45)],
+    ["CC_Base_NeckTwist01", "CC_Base_Spine02", (0, 0, 1.45), (0, 0, 1.52)],
+    ["CC_Base_NeckTwist02", "CC_Base_NeckTwist01", (0, 0, 1.52), (0, 0, 1.58)],
+    ["CC_Base_Head", "CC_Base_NeckTwist02", (0, 0, 1.58), (0, 0, 1.76)],
+    ["CC_Base_FacialBone", "CC_Base_Head", (0, -0.02, 1.62), (0, -0.02, 1.70)],
+    ["CC_Base_UpperJaw", "CC_Base_FacialBone", (0, -0.01, 1.63), (0, -0.08, 1.63)],
+    ["CC_Base_Teeth01", "CC_Base_UpperJaw", (0, -0.07, 1.63), (0, -0.08, 1.63)],
+    ["CC_Base_JawRoot", "CC_Base_FacialBone", (0, -0.01, 1.61), (0, -0.08, 1.58)],
+    ["CC_Base_Teeth02", "CC_Base_JawRoot", (0, -0.07, 1.605), (0, -0.08, 1.605)],
+    ["CC_Base_Tongue01", "CC_Base_JawRoot", (0, -0.02, 1.61), (0, -0.035, 1.613)],
+    ["CC_Base_Tongue02", "CC_Base_Tongue01", (0, -0.035, 1.613), (0, -0.05, 1.614)],
+    ["CC_Base_Tongue03", "CC_Base_Tongue02", (0, -0.05, 1.614), (0, -0.065, 1.612)],
+]
+
+LEFT_BONES = [
+    ["CC_Base_L_Eye", "CC_Base_FacialBone", (0.032, -0.07, 1.67), (0.032, -0.09, 1.67)],
+    ["CC_Base_L_Breast", "CC_Base_Spine02", (0.09, -0.08, 1.35), (0.09, -0.14, 1.35)],
+    ["CC_Base_L_RibsTwist", "CC_Base_Spine02", (0.1, 0, 1.3), (0.1, 0, 1.38)],
+    ["CC_Base_L_Clavicle", "CC_Base_Spine02", (0.02, 0, 1.45), (0.17, 0.01, 1.46)],
+    ["CC_Base_L_Upperarm", "CC_Base_L_Clavicle", (0.17, 0.01, 1.46), (0.45, 0.03, 1.46)],
+    ["CC_Base_L_Forearm", "CC_Base_L_Upperarm", (0.45, 0.03, 1.46), (0.70, 0, 1.46)],
+    ["CC_Base_L_Hand", "CC_Base_L_Forearm", (0.70, 0, 1.46), (0.78, 0, 1.455)],
+    ["CC_Base_L_Thigh", "CC_Base_Pelvis", (0.09, 0, 0.95), (0.09, -0.02, 0.52)],
+    ["CC_Base_L_Calf", "CC_Base_L_Thigh", (0.09, -0.02, 0.52), (0.09, 0.01, 0.08)],
+    ["CC_Base_L_Foot", "CC_Base_L_Calf", (0.09, 0.01, 0.08), (0.09, -0.12, 0.02)],
+    ["CC_Base_L_ToeBase", "CC_Base_L_Foot", (0.09, -0.12, 0.02), (0.09, -0.18, 0.02)],
+]
+
+# [bone_name, segment_bone, start, end]: twist and share bones along a fraction of another bone (same parent)
+SEGMENT_BONES = [
+    ["CC_Base_L_UpperarmTwist01", "CC_Base_L_Upperarm", 0.0, 0.5],
+    ["CC_Base_L_UpperarmTwist02", "CC_Base_L_Upperarm", 0.5, 1.0],
+    ["CC_Base_L_ElbowShareBone", "CC_Base_L_Upperarm", 0.9, 1.0],
+    ["CC_Base_L_ForearmTwist01", "CC_Base_L_Forearm", 0.0, 0.5],
+    ["CC_Base_L_ForearmTwist02", "CC_Base_L_Forearm", 0.5, 1.0],
+    ["CC_Base_L_ThighTwist01", "CC_Base_L_Thigh", 0.0, 0.5],
+    ["CC_Base_L_ThighTwist02", "CC_Base_L_Thigh", 0.5, 1.0],
+    ["CC_Base_L_KneeShareBone", "CC_Base_L_Thigh", 0.9, 1.0],
+    ["CC_Base_L_CalfTwist01", "CC_Base_L_Calf", 0.0, 0.5],
+    ["CC_Base_L_CalfTwist02", "CC_Base_L_Calf", 0.5, 1.0],
+    ["CC_Base_L_ToeBaseShareBone", "CC_Base_L_ToeBase", 0.0, 0.3],
+]
+
+# [finger, y offset, length, base z drop]
+FINGERS = [
+    ["Index", -0.03, 0.03, 0.0],
+    ["Mid", -0.01, 0.033, 0.0],
+    ["Ring", 0.01, 0.03, 0.0],
+    ["Pinky", 0.03, 0.024, 0.005],
+]
+TOES = ["BigToe1", "IndexToe1", "MidToe1", "RingToe1", "PinkyToe1"]
+
+# [object_name, [[material_name, material_type], ...]]
+OBJECT_MATERIALS = [
+    ["CC_Base_Body", [["Std_Skin_Head", "SKIN_HEAD"], ["Std_Skin_Body", "SKIN_BODY"], ["Std_Skin_Arm", "SKIN_ARM"],
+                      ["Std_Skin_Leg", "SKIN_LEG"], ["Std_Nails", "NAILS"], ["Std_Eyelash", "EYELASH"]]],
+    ["CC_Base_Eye", [["Std_Eye_R", "EYE_RIGHT"], ["Std_Cornea_R", "CORNEA_RIGHT"],
+                     ["Std_Eye_L", "EYE_LEFT"], ["Std_Cornea_L", "CORNEA_LEFT"]]],
+    ["CC_Base_Teeth", [["Std_Upper_Teeth", "TEETH_UPPER"], ["Std_Lower_Teeth", "TEETH_LOWER"]]],
+    ["CC_Base_Tongue", [["Std_Tongue", "TONGUE"]]],
+    ["CC_Base_EyeOcclusion", [["Std_Eye_Occlusion_R", "OCCLUSION_RIGHT"], ["Std_Eye_Occlusion_L", "OCCLUSION_LEFT"]]],
+    ["CC_Base_TearLine", [["Std_Tearline_R", "TEARLINE_RIGHT"], ["Std_Tearline_L", "TEARLINE_LEFT"]]],
+    ["Hair", [["Hair_Transparency", "HAIR"], ["Scalp_Transparency", "SCALP"]]],
+    ["Shirt", [["Shirt", "DEFAULT"]]],
+    ["Earring_L", [["Earring_L", "DEFAULT"]]],
+    ["Earring_R", [["Earring_R", "DEFAULT"]]],
+]
+
+# material types that Character Creator exports as Pbr materials (detected by name or hints)
+PBR_MATERIAL_TYPES = ["DEFAULT", "EYE_RIGHT", "EYE_LEFT", "EYELASH", "SCALP"]
+
+# material types without textures
+UNTEXTURED_MATERIAL_TYPES = ["OCCLUSION_RIGHT", "OCCLUSION_LEFT", "TEARLINE_RIGHT", "TEARLINE_LEFT"]
+
+# materials that re-use the textures of another material (so they are detected as duplicates)
+SHARED_TEXTURES = { "Earring_R": "Earring_L" }
+
+# materials with a physics weight map
+WEIGHT_MAPPED_MATERIALS = ["Shirt"]
+
+
+def addon_module(name):
+    return importlib.import_module(ADDON_PACKAGE + "." + name)
+
+
+def enable_addon():
+    """Enables the add-on (from this source tree) in the running Blender."""
+    import addon_utils
+    addon_parent = os.path.dirname(ADDON_DIR)
+    if addon_parent not in sys.path:
+        sys.path.insert(0, addon_parent)
+    module = addon_utils.enable(ADDON_PACKAGE, default_set = True, handle_error = None)
+    if module is None:
+        raise RuntimeError(f"Unable to enable the add-on: {ADDON_PACKAGE}")
+    return module
+
+
+def get_bones():
+    """Returns the [bone_name, parent_name, head, tail] of every bone in the skeleton."""
+    bones = [ [name, parent, numpy.array(head, float), numpy.array(tail, float)] for name, parent, head, tail in SPINE_BONES ]
+    left = [ [name, parent, numpy.array(head, float), numpy.array(tail, float)] for name, parent, head, tail in LEFT_BONES ]
+    bone_heads = { bone[0]: bone for bone in left }
+
+    for name, segment_name, start, end in SEGMENT_BONES:
+        segment = bone_heads[segment_name]
+        vector = segment[3] - segment[2]
+        left.append([name, segment[1], segment[2] + vector * start, segment[2] + vector * end])
+
+    hand = bone_heads["CC_Base_L_Hand"]
+    for finger, offset, length, drop in FINGERS:
+        parent = hand[0]
+        head = hand[3] + numpy.array((0, offset, -drop))
+        for i in range(1, 4):
+            tail = head + numpy.array((length * (1.0 - 0.15 * i), 0, -0.004))
+            left.append([f"CC_Base_L_{finger}{i}", parent, head, tail])
+            parent = f"CC_Base_L_{finger}{i}"
+            head = tail
+    parent = hand[0]
+    head = hand[2] + numpy.array((0.02, -0.025, -0.01))
+    for i in range(1, 4):
+        tail = head + numpy.array((0.02, -0.015, -0.005))
+        left.append([f"CC_Base_L_Thumb{i}", parent, head, tail])
+        parent = f"CC_Base_L_Thumb{i}"
+        head = tail
+
+    toe_base = bone_heads["CC_Base_L_ToeBase"]
+    for i, toe in enumerate(TOES):
+        head = toe_base[3] + numpy.array((0.02 - 0.01 * i, 0, 0))
+        left.append([f"CC_Base_L_{toe}", toe_base[0], head, head + numpy.array((0, -0.02, 0))])
+
+    for name, parent, head, tail in left:
+        bones.append([name, parent, head, tail])
+    for name, parent, head, tail in left:
+        mirror = numpy.array((-1, 1, 1))
+        bones.append([name.replace("_L_", "_R_"), parent.replace("_L_", "_R_"), head * mirror, tail * mirror])
+
+    return bones
+
+
+class MeshBuilder():
+    """Accumulates tube, sphere and card geometry, with per loop uvs, material indices and single bone weights."""
+
+    def __init__(self, name, materials):
+        self.name = name
+        self.materials = materials
+        self.verts = []
+        self.faces = []
+        self.uvs = []
+        self.material_indices = []
+        self.groups = {}
+        self.count = 0
+
+    def add_grid(self, verts, material_index, bone, uv_rect, wrap):
+        """Adds a grid of verts (rows, columns, 3) as quads, wrapping the columns around for tubes."""
+        rows, columns = verts.shape[0], verts.shape[1]
+        cells = columns if wrap else columns - 1
+        r, c = numpy.meshgrid(numpy.arange(rows - 1), numpy.arange(cells), indexing = "ij")
+        r = r.ravel()
+        c = c.ravel()
+        c1 = (c + 1) % columns
+        faces = numpy.stack((r * columns + c, r * columns + c1, (r + 1) * columns + c1, (r + 1) * columns + c), axis = 1)
+        u0, v0, u1, v1 = uv_rect
+        u = numpy.stack((c, c + 1, c + 1, c), axis = 1) / cells
+        v = numpy.stack((r, r, r + 1, r + 1), axis = 1) / (rows - 1)
+        uvs = numpy.stack((u0 + u * (u1 - u0), v0 + v * (v1 - v0)), axis = 2)
+
+        self.verts.append(verts.reshape(-1, 3))
+        self.faces.append(faces + self.count)
+        self.uvs.append(uvs.reshape(-1, 2))
+        self.material_indices.append(numpy.full(len(faces), material_index))
+        self.groups.setdefault(bone, []).append(numpy.arange(self.count, self.count + rows * columns))
+        self.count += rows * columns
+
+    def add_tube(self, head, tail, radii, segments, material_index, bone, uv_rect):
+        head = numpy.asarray(head, float)
+        axis = numpy.asarray(tail, float) - head
+        direction = axis / numpy.linalg.norm(axis)
+        up = numpy.array((0, 0, 1.0)) if abs(direction[2]) < 0.9 else numpy.array((1.0, 0, 0))
+        x = numpy.cross(direction, up)
+        x /= numpy.linalg.norm(x)
+        y = numpy.cross(direction, x)
+        t = numpy.linspace(0.0, 1.0, len(radii))
+        angles = numpy.linspace(0.0, 2.0 * math.pi, segments, endpoint = False)
+        ring = numpy.cos(angles)[:, None] * x + numpy.sin(angles)[:, None] * y
+        verts = head + t[:, None, None] * axis + numpy.asarray(radii, float)[:, None, None] * ring
+        self.add_grid(verts, material_index, bone, uv_rect, True)
+
+    def add_sphere(self, center, radius, segments, material_index, bone, uv_rect, axis = (0, -1, 0)):
+        center = numpy.asarray(center, float)
+        axis = numpy.asarray(axis, float) * radius
+        rings = max(3, segments // 2)
+        # keep the poles open (as small rings) rather than degenerate
+        angles = numpy.linspace(0.1, math.pi - 0.1, rings)
+        offsets = -numpy.cos(angles)
+        radii = numpy.sin(angles) * radius
+        self.add_tube(center + offsets[0] * axis, center + offsets[-1] * axis,
+                      radii, segments, material_index, bone, uv_rect)
+
+    def build(self, arm):
+        verts = numpy.concatenate(self.verts)
+        faces = numpy.concatenate(self.faces)
+        mesh = bpy.data.meshes.new(self.name)
+        mesh.from_pydata(verts.tolist(), [], faces.tolist())
+        for mat_name in self.materials:
+            mesh.materials.append(bpy.data.materials.new(mat_name))
+        mesh.polygons.foreach_set("material_index", numpy.concatenate(self.material_indices).astype(numpy.int32))
+        uv_layer = mesh.uv_layers.new(name = "UVMap")
+        uv_layer.data.foreach_set("uv", numpy.concatenate(self.uvs).astype(numpy.float32).ravel())
+        mesh.update()
+
+        obj = bpy.data.objects.new(self.name, mesh)
+        bpy.context.scene.collection.objects.link(obj)
+        for bone, indices in self.groups.items():
+            vertex_group = obj.vertex_groups.new(name = bone)
+            vertex_group.add(numpy.concatenate(indices).tolist(), 1.0, "REPLACE")
+        obj.parent = arm
+        mod = obj.modifiers.new("Armature", "ARMATURE")
+        mod.object = arm
+        return obj
+
+
+def uv_rows(count):
+    """Splits the uv tile into count rows: [u0, v0, u1, v1] for each."""
+    return [ [0.0, i / count, 1.0, (i + 1) / count] for i in range(count) ]
+
+
+def rings_for(head, tail, detail):
+    length = numpy.linalg.norm(numpy.asarray(tail) - numpy.asarray(head))
+    return max(3, int(length * detail * 6) + 1)
+
+
+def build_armature(name, bones):
+    arm_data = bpy.data.armatures.new(name)
+    arm = bpy.data.objects.new(name, arm_data)
+    bpy.context.scene.collection.objects.link(arm)
+    bpy.context.view_layer.objects.active = arm
+    bpy.ops.object.mode_set(mode = "EDIT")
+    for bone_name, parent_name, head, tail in bones:
+        edit_bone = arm_data.edit_bones.new(bone_name)
+        edit_bone.head = head.tolist()
+        edit_bone.tail = tail.tolist()
+        if parent_name:
+            edit_bone.parent = arm_data.edit_bones[parent_name]
+    bpy.ops.object.mode_set(mode = "OBJECT")
+    return arm
+
+
+def build_meshes(arm, bones, config):
+    detail = config["detail"]
+    bone_map = { bone[0]: bone for bone in bones }
+    objects = []
+
+    def tube(builder, bone_name, r0, r1, material_index, uv_rect):
+        head, tail = bone_map[bone_name][2], bone_map[bone_name][3]
+        radii = numpy.linspace(r0, r1, rings_for(head, tail, detail))
+        builder.add_tube(head, tail, radii, detail, material_index, bone_name, uv_rect)
+
+    # body: head, body, arm, leg, nails, eyelash
+    body = MeshBuilder("CC_Base_Body", [ m[0] for m in OBJECT_MATERIALS[0][1] ])
+    head = bone_map["CC_Base_Head"]
+    body.add_sphere((head[2] + head[3]) / 2, 0.1, detail * 2, 0, "CC_Base_Head", [0, 0, 1, 1], (0, 0, 1))
+    torso = [["CC_Base_Pelvis", 0.16, 0.15], ["CC_Base_Waist", 0.14, 0.13], ["CC_Base_Spine01", 0.13, 0.15],
+             ["CC_Base_Spine02", 0.15, 0.12], ["CC_Base_NeckTwist01", 0.055, 0.05], ["CC_Base_NeckTwist02", 0.05, 0.05]]
+    arms = []
+    legs = []
+    nails = []
+    for side in ["L", "R"]:
+        arms += [[f"CC_Base_{side}_Upperarm", 0.05, 0.04], [f"CC_Base_{side}_Forearm", 0.04, 0.03],
+                 [f"CC_Base_{side}_Hand", 0.03, 0.025]]
+        for finger in ["Thumb", "Index", "Mid", "Ring", "Pinky"]:
+            arms += [[f"CC_Base_{side}_{finger}1", 0.009, 0.008], [f"CC_Base_{side}_{finger}2", 0.008, 0.007]]
+            nails.append([f"CC_Base_{side}_{finger}3", 0.007, 0.005])
+        legs += [[f"CC_Base_{side}_Thigh", 0.08, 0.05], [f"CC_Base_{side}_Calf", 0.05, 0.035],
+                 [f"CC_Base_{side}_Foot", 0.035, 0.03], [f"CC_Base_{side}_ToeBase", 0.03, 0.025]]
+    for material_index, parts in [[1, torso], [2, arms], [3, legs], [4, nails]]:
+        for (bone_name, r0, r1), uv_rect in zip(parts, uv_rows(len(parts))):
+            tube(body, bone_name, r0, r1, material_index, uv_rect)
+    for side, uv_rect in zip(["L", "R"], uv_rows(2)):
+        eye = bone_map[f"CC_Base_{side}_Eye"][2]
+        body.add_tube(eye + (-0.015, -0.01, 0.012), eye + (0.015, -0.01, 0.012), [0.003] * 4, 6, 5, "CC_Base_Head", uv_rect)
+    objects.append(body.build(arm))
+
+    # eyes, corneas, occlusion and tearlines
+    eyes = MeshBuilder("CC_Base_Eye", [ m[0] for m in OBJECT_MATERIALS[1][1] ])
+    occlusion = MeshBuilder("CC_Base_EyeOcclusion", [ m[0] for m in OBJECT_MATERIALS[4][1] ])
+    tearline = MeshBuilder("CC_Base_TearLine", [ m[0] for m in OBJECT_MATERIALS[5][1] ])
+    for i, side in enumerate(["R", "L"]):
+        bone_name = f"CC_Base_{side}_Eye"
+        center = bone_map[bone_name][2]
+        eyes.add_sphere(center, 0.012, detail, i * 2, bone_name, [0, 0, 1, 1])
+        eyes.add_sphere(center, 0.0125, detail, i * 2 + 1, bone_name, [0, 0, 1, 1])
+        occlusion.add_tube(center + (0, -0.004, 0), center + (0, -0.012, 0), [0.014] * 3, detail, i, "CC_Base_Head", [0, 0, 1, 1])
+        tearline.add_tube(center + (-0.012, -0.011, -0.006), center + (0.012, -0.011, -0.006), [0.001] * 4, 6, i, "CC_Base_Head", [0, 0, 1, 1])
+    objects += [eyes.build(arm), occlusion.build(arm), tearline.build(arm)]
+
+    # teeth and tongue
+    teeth = MeshBuilder("CC_Base_Teeth", [ m[0] for m in OBJECT_MATERIALS[2][1] ])
+    for i, bone_name in enumerate(["CC_Base_Teeth01", "CC_Base_Teeth02"]):
+        center = bone_map[bone_name][2]
+        teeth.add_tube(center + (-0.025, 0, 0), center + (0.025, 0, 0), [0.006] * 8, detail // 2, i, bone_name, [0, 0, 1, 1])
+    tongue = MeshBuilder("CC_Base_Tongue", [ m[0] for m in OBJECT_MATERIALS[3][1] ])
+    for bone_name, uv_rect in zip(["CC_Base_Tongue01", "CC_Base_Tongue02", "CC_Base_Tongue03"], uv_rows(3)):
+        tube(tongue, bone_name, 0.012, 0.01, 0, uv_rect)
+    objects += [teeth.build(arm), tongue.build(arm)]
+
+    # hair cards on the upper half of the head, roots at the top of the uv tile, and the scalp
+    hair = MeshBuilder("Hair", [ m[0] for m in OBJECT_MATERIALS[6][1] ])
+    cards = config["hair_cards"]
+    segments = config["hair_segments"]
+    center = (head[2] + head[3]) / 2
+    golden_angle = math.pi * (3.0 - math.sqrt(5.0))
+    t = numpy.linspace(0.0, 1.0, segments + 1)
+    for c in range(cards):
+        z = 1.0 - 0.6 * (c + 0.5) / cards
+        theta = golden_angle * c
+        normal = numpy.array((math.cos(theta) * math.sqrt(1 - z * z), math.sin(theta) * math.sqrt(1 - z * z), z))
+        side = numpy.cross(normal, (0, 0, 1.0))
+        side = side / numpy.linalg.norm(side) if numpy.linalg.norm(side) > 1e-6 else numpy.array((1.0, 0, 0))
+        root = center + normal * 0.102
+        tip = root + normal * 0.03 + numpy.array((0, 0, -0.2))
+        spine = root + t[:, None] * (tip - root)
+        verts = numpy.stack((spine - side * 0.006, spine + side * 0.006), axis = 1)
+        u0 = c / cards
+        hair.add_grid(verts, 0, "CC_Base_Head", [u0, 1.0, u0 + 0.8 / cards, 0.0], False)
+    hair.add_sphere(center, 0.101, detail * 2, 1, "CC_Base_Head", [0, 0, 1, 1], (0, 0, 1))
+    objects.append(hair.build(arm))
+
+    # cloth and the accessories
+    shirt = MeshBuilder("Shirt", ["Shirt"])
+    for (bone_name, r0, r1), uv_rect in zip(torso[:4], uv_rows(4)):
+        tube(shirt, bone_name, r0 + 0.01, r1 + 0.01, 0, uv_rect)
+    objects.append(shirt.build(arm))
+    for side, x in [["L", 0.1], ["R", -0.1]]:
+        earring = MeshBuilder(f"Earring_{side}", [f"Earring_{side}"])
+        earring.add_sphere(center + (x, 0, -0.05), 0.006, detail, 0, "CC_Base_Head", [0, 0, 1, 1])
+        objects.append(earring.build(arm))
+
+    return objects
+
+
+def make_texture_pixels(texture_type, size, seed):
+    rng = numpy.random.default_rng(seed)
+    noise = rng.random((size, size), dtype = numpy.float32)
+    pixels = numpy.ones((size, size, 4), dtype = numpy.float32)
+    if texture_type == "DIFFUSE":
+        color = rng.random(3, dtype = numpy.float32) * 0.6 + 0.2
+        pixels[..., :3] = color * (0.85 + 0.15 * noise[..., None])
+    elif texture_type == "NORMAL":
+        pixels[..., 0] = 0.5 + 0.05 * (noise - 0.5)
+        pixels[..., 1] = 0.5 + 0.05 * (noise.T - 0.5)
+    elif texture_type == "HAIRFLOW":
+        # flow mostly down the cards (tangent space), with some sideways variation
+        u = numpy.linspace(0.0, 1.0, size, dtype = numpy.float32)[None, :]
+        pixels[..., 0] = 0.5 + 0.2 * numpy.sin(u * 40.0) + 0.02 * noise
+        pixels[..., 1] = 0.1 + 0.02 * noise
+        pixels[..., 2] = 0.5
+    elif texture_type == "WEIGHTMAP":
+        v = numpy.linspace(0.0, 1.0, size, dtype = numpy.float32)[:, None]
+        pixels[..., :3] = (v * (0.9 + 0.1 * noise))[..., None]
+    return pixels
+
+
+def save_texture(path, texture_type, size, seed):
+    os.makedirs(os.path.dirname(path), exist_ok = True)
+    image = bpy.data.images.new(os.path.basename(path), size, size, is_data = texture_type != "DIFFUSE")
+    image.pixels.foreach_set(make_texture_pixels(texture_type, size, seed).ravel())
+    image.filepath_raw = path
+    image.file_format = "PNG"
+    image.save()
+    bpy.data.images.remove(image)
+
+
+def get_material_textures(material_type):
+    """Returns the [texture_type, json_id, is_pbr_texture, file_suffix] of the textures the material type gets."""
+    if material_type in UNTEXTURED_MATERIAL_TYPES:
+        return []
+    textures = [["DIFFUSE", "Base Color", True, "Diffuse"], ["NORMAL", "Normal", True, "Normal"]]
+    if material_type == "HAIR":
+        textures.append(["HAIRFLOW", "Hair Flow Map", False, "Hair Flow Map"])
+    return textures
+
+
+def get_material_json_template(params, material_type):
+    if material_type in PBR_MATERIAL_TYPES:
+        shader_def = params.get_shader_def("rl_pbr_shader")
+    else:
+        shader_def = params.get_shader_def(params.SHADER_LOOKUP_BY_MATERIAL_TYPE[material_type][2])
+    return copy.deepcopy(shader_def["json_template"])
+
+
+def write_character_files(folder, config, objects):
+    """Writes the textures and the json sidecar for the (exported) objects."""
+    params = addon_module("params")
+    jsonutils = addon_module("jsonutils")
+
+    name = config["name"]
+    size = config["texture_size"]
+    json_data = jsonutils.generate_character_json_data(name)
+    chr_json = json_data[name]["Object"][name]
+    chr_json["Generation"] = GENERATION
+    physics_json = jsonutils.add_json_path(chr_json, "Physics/Soft Physics/Meshes")
+    texture_paths = {}
+    seed = 0
+
+    for obj_name, materials in OBJECT_MATERIALS:
+        obj_json = copy.deepcopy(params.JSON_MESH_DATA)
+        chr_json["Meshes"][obj_name] = obj_json
+        for mat_name, material_type in materials:
+            mat_json = get_material_json_template(params, material_type)
+            obj_json["Materials"][mat_name] = mat_json
+            # relative to the fbx, in the folder layout imageutils.get_material_tex_dir() expects
+            tex_dir = os.path.join("textures", name, obj_name, obj_name, mat_name)
+            for texture_type, json_id, is_pbr, suffix in get_material_textures(material_type):
+                if mat_name in SHARED_TEXTURES:
+                    rel_path = texture_paths[(SHARED_TEXTURES[mat_name], texture_type)]
+                else:
+                    rel_path = os.path.join(tex_dir, f"{mat_name}_{suffix}.png")
+                    seed += 1
+                    save_texture(os.path.join(folder, rel_path), texture_type, size, seed)
+                texture_paths[(mat_name, texture_type)] = rel_path
+                if is_pbr:
+                    tex_info = copy.deepcopy(params.JSON_PBR_TEX_INFO)
+                    mat_json["Textures"][json_id] = tex_info
+                else:
+                    tex_info = copy.deepcopy(params.JSON_CUSTOM_TEX_INFO)
+                    mat_json["Custom Shader"]["Image"][json_id] = tex_info
+                tex_info["Texture Path"] = rel_path
+            if mat_name in WEIGHT_MAPPED_MATERIALS:
+                # weight maps are found by name in the material's texture folder
+                rel_path = os.path.join(tex_dir, f"{mat_name}_WeightMap.png")
+                seed += 1
+                save_texture(os.path.join(folder, rel_path), "WEIGHTMAP", size, seed)
+                physics_mesh_json = physics_json.setdefault(obj_name, copy.deepcopy(params.JSON_PHYSICS_MESH))
+                physics_mat_json = copy.deepcopy(params.JSON_PHYSICS_MATERIAL)
+                physics_mat_json["Weight Map Path"] = rel_path
+                physics_mesh_json["Materials"][mat_name] = physics_mat_json
+
+    jsonutils.write_json(json_data, os.path.join(folder, name + ".json"))
+
+
+def remove_generated(objects, arm):
+    for obj in objects:
+        mesh = obj.data
+        materials = [ mat for mat in mesh.materials if mat ]
+        bpy.data.objects.remove(obj)
+        bpy.data.meshes.remove(mesh)
+        for mat in materials:
+            bpy.data.materials.remove(mat)
+    arm_data = arm.data
+    bpy.data.objects.remove(arm)
+    bpy.data.armatures.remove(arm_data)
+
+
+def generate_character(folder, config = None):
+    """Generates the character (fbx, json and textures) in folder and removes it from the scene again.
+       Returns the fbx path."""
+    config = dict(CONFIG, **(config or {}))
+    os.makedirs(folder, exist_ok = True)
+    fbx_path = os.path.join(folder, config["name"] + ".fbx")
+
+    if bpy.context.object and bpy.context.object.mode != "OBJECT":
+        bpy.ops.object.mode_set(mode = "OBJECT")
+    bones = get_bones()
+    arm = build_armature(config["name"], bones)
+    objects = build_meshes(arm, bones, config)
+
+    bpy.ops.object.select_all(action = "DESELECT")
+    for obj in objects + [arm]:
+        obj.select_set(True)
+    bpy.context.view_layer.objects.active = arm
+    bpy.ops.export_scene.fbx(filepath = fbx_path, use_selection = True,
+                             object_types = {"ARMATURE", "MESH"},
+                             add_leaf_bones = False, bake_anim = False,
+                             use_armature_deform_only = False)
+    write_character_files(folder, config, objects)
+    remove_generated(objects, arm)
+    return fbx_path
+
+
+def main(argv):
+    import argparse
+    parser = argparse.ArgumentParser(description = "Generates a synthetic CC3+ character (fbx, json sidecar and textures).")
+    parser.add_argument("--output", required = True, help = "folder to generate the character in")
+    for key, value in CONFIG.items():
+        parser.add_argument("--" + key.replace("_", "-"), type = type(value), default = value)
+    args = parser.parse_args(argv)
+    enable_addon()
+    config = { key: getattr(args, key) for key in CONFIG.keys() }
+    print(f"Generated: {generate_character(args.output, config)}")
+    return 0
+
+
+if __name__ == "__main__":
+    argv = sys.argv[sys.argv.index("--") + 1:] if "--" in sys.argv else []
+    sys.exit(main(argv))
@@ -729,6 +729,6 @@ def find_accessory_bones(bone_mappings, rig):
         bone_name = bone.name
         if not bone_mapping_contains_bone(bone_mappings, bone_name):
             if bone_name not in accessory_bones and not bone_parent_in_list(accessory_bones, bone):
-                utils.log_info(f"Accessory Bone: {bone_name}")
+                utils.log_info("Accessory Bone: %s", bone_name)
                 accessory_bones.append(bone_name)
     return accessory_bones
\ No newline at end of file
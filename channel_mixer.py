@@ -235,13 +235,11 @@ def apply_mixer(mixer, mixer_node):
     for param in MIXER_PARAMS:
         socket = param[0]
         prop = param[1]
-        eval_code = ""
         try:
-            eval_code = f"mixer.{prop}"
-            value = eval(eval_code, None, locals())
+            value = getattr(mixer, prop)
             nodeutils.set_node_input(mixer_node, socket, value)
         except:
-            utils.log_error("Unable to evaluate: " + eval_code)
+            utils.log_error(f"Unable to evaluate: mixer.{prop}")
         nodeutils.set_node_input(mixer_node, "Mask Color", mixer.mask)
         nodeutils.set_node_input(mixer_node, "Id Color", mixer.mask)
 
@@ -269,7 +267,7 @@ def connect_mixers(chr_cache, mat, mixer_nodes, rgb_image_node, id_image_node, m
     mat_cache = chr_cache.get_material_cache(mat)
     shader = params.get_shader_name(mat_cache)
     bsdf_node, shader_node, mix_node = nodeutils.get_shader_nodes(mat, shader)
-    output_node = nodeutils.find_node_by_type(nodes, "OUTPUT_MATERIAL")
+    output_node = nodeutils.get_output_node(nodes)
     # daisy chain and position the mixers from the shader_node > mixers > bsdf_node
     mixer_nodes.append(bsdf_node)
     left_node = shader_node
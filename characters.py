@@ -19,7 +19,7 @@ import re
 import mathutils
 import os
 
-from . import materials, modifiers, meshutils, bones, shaders, nodeutils, utils, vars
+from . import materials, modifiers, meshutils, bones, shaders, nodeutils, properties, utils, vars
 
 
 def get_character_objects(arm):
@@ -202,6 +202,7 @@ def convert_generic_to_non_standard(objects, file_path = None):
         name = utils.strip_name(full_name)
         dir = ""
 
+    properties.clear_cache_index()
     chr_cache = props.import_cache.add()
     chr_cache.import_file = ""
     chr_cache.import_type = ext[1:]
@@ -361,7 +362,7 @@ def make_accessory(chr_cache, objects):
     for obj in objects:
         obj_cache = chr_cache.get_object_cache(obj)
         if not obj_cache:
-            utils.log_info(f"Adding {obj.name} to character.")
+            utils.log_info("Adding %s to character.", obj.name)
             add_object_to_character(chr_cache, obj, True)
             obj_cache = chr_cache.get_object_cache(obj)
         else:
@@ -380,7 +381,7 @@ def make_accessory(chr_cache, objects):
                 root_head = rig.matrix_world.inverted() @ bpy.context.scene.cursor.location
                 root_tail = rig.matrix_world.inverted() @ (bpy.context.scene.cursor.location + mathutils.Vector((0, 1/4, 0)))
                 piv_tail = rig.matrix_world.inverted() @ (bpy.context.scene.cursor.location + mathutils.Vector((0, 1/10000, 0)))
-                utils.log_info(f"Adding accessory root bone: {accessory_root.name}/({root_head})")
+                utils.log_info("Adding accessory root bone: %s/(%s)", accessory_root.name, root_head)
                 accessory_root.head = root_head
                 accessory_root.tail = root_tail
 
@@ -394,7 +395,7 @@ def make_accessory(chr_cache, objects):
                         obj_bone = rig.data.edit_bones.new(obj.name)
                         obj_head = rig.matrix_world.inverted() @ (obj.matrix_world @ mathutils.Vector((0, 0, 0)))
                         obj_tail = rig.matrix_world.inverted() @ ((obj.matrix_world @ mathutils.Vector((0, 0, 0))) + mathutils.Vector((0, 1/8, 0)))
-                        utils.log_info(f"Adding object bone: {obj_bone.name}/({obj_head})")
+                        utils.log_info("Adding object bone: %s/(%s)", obj_bone.name, obj_head)
                         obj_bone.head = obj_head
                         obj_bone.tail = obj_tail
 
@@ -407,7 +408,7 @@ def make_accessory(chr_cache, objects):
 
                         # add deformation bone to rig
                         def_bone = rig.data.edit_bones.new(obj.name)
-                        utils.log_info(f"Adding deformation bone: {def_bone.name}/({obj_head})")
+                        utils.log_info("Adding deformation bone: %s/(%s)", def_bone.name, obj_head)
                         def_head = rig.matrix_world.inverted() @ ((obj.matrix_world @ mathutils.Vector((0, 0, 0))) + mathutils.Vector((0, 1/32, 0)))
                         def_tail = rig.matrix_world.inverted() @ ((obj.matrix_world @ mathutils.Vector((0, 0, 0))) + mathutils.Vector((0, 1/32 + 1/16, 0)))
                         def_bone.head = def_head
@@ -436,10 +437,10 @@ def make_accessory(chr_cache, objects):
                             parent_bone = obj_data[obj_parent]["bone"]
                         # parent the bone
                         if parent_bone:
-                            utils.log_info(f"Parenting {obj.name} to {parent_bone.name}")
+                            utils.log_info("Parenting %s to %s", obj.name, parent_bone.name)
                             obj_bone.parent = parent_bone
                         else:
-                            utils.log_info(f"Parenting {obj.name} to {accessory_root.name}")
+                            utils.log_info("Parenting %s to %s", obj.name, accessory_root.name)
                             obj_bone.parent = accessory_root
 
         # object mode to save new bones
@@ -485,11 +486,11 @@ def clean_up_character_data(chr_cache):
                     # but not currently attached to the character
                     if obj_cache.object not in current_objects:
                         unparented_objects.append(obj_cache.object)
-                        utils.log_info(f"Keeping unparented Object data: {obj_cache.object.name}")
+                        utils.log_info("Keeping unparented Object data: %s", obj_cache.object.name)
                         for mat in obj_cache.object.data.materials:
                             if mat and mat not in unparented_materials:
                                 unparented_materials.append(mat)
-                                utils.log_info(f"Keeping unparented Material data: {mat.name}")
+                                utils.log_info("Keeping unparented Material data: %s", mat.name)
 
                 else:
 
@@ -602,7 +603,7 @@ def convert_to_rl_pbr(mat, mat_cache):
         if n.type == "BSDF_PRINCIPLED":
 
             if not bsdf_node:
-                utils.log_info("Found BSDF: " + n.name)
+                utils.log_info("Found BSDF: %s", n.name)
                 bsdf_node = n
             else:
                 too_complex = True
@@ -610,7 +611,7 @@ def convert_to_rl_pbr(mat, mat_cache):
         elif n.type == "GROUP" and n.node_tree and shader_name in n.name and vars.VERSION_STRING in n.node_tree.name:
 
             if not group_node:
-                utils.log_info("Found Shader Node: " + n.name)
+                utils.log_info("Found Shader Node: %s", n.name)
                 group_node = n
             else:
                 too_complex = True
@@ -751,7 +752,7 @@ def convert_to_rl_pbr(mat, mat_cache):
         strength_prop = linked_info[3]
         nodeutils.link_nodes(links, linked_node, linked_socket, group_node, socket_name)
         if strength_prop:
-            utils.log_info(f"setting {strength_prop} = {strength}")
+            utils.log_info("setting %s = %s", strength_prop, strength)
             shaders.exec_prop(strength_prop, mat_cache, strength)
 
     if bsdf_node and group_node and mat_cache:
@@ -917,7 +918,7 @@ def match_materials(chr_cache):
         # also accurig uses the *mesh* names, not the object names.
         mesh_source_name = utils.strip_name(obj.data.name)
 
-        utils.log_info(f"Mesh: {obj.name} / {mesh_source_name}")
+        utils.log_info("Mesh: %s / %s", obj.name, mesh_source_name)
         utils.log_indent()
 
         for slot in obj.material_slots:
@@ -939,7 +940,7 @@ def match_materials(chr_cache):
                     existing_obj not in chr_objects and
                     existing_obj.type == "MESH"):
 
-                    utils.log_info(f"Existing mesh match: {existing_obj.name} / {existing_mesh_source_name}")
+                    utils.log_info("Existing mesh match: %s / %s", existing_obj.name, existing_mesh_source_name)
 
                     for existing_mat in existing_obj.data.materials:
 
@@ -947,7 +948,7 @@ def match_materials(chr_cache):
                         existing_mat_source_name = utils.safe_export_name(existing_mat.name, True)
 
                         if existing_mat_source_name == mat_source_name:
-                            utils.log_info(f"Assigning existing object / material: {existing_mat.name}")
+                            utils.log_info("Assigning existing object / material: %s", existing_mat.name)
                             slot.material = existing_mat
                             slot_assigned = True
                             assigned_mat = existing_mat
@@ -962,7 +963,7 @@ def match_materials(chr_cache):
                     if existing_mat not in chr_materials:
                         existing_mat_source_name = utils.safe_export_name(existing_mat.name, True)
                         if existing_mat_source_name == mat_source_name:
-                            utils.log_info(f"Assigning existing material: {existing_mat.name}")
+                            utils.log_info("Assigning existing material: %s", existing_mat.name)
                             slot.material = existing_mat
                             slot_assigned = True
                             assigned_mat = existing_mat
@@ -22,7 +22,6 @@ import mathutils
 import math
 
 import bpy
-from filecmp import cmp
 
 from . import bake, shaders, physics, rigging, bones, modifiers, meshutils, nodeutils, imageutils, jsonutils, utils, params, vars
 
@@ -135,8 +134,16 @@ def rescale_for_unity(chr_cache, objects):
             bpy.ops.object.transform_apply(location = False, rotation = False, scale = True, properties = False)
 
 
+@utils.profiled("prep_export")
 def prep_export(chr_cache, new_name, objects, json_data, old_path, new_path,
                 copy_textures, revert_duplicates, apply_fixes, as_blend_file, bake_values):
+    with utils.image_path_index():
+        return prep_export_character(chr_cache, new_name, objects, json_data, old_path, new_path,
+                                     copy_textures, revert_duplicates, apply_fixes, as_blend_file, bake_values)
+
+
+def prep_export_character(chr_cache, new_name, objects, json_data, old_path, new_path,
+                          copy_textures, revert_duplicates, apply_fixes, as_blend_file, bake_values):
     prefs = bpy.context.preferences.addons[__name__.partition(".")[0]].preferences
 
     if as_blend_file:
@@ -145,7 +152,7 @@ def prep_export(chr_cache, new_name, objects, json_data, old_path, new_path,
             arm = utils.get_armature_in_objects(objects)
             for obj in bpy.data.objects:
                 if not (obj == arm or obj.parent == arm or chr_cache.has_object(obj)):
-                    utils.log_info(f"Removing {obj.name} from blend file")
+                    utils.log_info("Removing %s from blend file", obj.name)
                     bpy.data.objects.remove(obj)
 
     if not chr_cache or not json_data:
@@ -248,7 +255,7 @@ def prep_export(chr_cache, new_name, objects, json_data, old_path, new_path,
         if chr_cache.collision_body == obj:
             continue
 
-        utils.log_info(f"Obejct: {obj.name}")
+        utils.log_info("Obejct: %s", obj.name)
         utils.log_indent()
 
         obj_name = obj.name
@@ -274,12 +281,12 @@ def prep_export(chr_cache, new_name, objects, json_data, old_path, new_path,
             new_obj_name = obj_safe_name
             if is_new_object or source_changed:
                 new_obj_name = utils.make_unique_name(obj_safe_name, bpy.data.objects.keys())
-            utils.log_info(f"Using new safe Object & Mesh name: {obj_name} to {new_obj_name}")
+            utils.log_info("Using new safe Object & Mesh name: %s to %s", obj_name, new_obj_name)
             if source_changed:
                 if jsonutils.rename_json_key(chr_json["Meshes"], obj_source_name, new_obj_name):
-                    utils.log_info(f"Updating Object source json name: {obj_source_name} to {new_obj_name}")
+                    utils.log_info("Updating Object source json name: %s to %s", obj_source_name, new_obj_name)
                 if physics_json and jsonutils.rename_json_key(physics_json, obj_source_name, new_obj_name):
-                    utils.log_info(f"Updating Physics Object source json name: {obj_source_name} to {new_obj_name}")
+                    utils.log_info("Updating Physics Object source json name: %s to %s", obj_source_name, new_obj_name)
             obj.name = new_obj_name
             obj.name = new_obj_name
             obj.data.name = new_obj_name
@@ -292,11 +299,11 @@ def prep_export(chr_cache, new_name, objects, json_data, old_path, new_path,
         obj_json = jsonutils.get_object_json(chr_json, obj)
         physics_mesh_json = jsonutils.get_physics_mesh_json(physics_json, obj)
         if not obj_json:
-            utils.log_info(f"Adding Object Json: {obj_name}")
+            utils.log_info("Adding Object Json: %s", obj_name)
             obj_json = copy.deepcopy(params.JSON_MESH_DATA)
             chr_json["Meshes"][obj_name] = obj_json
         if not physics_mesh_json and obj_cache and obj_cache.cloth_physics == "ON":
-            utils.log_info(f"Adding Physics Object Json: {obj_name}")
+            utils.log_info("Adding Physics Object Json: %s", obj_name)
             physics_mesh_json = copy.deepcopy(params.JSON_PHYSICS_MESH)
             physics_json[obj_name] = physics_mesh_json
 
@@ -307,7 +314,7 @@ def prep_export(chr_cache, new_name, objects, json_data, old_path, new_path,
             source_changed = False
             new_material = False
 
-            utils.log_info(f"Material: {mat.name}")
+            utils.log_info("Material: %s", mat.name)
             utils.log_indent()
 
             if mat.name not in mats_processed.keys():
@@ -333,12 +340,12 @@ def prep_export(chr_cache, new_name, objects, json_data, old_path, new_path,
                 new_mat_name = mat_safe_name
                 if new_material or source_changed:
                     new_mat_name = utils.make_unique_name(mat_safe_name, bpy.data.materials.keys())
-                utils.log_info(f"Using new safe Material name: {mat_name} to {new_mat_name}")
+                utils.log_info("Using new safe Material name: %s to %s", mat_name, new_mat_name)
                 if source_changed:
                     if jsonutils.rename_json_key(obj_json["Materials"], mat_source_name, new_mat_name):
-                        utils.log_info(f"Updating material json name: {mat_source_name} to {new_mat_name}")
+                        utils.log_info("Updating material json name: %s to %s", mat_source_name, new_mat_name)
                     if physics_mesh_json and jsonutils.rename_json_key(physics_mesh_json["Materials"], mat_source_name, new_mat_name):
-                        utils.log_info(f"Updating physics material json name: {mat_source_name} to {new_mat_name}")
+                        utils.log_info("Updating physics material json name: %s to %s", mat_source_name, new_mat_name)
                 mat.name = new_mat_name
                 mat.name = new_mat_name
                 mat_name = new_mat_name
@@ -357,7 +364,7 @@ def prep_export(chr_cache, new_name, objects, json_data, old_path, new_path,
             if mat_cache and not mat_json:
                 shader_name = params.get_shader_name(mat_cache)
                 json_template = params.get_mat_shader_template(mat_cache)
-                utils.log_info(f"Adding Material Json: {mat_name} for Shader: {shader_name}")
+                utils.log_info("Adding Material Json: %s for Shader: %s", mat_name, shader_name)
                 if json_template:
                     mat_json = copy.deepcopy(json_template)
                     obj_json["Materials"][mat_safe_name] = mat_json
@@ -366,7 +373,7 @@ def prep_export(chr_cache, new_name, objects, json_data, old_path, new_path,
 
             # fallback default to PBR material json data
             if not mat_json:
-                utils.log_info(f"Adding Default PBR Material Json: {mat_name}")
+                utils.log_info("Adding Default PBR Material Json: %s", mat_name)
                 mat_json = copy.deepcopy(params.JSON_PBR_MATERIAL)
                 obj_json["Materials"][mat_safe_name] = mat_json
                 write_json = True
@@ -398,12 +405,12 @@ def prep_export(chr_cache, new_name, objects, json_data, old_path, new_path,
                     if mat_count[mat_safe_name] > 1:
                         new_mat = mat_remap[mat_safe_name]
                         slot.material = new_mat
-                        utils.log_info("Replacing material: " + mat.name + " with " + new_mat.name)
+                        utils.log_info("Replacing material: %s with %s", mat.name, new_mat.name)
                         changes.append(["MATERIAL_SLOT_REPLACE", slot, mat])
                         mat = new_mat
                         mat_name = new_mat.name
                     if mat_name != mat_safe_name:
-                        utils.log_info(f"Reverting material name: {mat_name} to {mat_safe_name}")
+                        utils.log_info("Reverting material name: %s to %s", mat_name, mat_safe_name)
                         mat.name = mat_safe_name
                         mat.name = mat_safe_name
                 utils.log_recess()
@@ -455,6 +462,8 @@ def prep_export(chr_cache, new_name, objects, json_data, old_path, new_path,
                     bone.roll = 0
                     utils.set_mode("OBJECT")
 
+    utils.save_md5_cache()
+
     # as the baking system can deselect everything, reselect the export objects here.
     utils.try_select_objects(objects, True)
     return changes
@@ -474,7 +483,7 @@ def remap_texture_path(tex_info, path_key, old_path, new_path, mat_data):
                 abs_path = os.path.normpath(os.path.join(old_path, tex_path))
             rel_path = utils.relpath(abs_path, new_path)
             tex_info[path_key] = os.path.normpath(rel_path)
-            utils.log_info(f"Remapping JSON texture path to: {tex_info[path_key]}")
+            utils.log_info("Remapping JSON texture path to: %s", tex_info[path_key])
     return
 
 
@@ -517,7 +526,7 @@ def copy_and_update_texture_path(tex_info, path_key, old_path, new_path, old_nam
                 new_abs_path = os.path.normpath(os.path.join(new_path, rel_tex_path))
                 new_rel_path = os.path.normpath(utils.relpath(new_abs_path, new_path))
 
-                utils.log_info(f"Remapping JSON texture path to: {new_rel_path}")
+                utils.log_info("Remapping JSON texture path to: %s", new_rel_path)
 
             else:
 
@@ -527,12 +536,12 @@ def copy_and_update_texture_path(tex_info, path_key, old_path, new_path, old_nam
                 new_rel_path = os.path.normpath(os.path.join(extras_dir, file))
                 new_abs_path = os.path.normpath(os.path.join(new_path, new_rel_path))
 
-                utils.log_info(f"Setting JSON texture path to: {new_rel_path}")
+                utils.log_info("Setting JSON texture path to: %s", new_rel_path)
 
             copy_file = False
             if os.path.exists(old_abs_path):
                 if os.path.exists(new_abs_path):
-                    if not cmp(old_abs_path, new_abs_path):
+                    if not utils.is_same_file_contents(old_abs_path, new_abs_path):
                         copy_file = True
                 else:
                     copy_file = True
@@ -542,8 +551,8 @@ def copy_and_update_texture_path(tex_info, path_key, old_path, new_path, old_nam
                 dir_path = os.path.dirname(new_abs_path)
                 os.makedirs(dir_path, exist_ok=True)
                 # copy the texture
-                utils.log_info(f"Copying texture: {old_abs_path}")
-                utils.log_info(f"             to: {new_abs_path}")
+                utils.log_info("Copying texture: %s", old_abs_path)
+                utils.log_info("             to: %s", new_abs_path)
                 shutil.copyfile(old_abs_path, new_abs_path)
 
             # update the json texture path with the new relative path
@@ -554,17 +563,15 @@ def copy_and_update_texture_path(tex_info, path_key, old_path, new_path, old_nam
                 # if the original path and new path are different
                 if os.path.normpath(old_abs_path) != os.path.normpath(new_abs_path):
                     image : bpy.types.Image
-                    for image in bpy.data.images:
-                        # for each image not already copied
-                        if image and image.filepath and image not in images_copied:
-                            image_file_path = bpy.path.abspath(image.filepath)
-                            if os.path.exists(image_file_path):
-                                # if this is the image specified in the json path
-                                if os.path.samefile(image_file_path, old_abs_path):
-                                    utils.log_info(f"Updating .blend Image: {image.name}")
-                                    utils.log_info(f"                   to: {new_abs_path}")
-                                    image.filepath = new_abs_path
-                                    images_copied.append(image)
+                    # for each image specified in the json path
+                    for image in utils.find_images_by_path(old_abs_path):
+                        # not already copied
+                        if image not in images_copied:
+                            utils.log_info("Updating .blend Image: %s", image.name)
+                            utils.log_info("                   to: %s", new_abs_path)
+                            image.filepath = new_abs_path
+                            utils.reindex_image_path(image, old_abs_path)
+                            images_copied.append(image)
 
 
 def restore_export(export_changes : list):
@@ -592,9 +599,8 @@ def restore_export(export_changes : list):
 
 
 def get_prop_value(mat_cache, prop_name, default):
-    parameters = mat_cache.parameters
     try:
-        return eval("parameters." + prop_name, None, locals())
+        return getattr(mat_cache.parameters, prop_name)
     except:
         return default
 
@@ -743,7 +749,7 @@ def write_back_textures(mat_json : dict, mat, mat_cache, base_path, old_name, ba
                     if tex_type in mat_data.keys():
                         processed_image = mat_data[tex_type]
                         if processed_image:
-                            utils.log_info(f"Resusing already processed material image: {processed_image.name}")
+                            utils.log_info("Resusing already processed material image: %s", processed_image.name)
 
                     if tex_node or bake_shader_output:
 
@@ -794,7 +800,7 @@ def write_back_textures(mat_json : dict, mat, mat_cache, base_path, old_name, ba
                                 abs_image_path = image_data["old_path"]
 
                                 tex_info["Texture Path"] = abs_image_path
-                                utils.log_info(f"{mat.name}/{tex_id}: Source texture path: {abs_image_path}")
+                                utils.log_info("%s/%s: Source texture path: %s", mat.name, tex_id, abs_image_path)
 
             mat_data["write_back"] = True
 
@@ -820,7 +826,7 @@ def write_back_physics_weightmap(physics_mat_json : dict, obj, mat, mat_cache, b
         if image.filepath:
             abs_image_path = bpy.path.abspath(image.filepath)
             if abs_image_path:
-                utils.log_info(f"{mat.name}: Using new weight map texture path: {abs_image_path}")
+                utils.log_info("%s: Using new weight map texture path: %s", mat.name, abs_image_path)
                 physics_mat_json["Weight Map Path"] = abs_image_path
 
 
@@ -857,12 +863,14 @@ def try_unpack_image(image, folder, index_suffix = False):
                 name = root + "_" + str(UNPACK_INDEX) + ext
                 UNPACK_INDEX += 1
             image_path = os.path.join(folder, name)
-            utils.log_info(f"Unpacking image: {name}")
+            utils.log_info("Unpacking image: %s", name)
             if not os.path.exists(folder):
                 os.makedirs(folder)
+            old_path = bpy.path.abspath(image.filepath)
             image.unpack(method = "REMOVE")
             image.filepath_raw = image_path
             image.save()
+            utils.reindex_image_path(image, old_path)
             return True
     except:
         utils.log_warn(f"Unable to unpack image: {name}")
@@ -879,7 +887,7 @@ def unpack_embedded_textures(chr_cache, chr_json, objects, base_path):
         unpack_folder = os.path.join(base_path, "textures", "Unpack")
 
     if unpack_folder:
-        utils.log_info(f"Unpacking embedded textures to: {unpack_folder}")
+        utils.log_info("Unpacking embedded textures to: %s", unpack_folder)
         if not os.path.exists(unpack_folder):
             os.makedirs(unpack_folder, exist_ok=True)
 
@@ -922,7 +930,7 @@ def unpack_embedded_textures(chr_cache, chr_json, objects, base_path):
 
                                         if tex_info:
                                             tex_info["Texture Path"] = abs_image_path
-                                            utils.log_info(f"Updating embedded image Json data: {abs_image_path}")
+                                            utils.log_info("Updating embedded image Json data: %s", abs_image_path)
                                 except:
                                     utils.log_warn(f"Unable to update embedded image Json: {image.name}")
 
@@ -964,11 +972,11 @@ def get_export_objects(chr_cache, include_selected = True):
             arm.hide_set(False)
             if arm not in objects:
                 objects.append(arm)
-            utils.log_info(f"Character Armature: {arm.name}")
+            utils.log_info("Character Armature: %s", arm.name)
             for obj in arm.children:
                 if utils.object_exists_is_mesh(obj): # and obj.visible_get():
                     if obj not in objects:
-                        utils.log_info(f"   Including Object: {obj.name}")
+                        utils.log_info("   Including Object: %s", obj.name)
                         objects.append(obj)
     return objects
 
@@ -1051,7 +1059,7 @@ def create_T_pose_action(arm, objects, export_strips):
 
     # push T-Pose to NLA if exporting strips
     if export_strips:
-        utils.log_info(f"Adding {action.name} to NLA strips")
+        utils.log_info("Adding %s to NLA strips", action.name)
         if obj.animation_data is None:
             obj.animation_data_create()
         if len(obj.animation_data.nla_tracks) == 0:
@@ -1075,7 +1083,7 @@ def set_non_standard_generation(json_data, character_type, character_id):
         generation = "Creature"
     elif character_type == "PROP":
         generation = "Prop"
-    utils.log_info(f"Generation: {generation}")
+    utils.log_info("Generation: %s", generation)
     jsonutils.set_character_generation_json(json_data, character_id, generation)
 
 
@@ -1115,7 +1123,7 @@ def prep_non_standard_export(objects, dir, name, character_type):
     blend_path = utils.local_path()
     if blend_path:
         dir = blend_path
-    utils.log_info(f"Texture Root Dir: {dir}")
+    utils.log_info("Texture Root Dir: %s", dir)
 
     json_data = jsonutils.generate_character_json_data(name)
 
@@ -1132,11 +1140,11 @@ def prep_non_standard_export(objects, dir, name, character_type):
 
         if obj.type == "MESH" and obj not in done.keys():
 
-            utils.log_info(f"Adding Object Json: {obj.name}")
+            utils.log_info("Adding Object Json: %s", obj.name)
             export_name = utils.safe_export_name(obj.name)
 
             if export_name != obj.name:
-                utils.log_info(f"Updating Object name: {obj.name} to {export_name}")
+                utils.log_info("Updating Object name: %s to %s", obj.name, export_name)
                 obj.name = export_name
 
             mesh_json = copy.deepcopy(params.JSON_MESH_DATA)
@@ -1149,11 +1157,11 @@ def prep_non_standard_export(objects, dir, name, character_type):
 
                 if mat not in done.keys():
 
-                    utils.log_info(f"Adding Material Json: {mat.name}")
+                    utils.log_info("Adding Material Json: %s", mat.name)
 
                     export_name = utils.safe_export_name(mat.name, is_material=True)
                     if export_name != mat.name:
-                        utils.log_info(f"Updating Material name: {mat.name} to {export_name}")
+                        utils.log_info("Updating Material name: %s to %s", mat.name, export_name)
                         mat.name = export_name
 
                     mat_json = copy.deepcopy(params.JSON_PBR_MATERIAL)
@@ -1306,7 +1314,7 @@ def write_or_bake_tex_data_to_json(socket_mapping, mat, mat_json, bsdf_node, pat
             continue
 
         node, socket, bake_value, strength = socket_mapping[tex_id]
-        utils.log_info(f"Adding Texture Channel: {tex_id} strength - {strength}")
+        utils.log_info("Adding Texture Channel: %s strength - %s", tex_id, strength)
 
         tex_node = None
         image = None
@@ -1327,7 +1335,7 @@ def write_or_bake_tex_data_to_json(socket_mapping, mat, mat_json, bsdf_node, pat
         if image.filepath:
             abs_image_path = bpy.path.abspath(image.filepath)
             if abs_image_path:
-                utils.log_info(f"{mat.name}/{tex_id}: Using new texture path: {abs_image_path}")
+                utils.log_info("%s/%s: Using new texture path: %s", mat.name, tex_id, abs_image_path)
                 tex_info["Texture Path"] = abs_image_path
         if tex_node:
             location, rotation, scale = nodeutils.get_image_node_mapping(tex_node)
@@ -1483,7 +1491,7 @@ def export_arp(file_path, arm, objects):
         utils.log_info(f"Selecting all character objects.")
         utils.try_select_objects(objects, True)
         # make sure the armature is active
-        utils.log_info(f"Setting Armature: {arm.name} active")
+        utils.log_info("Setting Armature: %s active", arm.name)
         utils.set_active_object(arm)
         # invoke
         utils.log_info("Invoking ARP Export:")
@@ -1493,6 +1501,7 @@ def export_arp(file_path, arm, objects):
         return False
 
 
+@utils.profiled("export_standard")
 def export_standard(self, chr_cache, file_path, include_selected):
     """Exports standard character (not rigified) to CC3/4 with json data, texture paths are relative to source character, as an .fbx file.
     """
@@ -1604,6 +1613,7 @@ def export_standard(self, chr_cache, file_path, include_selected):
     utils.log_timer("Done Character Export.")
 
 
+@utils.profiled("export_non_standard")
 def export_non_standard(self, file_path, include_selected):
     """Exports non-standard character (unconverted and not rigified) to CC4 with json data and textures, as an .fbx file.
     """
@@ -1681,6 +1691,7 @@ def export_non_standard(self, file_path, include_selected):
     utils.log_timer("Done Non-standard Export.")
 
 
+@utils.profiled("export_to_unity")
 def export_to_unity(self, chr_cache, export_anim, file_path, include_selected):
     """Exports CC3/4 character (not rigified) for Unity with json data and textures,
        as either a .blend file or .fbx file.
@@ -1702,8 +1713,8 @@ def export_to_unity(self, chr_cache, export_anim, file_path, include_selected):
     dir, file = os.path.split(file_path)
     name, ext = os.path.splitext(file)
 
-    utils.log_info("Export to: " + file_path)
-    utils.log_info("Exporting as: " + ext)
+    utils.log_info("Export to: %s", file_path)
+    utils.log_info("Exporting as: %s", ext)
 
     json_data = chr_cache.get_json_data()
 
@@ -1793,6 +1804,7 @@ def export_to_unity(self, chr_cache, export_anim, file_path, include_selected):
     utils.log_timer("Done Character Export.")
 
 
+@utils.profiled("update_to_unity")
 def update_to_unity(chr_cache, export_anim, include_selected):
     props = bpy.context.scene.CC3ImportProps
     prefs = bpy.context.preferences.addons[__name__.partition(".")[0]].preferences
@@ -1867,6 +1879,7 @@ def update_to_unity(chr_cache, export_anim, include_selected):
     utils.log_timer("Done Character Export.")
 
 
+@utils.profiled("export_rigify")
 def export_rigify(self, chr_cache, export_anim, file_path, include_selected):
     props = bpy.context.scene.CC3ImportProps
     prefs = bpy.context.preferences.addons[__name__.partition(".")[0]].preferences
@@ -1882,8 +1895,8 @@ def export_rigify(self, chr_cache, export_anim, file_path, include_selected):
     dir, file = os.path.split(file_path)
     name, ext = os.path.splitext(file)
 
-    utils.log_info("Export to: " + file_path)
-    utils.log_info("Exporting as: " + ext)
+    utils.log_info("Export to: %s", file_path)
+    utils.log_info("Exporting as: %s", ext)
 
     json_data = None
     include_textures = self.include_textures
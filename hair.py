@@ -14,8 +14,9 @@
 # You should have received a copy of the GNU General Public License
 # along with CC/iC Blender Tools.  If not, see <https://www.gnu.org/licenses/>.
 
-import bpy, bmesh, bpy_extras.mesh_utils
+import bpy, bpy_extras.mesh_utils
 import os, math
+import numpy
 from mathutils import Vector
 from . import utils, jsonutils, bones
 
@@ -116,7 +117,7 @@ def export_blender_hair(op, chr_cache, objects, base_path):
                         group = [obj]
                         name = obj.data.name
                         groups[name] = group
-                        utils.log_info(f"Group: {name}, Object: {obj.data.name}")
+                        utils.log_info("Group: %s, Object: %s", name, obj.data.name)
 
             elif prefs.hair_export_group_by == "NAME":
                 for obj in objects:
@@ -125,7 +126,7 @@ def export_blender_hair(op, chr_cache, objects, base_path):
                         if name not in groups.keys():
                             groups[name] = []
                         groups[name].append(obj)
-                        utils.log_info(f"Group: {name}, Object: {obj.data.name}")
+                        utils.log_info("Group: %s, Object: %s", name, obj.data.name)
 
             else: #prefs.hair_export_group_by == "NONE":
                 if "Hair" not in groups.keys():
@@ -133,7 +134,7 @@ def export_blender_hair(op, chr_cache, objects, base_path):
                 for obj in objects:
                     if obj.type == "CURVES" and obj.parent == parent:
                         groups["Hair"].append(obj)
-                        utils.log_info(f"Group: Hair, Object: {obj.data.name}")
+                        utils.log_info("Group: Hair, Object: %s", obj.data.name)
 
             for group_name in groups.keys():
                 file_name = f"{file}_{export_id}.abc"
@@ -189,207 +190,204 @@ def create_hair_curves():
 
 
 def add_poly_spline(points, curve):
-    """Create a poly curve from a list of Vectors
+    """Create a poly curve from an (N, 3) array of points
     """
     spline : bpy.types.Spline = curve.splines.new("POLY")
     spline.points.add(len(points) - 1)
-    for i in range(0, len(points)):
-        co = points[i]
-        spline.points[i].co = (co.x, co.y, co.z, 1.0)
+    co = numpy.ones((len(points), 4), dtype = numpy.float32)
+    co[:, :3] = points
+    spline.points.foreach_set("co", co.reshape(-1))
 
 
-def parse_island_recursive(bm, face_index, faces_left, island, face_map, vert_map):
-    """Recursive way to parse the UV islands.
-       Can run out of recursion calls on large meshes.
+def union_find_labels(num, a, b):
+    """Disjoint-set labelling of num elements joined by the pairs (a[i], b[i]).
+       Hooks roots to the smaller root and compresses paths by pointer jumping, all in numpy.
+       Returns the root label of each element.
     """
-    if face_index in faces_left:
-        faces_left.remove(face_index)
-        island.append(face_index)
-        for uv_id in face_map[face_index]:
-            connected_faces = vert_map[uv_id]
-            if connected_faces:
-                for cf in connected_faces:
-                    parse_island_recursive(bm, cf, faces_left, island, face_map, vert_map)
-
-
-def parse_island_non_recursive(bm, face_indices, faces_left, island, face_map, vert_map):
-    """Non recursive way to parse UV islands.
-       Connected faces expand the island each iteration.
-       A Set of all currently considered faces is maintained each iteration.
-       More memory intensive, but doesn't fail.
+    parent = numpy.arange(num, dtype = numpy.int64)
+    while True:
+        pa = parent[a]
+        pb = parent[b]
+        if numpy.array_equal(pa, pb):
+            break
+        m = numpy.minimum(pa, pb)
+        numpy.minimum.at(parent, pa, m)
+        numpy.minimum.at(parent, pb, m)
+        while True:
+            grand_parent = parent[parent]
+            if numpy.array_equal(grand_parent, parent):
+                break
+            parent = grand_parent
+    return parent
+
+
+def get_card_mesh_data(obj, uv_layer = None):
+    """Gathers the face, loop, edge, uv and world space vertex arrays of the hair card mesh in one bulk pass.
     """
-    levels = 0
-    while face_indices:
-        levels += 1
-        next_indices = set()
-        for face_index in face_indices:
-            faces_left.remove(face_index)
-            island.append(face_index)
-        for face_index in face_indices:
-            for uv_id in face_map[face_index]:
-                connected_faces = vert_map[uv_id]
-                if connected_faces:
-                    for cf_index in connected_faces:
-                        if cf_index not in island:
-                            next_indices.add(cf_index)
-        face_indices = next_indices
-
-
-def get_island_uv_map(bm, ul, island):
-    """Fetch the UV coords of each vertex in the UV/Mesh island.
-       Each island has a unique UV map so this must be called per island.
+    mesh = obj.data
+    if uv_layer is None:
+        uv_layer = mesh.uv_layers[0]
+
+    num_verts = len(mesh.vertices)
+    num_edges = len(mesh.edges)
+    num_faces = len(mesh.polygons)
+    num_loops = len(mesh.loops)
+
+    face_select = numpy.empty(num_faces, dtype = bool)
+    loop_starts = numpy.empty(num_faces, dtype = numpy.int64)
+    loop_totals = numpy.empty(num_faces, dtype = numpy.int64)
+    loop_verts = numpy.empty(num_loops, dtype = numpy.int64)
+    loop_edges = numpy.empty(num_loops, dtype = numpy.int64)
+    loop_uvs = numpy.empty(num_loops * 2, dtype = numpy.float32)
+    edge_verts = numpy.empty(num_edges * 2, dtype = numpy.int64)
+    co = numpy.empty(num_verts * 3, dtype = numpy.float64)
+    mesh.polygons.foreach_get("select", face_select)
+    mesh.polygons.foreach_get("loop_start", loop_starts)
+    mesh.polygons.foreach_get("loop_total", loop_totals)
+    mesh.loops.foreach_get("vertex_index", loop_verts)
+    mesh.loops.foreach_get("edge_index", loop_edges)
+    uv_layer.data.foreach_get("uv", loop_uvs)
+    mesh.edges.foreach_get("vertices", edge_verts)
+    mesh.vertices.foreach_get("co", co)
+
+    M = numpy.array(obj.matrix_world)
+    world_co = co.reshape(-1, 3) @ M[:3, :3].T + M[:3, 3]
+
+    return {
+        "face_select": face_select,
+        "loop_starts": loop_starts,
+        "loop_totals": loop_totals,
+        "loop_faces": numpy.repeat(numpy.arange(num_faces), loop_totals),
+        "loop_verts": loop_verts,
+        "loop_edges": loop_edges,
+        "loop_uvs": loop_uvs.reshape(-1, 2),
+        "edge_verts": edge_verts.reshape(-1, 2),
+        "world_co": world_co,
+    }
+
+
+def get_selected_islands(card_data):
+    """Returns the selected UV/Mesh islands as arrays of face indices.
+       Faces are connected when they share a loop with the same vertex and (rounded) UV coordinate.
     """
-    uv_map = {}
-    for face_index in island:
-        face = bm.faces[face_index]
-        for loop in face.loops:
-            uv_map[loop.vert.index] = loop[ul].uv
-    return uv_map
-
-
-def get_selected_islands(bm, ul):
-    face_map = {}
-    vert_map = {}
-    uv_map = {}
-
-    selected_faces = [f for f in bm.faces if f.select]
-
-    for face in selected_faces:
-        for loop in face.loops:
-            uv_id = loop[ul].uv.to_tuple(5), loop.vert.index
-            uv_map[loop.vert.index] = loop[ul].uv
-            if face.index not in face_map:
-                face_map[face.index] = set()
-            if uv_id not in vert_map:
-                vert_map[uv_id] = set()
-            face_map[face.index].add(uv_id)
-            vert_map[uv_id].add(face.index)
-
-    islands = []
-    faces_left = set(face_map.keys())
-
-    while len(faces_left) > 0:
-        current_island = []
-        face_index = list(faces_left)[0]
-        face_indices = set()
-        face_indices.add(face_index)
-        parse_island_non_recursive(bm, face_indices, faces_left, current_island, face_map, vert_map)
-        islands.append(current_island)
-
-    return islands
-
-
-def get_aligned_edges(bm, island, dir, uv_map):
-    prefs = bpy.context.preferences.addons[__name__.partition(".")[0]].preferences
+    face_select = card_data["face_select"]
+    loop_faces = card_data["loop_faces"]
+    num_faces = len(face_select)
+    if num_faces == 0:
+        return []
+
+    loop_mask = face_select[loop_faces]
+    loop_faces = loop_faces[loop_mask]
+    if len(loop_faces) == 0:
+        return []
+
+    # (rounded uv, vertex) key of each selected loop, numbered by sorting on the key columns
+    # (lexsort on the columns is much faster than numpy.unique(axis = 0) on the key rows)
+    uvs = numpy.round(card_data["loop_uvs"][loop_mask], 5)
+    verts = card_data["loop_verts"][loop_mask]
+    order = numpy.lexsort((uvs[:, 1], uvs[:, 0], verts))
+    new_key = numpy.ones(len(order), dtype = bool)
+    new_key[1:] = ((numpy.diff(verts[order]) != 0) |
+                   (numpy.diff(uvs[order, 0]) != 0) |
+                   (numpy.diff(uvs[order, 1]) != 0))
+    key_ids = numpy.empty(len(order), dtype = numpy.int64)
+    key_ids[order] = numpy.cumsum(new_key) - 1
+
+    # join each face to the first face of each of its keys
+    key_faces = numpy.full(key_ids.max() + 1, num_faces, dtype = numpy.int64)
+    numpy.minimum.at(key_faces, key_ids, loop_faces)
+    labels = union_find_labels(num_faces, loop_faces, key_faces[key_ids])
+
+    # group the selected faces by island label
+    selected_faces = numpy.nonzero(face_select)[0]
+    selected_labels = labels[selected_faces]
+    order = numpy.argsort(selected_labels, kind = "stable")
+    selected_faces = selected_faces[order]
+    selected_labels = selected_labels[order]
+    splits = numpy.nonzero(numpy.diff(selected_labels))[0] + 1
+    return numpy.split(selected_faces, splits)
+
+
+def get_island_loops(card_data, island):
+    """Returns the mesh loop indices of the faces in the island.
+    """
+    totals = card_data["loop_totals"][island]
+    offsets = numpy.cumsum(totals) - totals
+    return numpy.repeat(card_data["loop_starts"][island] - offsets, totals) + numpy.arange(totals.sum())
 
-    edge : bmesh.types.BMEdge
-    face : bmesh.types.BMFace
 
-    edges = set()
+def get_island_uv_map(card_data, island_loops):
+    """Fetch the UV coords of each vertex in the UV/Mesh island.
+       Each island has a unique UV map so this must be called per island.
+       Returns the island's vertex indices and an array of their UV coords, indexed locally.
+    """
+    island_verts, local_verts = numpy.unique(card_data["loop_verts"][island_loops], return_inverse = True)
+    uv_map = numpy.empty((len(island_verts), 2), dtype = numpy.float64)
+    # the last loop of each vertex sets its uv
+    uv_map[local_verts.reshape(-1)] = card_data["loop_uvs"][island_loops]
+    return island_verts, uv_map
 
-    for i in island:
-        face = bm.faces[i]
-        for edge in face.edges:
-            edges.add(edge.index)
 
-    aligned = set()
+def get_aligned_edges(card_data, island_loops, island_verts, dir, uv_map):
+    """Returns the island edges aligned with the card dir, as pairs of local vertex indices.
+    """
+    prefs = bpy.context.preferences.addons[__name__.partition(".")[0]].preferences
 
     DIR_THRESHOLD = prefs.hair_curve_dir_threshold
 
-    for e in edges:
-        edge = bm.edges[e]
-        uv0 = uv_map[edge.verts[0].index]
-        uv1 = uv_map[edge.verts[1].index]
-        V = Vector(uv1) - Vector(uv0)
-        V.normalize()
-        dot = dir.dot(V)
-        if abs(dot) >= DIR_THRESHOLD:
-            aligned.add(e)
-
-    return aligned
-
-
-def get_aligned_edge_map(bm, edges):
-    edge_map = {}
-    for e in edges:
-        edge = bm.edges[e]
-        for vert in edge.verts:
-            for linked_edge in vert.link_edges:
-                if linked_edge != edge and linked_edge.index in edges:
-                    if e not in edge_map:
-                        edge_map[e] = set()
-                    edge_map[e].add(linked_edge.index)
-    return edge_map
-
-
-def parse_loop(bm, edge_index, edges_left, loop, edge_map):
-    if edge_index in edges_left:
-        edges_left.remove(edge_index)
-        edge = bm.edges[edge_index]
-        loop.add(edge.verts[0].index)
-        loop.add(edge.verts[1].index)
-        if edge.index in edge_map:
-            for ce in edge_map[edge.index]:
-                parse_loop(bm, ce, edges_left, loop, edge_map)
-
-
-def sort_func_u(vert_uv_pair):
-    return vert_uv_pair[1].x
+    edges = numpy.unique(card_data["loop_edges"][island_loops])
+    edge_verts = numpy.searchsorted(island_verts, card_data["edge_verts"][edges])
+    V = uv_map[edge_verts[:, 1]] - uv_map[edge_verts[:, 0]]
+    length = numpy.linalg.norm(V, axis = 1)
+    dot = numpy.zeros(len(edges), dtype = numpy.float64)
+    valid = length > 0
+    dot[valid] = (V[valid] @ numpy.array((dir.x, dir.y))) / length[valid]
+    return edge_verts[numpy.abs(dot) >= DIR_THRESHOLD]
 
 
-def sort_func_v(vert_uv_pair):
-    return vert_uv_pair[1].y
+def get_ordered_vertex_loops(card_data, island_verts, aligned_edges, dir, uv_map):
+    """Separates the aligned edges into connected vertex loops, ordered along the card dir.
+       Returns a list of (N, 3) world space vertex position arrays.
+    """
+    if len(aligned_edges) == 0:
+        return []
 
+    # connected vertex loops from the aligned edges
+    labels = union_find_labels(len(island_verts), aligned_edges[:, 0], aligned_edges[:, 1])
+    loop_verts = numpy.unique(aligned_edges)
 
-def sort_verts_by_uv(obj, bm, loop, uv_map, dir):
-    sorted = []
-    for vert in loop:
-        uv = uv_map[vert]
-        sorted.append([vert, uv])
+    # order every loop by uv at once
     if dir.x > 0:
-        sorted.sort(reverse=False, key=sort_func_u)
+        key = uv_map[loop_verts, 0]
     elif dir.x < 0:
-        sorted.sort(reverse=True, key=sort_func_u)
+        key = -uv_map[loop_verts, 0]
     elif dir.y > 0:
-        sorted.sort(reverse=False, key=sort_func_v)
+        key = uv_map[loop_verts, 1]
     else:
-        sorted.sort(reverse=True, key=sort_func_v)
-    return [ obj.matrix_world @ bm.verts[v].co for v, uv in sorted]
-
-
-def get_ordered_vertex_loops(obj, bm, edges, dir, uv_map, edge_map):
-    edges_left = set(edges)
-    loops = []
-
-    # separate edges into vertex loops
-    while len(edges_left) > 0:
-        loop = set()
-        edge_index = list(edges_left)[0]
-        parse_loop(bm, edge_index, edges_left, loop, edge_map)
-        sorted = sort_verts_by_uv(obj, bm, loop, uv_map, dir)
-        loops.append(sorted)
+        key = -uv_map[loop_verts, 1]
+    loop_labels = labels[loop_verts]
+    order = numpy.lexsort((key, loop_labels))
+    loop_verts = loop_verts[order]
+    splits = numpy.nonzero(numpy.diff(loop_labels[order]))[0] + 1
 
-    return loops
+    world_co = card_data["world_co"][island_verts[loop_verts]]
+    return numpy.split(world_co, splits)
 
 
 def merge_loops(loops):
+    """Averages loops of the same length into a single loop.
+       Returns None if the loops differ in length.
+    """
+    if not loops:
+        return None
+
     size = len(loops[0])
 
     for loop in loops:
         if len(loop) != size:
             return None
 
-    num = len(loops)
-    loop = []
-
-    for i in range(0, size):
-        co = Vector((0,0,0))
-        for l in range(0, num):
-            co += loops[l][i]
-        co /= num
-        loop.append(co)
-
-    return loop
+    return numpy.mean(numpy.stack(loops), axis = 0)
 
 
 def selected_cards_to_loops(obj, card_dir : Vector, one_loop_per_card = True):
@@ -406,47 +404,39 @@ def selected_cards_to_loops(obj, card_dir : Vector, one_loop_per_card = True):
     # object mode to save edit changes
     utils.object_mode_to(obj)
 
-    # get the bmesh
-    mesh = obj.data
-    bm = bmesh.new()
-    bm.from_mesh(mesh)
-    bm.faces.ensure_lookup_table()
-    bm.edges.ensure_lookup_table()
-    bm.verts.ensure_lookup_table()
-    ul = bm.loops.layers.uv[0]
+    # gather the mesh arrays
+    card_data = get_card_mesh_data(obj)
 
-    # get lists of the faces in each selected island
-    islands = get_selected_islands(bm, ul)
+    # get arrays of the faces in each selected island
+    islands = get_selected_islands(card_data)
 
-    utils.log_info(f"{len(islands)} islands selected.")
+    utils.log_info("%s islands selected.", len(islands))
 
     all_loops = []
 
     for island in islands:
 
-        utils.log_info(f"Processing island, faces: {len(island)}")
+        utils.log_info("Processing island, faces: %s", len(island))
         utils.log_indent()
 
         # each island has a unique UV map
-        uv_map = get_island_uv_map(bm, ul, island)
+        island_loops = get_island_loops(card_data, island)
+        island_verts, uv_map = get_island_uv_map(card_data, island_loops)
 
         # get all edges aligned with the card dir in the island
-        edges = get_aligned_edges(bm, island, card_dir, uv_map)
-
-        utils.log_info(f"{len(edges)} aligned edges.")
+        edges = get_aligned_edges(card_data, island_loops, island_verts, card_dir, uv_map)
 
-        # map connected edges
-        edge_map = get_aligned_edge_map(bm, edges)
+        utils.log_info("%s aligned edges.", len(edges))
 
         # separate into ordered vertex loops
-        loops = get_ordered_vertex_loops(obj, bm, edges, card_dir, uv_map, edge_map)
+        loops = get_ordered_vertex_loops(card_data, island_verts, edges, card_dir, uv_map)
 
-        utils.log_info(f"{len(loops)} ordered loops.")
+        utils.log_info("%s ordered loops.", len(loops))
 
         # (merge and) generate poly curves
         if one_loop_per_card:
             loop = merge_loops(loops)
-            if loop:
+            if loop is not None:
                 all_loops.append(loop)
             else:
                 utils.log_info("Loops have differing lengths, skipping.")
@@ -456,14 +446,6 @@ def selected_cards_to_loops(obj, card_dir : Vector, one_loop_per_card = True):
 
         utils.log_recess()
 
-    #for face in bm.faces: face.select = False
-    #for edge in bm.edges: edge.select = False
-    #for vert in bm.verts: vert.select = False
-    #for e in edges:
-    #    bm.edges[e].select = True
-
-    bm.to_mesh(mesh)
-
     return all_loops
 
 
@@ -474,43 +456,41 @@ def selected_cards_to_curves(obj, card_dir : Vector, one_loop_per_card = True):
         add_poly_spline(loop, curve)
 
 
-def loop_length(loop):
-    p0 = loop[0]
-    d = 0
-    for i in range(1, len(loop)):
-        p1 = loop[i]
-        d += (p1 - p0).length
-        p0 = p1
-    return d
-
-
-def eval_loop_at(loop, length, fac):
-    p0 = loop[0]
-    f0 = 0
-    for i in range(1, len(loop)):
-        p1 = loop[i]
-        v = p1 - p0
-        fl = v.length / length
-        f1 = f0 + fl
-        if fac <= f1 and fac >= f0:
-            df = fac - f0
-            return p0 + v * (df / fl)
-        f0 = f1
-        p0 = p1
-        f1 += fl
-    return p0
-
-
-def loop_to_bones(arm, parent_bone, loop, loop_index, length, segments):
-    fac = 0
-    df = 1.0 / segments
+def get_loop_arc_lengths(loop):
+    """Returns the cumulative arc length at each point of the loop, starting at zero.
+    """
+    arc_lengths = numpy.zeros(len(loop), dtype = numpy.float64)
+    if len(loop) > 1:
+        numpy.cumsum(numpy.linalg.norm(numpy.diff(loop, axis = 0), axis = 1), out = arc_lengths[1:])
+    return arc_lengths
+
+
+def sample_loop(loop, arc_lengths, facs):
+    """Evaluates the loop at each fraction (0 to 1) of its arc length.
+       Returns an array of the sampled points.
+    """
+    facs = numpy.asarray(facs, dtype = numpy.float64)
+    if len(loop) < 2 or arc_lengths[-1] <= 0:
+        return numpy.repeat(loop[:1], len(facs), axis = 0)
+    distances = numpy.clip(facs, 0.0, 1.0) * arc_lengths[-1]
+    i = numpy.clip(numpy.searchsorted(arc_lengths, distances, side = "right") - 1, 0, len(loop) - 2)
+    segment_lengths = arc_lengths[i + 1] - arc_lengths[i]
+    t = numpy.zeros(len(facs), dtype = numpy.float64)
+    valid = segment_lengths > 0
+    t[valid] = (distances[valid] - arc_lengths[i][valid]) / segment_lengths[valid]
+    return loop[i] + (loop[i + 1] - loop[i]) * t[:, numpy.newaxis]
+
+
+def loop_to_bones(arm, parent_bone, loop, loop_index, arc_lengths, segments):
+    points = sample_loop(loop, arc_lengths, numpy.linspace(0.0, 1.0, segments + 1))
+    M = numpy.array(arm.matrix_world.inverted())
+    points = points @ M[:3, :3].T + M[:3, 3]
     for s in range(0, segments):
         bone_name = f"Hair_{loop_index}_{s}"
         bone = bones.new_edit_bone(arm, bone_name, parent_bone.name)
-        bone.head = arm.matrix_world.inverted() @ eval_loop_at(loop, length, fac)
-        bone.tail = arm.matrix_world.inverted() @ eval_loop_at(loop, length, fac + df)
+        bone.head = Vector(points[s])
+        bone.tail = Vector(points[s + 1])
         parent_bone = bone
-        fac += df
 
 
 def selected_cards_to_bones(arm, obj, card_dir : Vector, one_loop_per_card = True, bone_length = 0.05):
@@ -520,9 +500,9 @@ def selected_cards_to_bones(arm, obj, card_dir : Vector, one_loop_per_card = Tru
         loops = selected_cards_to_loops(obj, card_dir, one_loop_per_card)
         loop_index = 0
         for loop in loops:
-            length = loop_length(loop)
-            segments = round(length / bone_length)
-            loop_to_bones(arm, head_bone, loop, loop_index, length, segments)
+            arc_lengths = get_loop_arc_lengths(loop)
+            segments = round(arc_lengths[-1] / bone_length)
+            loop_to_bones(arm, head_bone, loop, loop_index, arc_lengths, segments)
             loop_index += 1
     utils.object_mode_to(arm)
 
@@ -33,57 +33,96 @@ def check_max_size(image):
 
 # load an image from a file, but try to find it in the existing images first
 def load_image(filename, color_space, processed_images = None):
+    """processed_images: optional dict of { md5: bpy.types.Image } used to de-duplicate images by content."""
 
     i: bpy.types.Image = None
     # TODO: should the de-duplication only consider images brough in from the import.
     #       (but then the rebuild won't work...)
     #       or only consider images with the characters folder as a common path...
-    for i in bpy.data.images:
-        if i.type == "IMAGE" and i.filepath != "":
-
-            if os.path.normpath(bpy.path.abspath(i.filepath)) == os.path.normpath(os.path.abspath(filename)):
-                utils.log_info("Using existing image: " + i.filepath)
-                found = False
-                image_md5 = None
-                image_path = bpy.path.abspath(i.filepath)
-                if processed_images is not None and os.path.exists(image_path):
-                    image_md5 = utils.md5sum(image_path)
-                    for p in processed_images:
-                        if p[0] == image_md5:
-                            utils.log_info("Skipping duplicate existing image, reusing: " + p[1].filepath)
-                            i = p[1]
-                            found = True
-                if i.depth == 32 and i.alpha_mode != "CHANNEL_PACKED":
-                    i.alpha_mode = "CHANNEL_PACKED"
-                if processed_images is not None and i and image_md5 and not found:
-                    processed_images.append([image_md5, i])
-                return i
+    existing_images = utils.find_images_by_path(os.path.abspath(filename))
+    if existing_images:
+        i = existing_images[0]
+        utils.log_info("Using existing image: %s", i.filepath)
+        image_path = bpy.path.abspath(i.filepath)
+        if processed_images is not None and os.path.exists(image_path):
+            image_md5 = utils.md5sum_cached(image_path)
+            if image_md5 in processed_images:
+                i = processed_images[image_md5]
+                utils.log_info("Skipping duplicate existing image, reusing: %s", i.filepath)
+            else:
+                processed_images[image_md5] = i
+        if i.depth == 32 and i.alpha_mode != "CHANNEL_PACKED":
+            i.alpha_mode = "CHANNEL_PACKED"
+        return i
 
     try:
         image_md5 = None
         if processed_images is not None and os.path.exists(filename):
-            image_md5 = utils.md5sum(filename)
-            for p in processed_images:
-                if p[0] == image_md5:
-                    utils.log_info("Skipping duplicate image, reusing: " + p[1].filepath)
-                    return p[1]
-        utils.log_info("Loading new image: " + filename)
+            image_md5 = utils.md5sum_cached(filename)
+            if image_md5 in processed_images:
+                image = processed_images[image_md5]
+                utils.log_info("Skipping duplicate image, reusing: %s", image.filepath)
+                return image
+        utils.log_info("Loading new image: %s", filename)
         image = bpy.data.images.load(filename)
         image.colorspace_settings.name = color_space
         if image.depth == 32:
             image.alpha_mode = "CHANNEL_PACKED"
+        utils.index_image_path(image)
         #check_max_size(image)
         if processed_images is not None and image and image_md5:
-            processed_images.append([image_md5, image])
+            processed_images[image_md5] = image
         return image
     except Exception as e:
         utils.log_error("Unable to load image: " + filename, e)
         return None
 
 
+# cached texture directory listings: { normpath(dir): { "mtime": mtime_ns, "files": [(lower_name, name)], "found": {} } }
+TEXTURE_DIR_INDEX = {}
+
+
+def clear_texture_dir_index():
+    TEXTURE_DIR_INDEX.clear()
+
+
+def get_texture_dir_index(dir):
+    """Returns the cached file listing of the texture directory,
+       re-reading it only when the directory has been modified.
+       Returns None if the directory does not exist."""
+    dir = os.path.normpath(dir)
+    try:
+        mtime = os.stat(dir).st_mtime_ns
+    except OSError:
+        TEXTURE_DIR_INDEX.pop(dir, None)
+        return None
+    dir_index = TEXTURE_DIR_INDEX.get(dir)
+    if dir_index is None or dir_index["mtime"] != mtime:
+        files = [ (file.lower(), file) for file in os.listdir(dir) ]
+        dir_index = { "mtime": mtime, "files": files, "found": {} }
+        TEXTURE_DIR_INDEX[dir] = dir_index
+    return dir_index
+
+
+def find_image_file_in_dir_index(dir_index, dir, material_name, texture_type):
+    found = dir_index["found"]
+    key = (material_name, texture_type)
+    if key not in found:
+        found[key] = None
+        searches = [ "_" + suffix + "." for suffix in get_image_type_suffix_list(texture_type) ]
+        for file_name, file in dir_index["files"]:
+            if file_name.startswith(material_name):
+                for search in searches:
+                    if search in file_name:
+                        found[key] = os.path.join(dir, file)
+                        break
+                if found[key]:
+                    break
+    return found[key]
+
+
 ## Search the directory for an image filename that contains the search substring
 def find_image_file(base_dir, dirs, mat, texture_type):
-    suffix_list = get_image_type_suffix_list(texture_type)
     material_name = utils.strip_name(mat.name).lower()
     last = ""
 
@@ -91,23 +130,21 @@ def find_image_file(base_dir, dirs, mat, texture_type):
 
         if dir:
 
+            dir_index = get_texture_dir_index(dir)
+
             # if the texture folder does not exist, (e.g. files have been moved)
             # remap the relative path to the current blend file directory to try and find the images there
-            if not os.path.exists(dir):
+            if dir_index is None:
                 dir = utils.local_repath(dir, base_dir)
+                dir_index = get_texture_dir_index(dir)
 
-            if os.path.exists(dir):
+            if dir_index is not None:
 
                 if last != dir and dir != "" and os.path.normpath(dir) != os.path.normpath(last):
                     last = dir
-                    files = os.listdir(dir)
-                    for file in files:
-                        file_name = file.lower()
-                        if file_name.startswith(material_name):
-                            for suffix in suffix_list:
-                                search = "_" + suffix + "."
-                                if search in file_name:
-                                    return os.path.join(dir, file)
+                    image_file = find_image_file_in_dir_index(dir_index, dir, material_name, texture_type)
+                    if image_file:
+                        return image_file
     return None
 
 
@@ -118,17 +155,11 @@ def is_image_type_srgb(texture_type):
 
 
 def get_image_type_suffix_list(texture_type):
-    for tex in params.TEXTURE_TYPES:
-        if tex[0] == texture_type:
-            return tex[2]
-    return []
+    return params.get_texture_suffix_list(texture_type)
 
 
 def get_image_type_json_id(texture_type):
-    for tex in params.TEXTURE_TYPES:
-        if tex[0] == texture_type:
-            return tex[1]
-    return None
+    return params.get_texture_json_id(texture_type)
 
 
 def search_image_in_material_dirs(chr_cache, mat_cache, mat, texture_type):
@@ -258,21 +289,23 @@ def get_custom_image(image_name, size, alpha = False, data = True, float = False
         if image.size[0] != size or image.size[1] != size:
             bpy.data.images.remove(image)
             image = None
-            utils.log_info(f"Deleting Custom image: {image_name}, wrong size.")
+            utils.log_info("Deleting Custom image: %s, wrong size.", image_name)
         else:
-            utils.log_info(f"Reusing Custom image: {image_name}")
+            utils.log_info("Reusing Custom image: %s", image_name)
 
     # or create the bake image
     if not image:
-        utils.log_info(f"Creating new Custom image: {image_name} {size}x{size}")
+        utils.log_info("Creating new Custom image: %s %sx%s", image_name, size, size)
         image = bpy.data.images.new(image_name, size, size, alpha=alpha, is_data=data, float_buffer=float)
 
     if float:
         image.use_half_precision = False
 
     if path:
+        old_path = bpy.path.abspath(image.filepath)
         image.filepath_raw = path
         image.save()
+        utils.reindex_image_path(image, old_path)
 
     return image
 
@@ -50,6 +50,7 @@ def delete_import(chr_cache):
     chr_cache.import_has_key = False
     chr_cache.import_key_file = ""
 
+    properties.clear_cache_index()
     chr_cache.tongue_material_cache.clear()
     chr_cache.teeth_material_cache.clear()
     chr_cache.head_material_cache.clear()
@@ -162,7 +163,7 @@ def process_object(chr_cache, obj : bpy.types.Object, objects_processed, chr_jso
     physics_json = None
 
     utils.log_info("")
-    utils.log_info("Processing Object: " + obj.name + ", Type: " + obj.type)
+    utils.log_info("Processing Object: %s, Type: %s", obj.name, obj.type)
     utils.log_indent()
 
     obj_cache = chr_cache.get_object_cache(obj)
@@ -177,17 +178,16 @@ def process_object(chr_cache, obj : bpy.types.Object, objects_processed, chr_jso
             mat = slot.material
             if mat and mat not in objects_processed:
                 utils.log_info("")
-                utils.log_info("Processing Material: " + mat.name)
+                utils.log_info("Processing Material: %s", mat.name)
                 utils.log_indent()
 
-                process_material(chr_cache, obj, mat, obj_json, processed_images)
+                with utils.profile_phase("process_material", material = mat.name):
+                    process_material(chr_cache, obj, mat, obj_json, processed_images)
                 if processed_materials is not None:
                     first = materials.find_duplicate_material(chr_cache, mat, processed_materials)
                     if first:
-                        utils.log_info(f"Found duplicate material, re-using {first.name} instead.")
+                        utils.log_info("Found duplicate material, re-using %s instead.", first.name)
                         slot.material = first
-                    else:
-                        processed_materials.append(mat)
 
                 utils.log_recess()
                 objects_processed.append(mat)
@@ -221,7 +221,7 @@ def cache_object_materials(chr_cache, obj, chr_json, processed):
 
     if obj.type == "MESH":
 
-        utils.log_info(f"Caching Object: {obj.name}")
+        utils.log_info("Caching Object: %s", obj.name)
         utils.log_indent()
 
         for mat in obj.data.materials:
@@ -318,7 +318,7 @@ def detect_generation(chr_cache, json_data):
             generation = "GameBase"
         elif utils.find_pose_bone_in_armature(arm, "CC_Base_L_Finger42", "L_Finger42"):
             generation = "G1"
-        utils.log_info(f"Generation could be: {generation} detected from pose bones.")
+        utils.log_info("Generation could be: %s detected from pose bones.", generation)
 
     if generation == "Unknown":
         for obj_cache in chr_cache.object_cache:
@@ -335,7 +335,7 @@ def detect_generation(chr_cache, json_data):
                     elif utils.object_has_material(obj, "skin_body"):
                         generation = "G1"
         if generation != "Unknown":
-            utils.log_info(f"Generation could be: {generation} detected from materials.")
+            utils.log_info("Generation could be: %s detected from materials.", generation)
 
     if generation == "Unknown" or generation == "G3":
 
@@ -387,7 +387,7 @@ def remap_action_names(actions, objects, name):
             new_obj_name = utils.get_action_shape_key_object_name(obj.name)
             if obj.data.shape_keys:
                 key_map[new_obj_name] = obj.data.shape_keys.name
-                utils.log_info(f"ShapeKey: {obj.data.shape_keys.name} belongs to: {new_obj_name}")
+                utils.log_info("ShapeKey: %s belongs to: %s", obj.data.shape_keys.name, new_obj_name)
                 num_keys += 1
 
     for action in actions:
@@ -399,7 +399,7 @@ def remap_action_names(actions, objects, name):
             new_action_name = "CCPose"
         if action.name.startswith("Armature"):
             new_name = f"{name}|A|{new_action_name}"
-            utils.log_info(f"Renaming action: {action.name} to {new_name}")
+            utils.log_info("Renaming action: %s to %s", action.name, new_name)
             action.name = new_name
             armature_actions.append(action)
         else:
@@ -407,7 +407,7 @@ def remap_action_names(actions, objects, name):
                 key_name = key_map[new_obj_name]
                 if action_key_name == key_name:
                     new_name = f"{name}|K|{new_obj_name}|{new_action_name}"
-                    utils.log_info(f"Renaming action: {action.name} to {new_name}")
+                    utils.log_info("Renaming action: %s to %s", action.name, new_name)
                     action.name = new_name
                     shapekey_actions.append(action)
 
@@ -435,12 +435,13 @@ def detect_character(file_path, objects, actions, json_data, warn):
         # try to override the import dir with the directory specified in the json
         import_dir = json_data[name]["Import_Dir"]
         import_name = json_data[name]["Import_Name"]
-        utils.log_info(f"Using original Import Dir: {import_dir}")
-        utils.log_info(f"Using original Import Name: {import_name}")
+        utils.log_info("Using original Import Dir: %s", import_dir)
+        utils.log_info("Using original Import Name: %s", import_name)
     except:
         pass
 
     chr_json = jsonutils.get_character_json(json_data, name)
+    properties.clear_cache_index()
     chr_cache = props.import_cache.add()
     chr_cache.import_file = file_path
     chr_cache.import_type = ext[1:]
@@ -510,7 +511,7 @@ def detect_character(file_path, objects, actions, json_data, warn):
 
         # determine character generation
         chr_cache.generation = detect_generation(chr_cache, json_data)
-        utils.log_info("Generation: " + chr_cache.character_name + " (" + chr_cache.generation + ")")
+        utils.log_info("Generation: %s (%s)", chr_cache.character_name, chr_cache.generation)
 
         # cache materials
         for obj_cache in chr_cache.object_cache:
@@ -606,121 +607,130 @@ class CC3Import(bpy.types.Operator):
     is_rl_character = False
 
 
+    @utils.profiled("import_character")
     def import_character(self, warn):
         props = bpy.context.scene.CC3ImportProps
         prefs = bpy.context.preferences.addons[__name__.partition(".")[0]].preferences
 
-        utils.start_timer()
+        timer_depth = utils.start_timer()
 
-        utils.log_info("")
-        utils.log_info("Importing Character Model:")
-        utils.log_info("--------------------------")
+        try:
+            utils.log_info("")
+            utils.log_info("Importing Character Model:")
+            utils.log_info("--------------------------")
 
-        self.detect_import_mode_from_files()
+            imageutils.clear_texture_dir_index()
 
-        import_anim = self.use_anim
+            self.detect_import_mode_from_files()
 
-        dir, file = os.path.split(self.filepath)
-        name, ext = os.path.splitext(file)
-        imported = None
-        actions = None
+            import_anim = self.use_anim
 
-        json_data = jsonutils.read_json(self.filepath)
+            dir, file = os.path.split(self.filepath)
+            name, ext = os.path.splitext(file)
+            imported = None
+            actions = None
 
-        if utils.is_file_ext(ext, "FBX"):
+            json_data = jsonutils.read_json(self.filepath)
 
-            # invoke the fbx importer
-            utils.tag_objects()
-            utils.tag_images()
-            utils.tag_actions()
-            bpy.ops.import_scene.fbx(filepath=self.filepath, directory=dir, use_anim=import_anim)
-            imported = utils.untagged_objects()
-            actions = utils.untagged_actions()
-            self.imported_images = utils.untagged_images()
+            if utils.is_file_ext(ext, "FBX"):
 
-            self.detect_import_mode_from_objects(imported)
+                # invoke the fbx importer
+                utils.tag_objects()
+                utils.tag_images()
+                utils.tag_actions()
+                bpy.ops.import_scene.fbx(filepath=self.filepath, directory=dir, use_anim=import_anim)
+                imported = utils.untagged_objects()
+                actions = utils.untagged_actions()
+                self.imported_images = utils.untagged_images()
 
-            # detect characters and objects
-            if self.is_rl_character:
-                self.imported_character = detect_character(self.filepath, imported, actions, json_data, warn)
-            elif prefs.import_auto_convert:
-                self.imported_characterer = characters.convert_generic_to_non_standard(imported, self.filepath)
+                self.detect_import_mode_from_objects(imported)
 
-            utils.log_timer("Done .Fbx Import.")
+                # detect characters and objects
+                if self.is_rl_character:
+                    self.imported_character = detect_character(self.filepath, imported, actions, json_data, warn)
+                elif prefs.import_auto_convert:
+                    self.imported_characterer = characters.convert_generic_to_non_standard(imported, self.filepath)
 
-        elif utils.is_file_ext(ext, "OBJ"):
+                utils.log_timer("Done .Fbx Import.")
 
-            # invoke the obj importer
-            utils.tag_objects()
-            utils.tag_images()
-            if self.is_rl_character and self.param == "IMPORT_MORPH":
-                bpy.ops.import_scene.obj(filepath = self.filepath, split_mode = "OFF",
-                        use_split_objects = False, use_split_groups = False,
-                        use_groups_as_vgroups = True)
-            else:
-                bpy.ops.import_scene.obj(filepath = self.filepath, split_mode = "ON",
-                        use_split_objects = True, use_split_groups = True,
-                        use_groups_as_vgroups = False)
+            elif utils.is_file_ext(ext, "OBJ"):
 
-            imported = utils.untagged_objects()
-            self.imported_images = utils.untagged_images()
+                # invoke the obj importer
+                utils.tag_objects()
+                utils.tag_images()
+                if self.is_rl_character and self.param == "IMPORT_MORPH":
+                    bpy.ops.import_scene.obj(filepath = self.filepath, split_mode = "OFF",
+                            use_split_objects = False, use_split_groups = False,
+                            use_groups_as_vgroups = True)
+                else:
+                    bpy.ops.import_scene.obj(filepath = self.filepath, split_mode = "ON",
+                            use_split_objects = True, use_split_groups = True,
+                            use_groups_as_vgroups = False)
 
-            # detect characters and objects
-            if self.is_rl_character:
-                self.imported_character = detect_character(self.filepath, imported, actions, json_data, warn)
-            elif prefs.import_auto_convert:
-                self.imported_characterer = characters.convert_generic_to_non_standard(imported, self.filepath)
+                imported = utils.untagged_objects()
+                self.imported_images = utils.untagged_images()
+
+                # detect characters and objects
+                if self.is_rl_character:
+                    self.imported_character = detect_character(self.filepath, imported, actions, json_data, warn)
+                elif prefs.import_auto_convert:
+                    self.imported_characterer = characters.convert_generic_to_non_standard(imported, self.filepath)
+
+                #if self.param == "IMPORT_MORPH":
+                #    if self.imported_character.get_tex_dir() != "":
+                #        reconstruct_obj_materials(obj)
+                #        pass
 
-            #if self.param == "IMPORT_MORPH":
-            #    if self.imported_character.get_tex_dir() != "":
-            #        reconstruct_obj_materials(obj)
-            #        pass
+                utils.log_timer("Done .Obj Import.")
 
-            utils.log_timer("Done .Obj Import.")
+            elif utils.is_file_ext(ext, "GLTF") or utils.is_file_ext(ext, "GLB"):
 
-        elif utils.is_file_ext(ext, "GLTF") or utils.is_file_ext(ext, "GLB"):
+                # invoke the GLTF importer
+                utils.tag_images()
+                bpy.ops.import_scene.gltf(filepath = self.filepath)
+                imported = bpy.context.selected_objects.copy()
+                self.imported_images = utils.untagged_images()
 
-            # invoke the GLTF importer
-            utils.tag_images()
-            bpy.ops.import_scene.gltf(filepath = self.filepath)
-            imported = bpy.context.selected_objects.copy()
-            self.imported_images = utils.untagged_images()
+                if prefs.import_auto_convert:
+                    self.imported_character = characters.convert_generic_to_non_standard(imported, self.filepath)
 
-            if prefs.import_auto_convert:
-                self.imported_character = characters.convert_generic_to_non_standard(imported, self.filepath)
+                utils.log_timer("Done .GLTF Import.")
 
-            utils.log_timer("Done .GLTF Import.")
+            elif utils.is_file_ext(ext, "VRM"):
 
-        elif utils.is_file_ext(ext, "VRM"):
+                # copy .vrm to .glb
+                glb_path = os.path.join(dir, name + "_temp.glb")
+                shutil.copyfile(self.filepath, glb_path)
+                self.filepath = glb_path
 
-            # copy .vrm to .glb
-            glb_path = os.path.join(dir, name + "_temp.glb")
-            shutil.copyfile(self.filepath, glb_path)
-            self.filepath = glb_path
+                # invoke the GLTF importer
+                utils.tag_images()
+                bpy.ops.import_scene.gltf(filepath = self.filepath)
+                imported = bpy.context.selected_objects.copy()
+                self.imported_images = utils.untagged_images()
 
-            # invoke the GLTF importer
-            utils.tag_images()
-            bpy.ops.import_scene.gltf(filepath = self.filepath)
-            imported = bpy.context.selected_objects.copy()
-            self.imported_images = utils.untagged_images()
+                # find the armature and rotate it 180 degrees in Z
+                arm : bpy.types.Object = utils.get_armature_in_objects(imported)
+                if arm:
+                    arm.rotation_mode = "XYZ"
+                    arm.rotation_euler = (0, 0, 3.1415926535897)
+                    utils.set_only_active_object(arm)
+                    bpy.ops.object.transform_apply(location=False, rotation=True, scale=False)
+                    utils.try_select_objects(imported)
 
-            # find the armature and rotate it 180 degrees in Z
-            arm : bpy.types.Object = utils.get_armature_in_objects(imported)
-            if arm:
-                arm.rotation_mode = "XYZ"
-                arm.rotation_euler = (0, 0, 3.1415926535897)
-                utils.set_only_active_object(arm)
-                bpy.ops.object.transform_apply(location=False, rotation=True, scale=False)
-                utils.try_select_objects(imported)
+                os.remove(glb_path)
 
-            os.remove(glb_path)
+                if prefs.import_auto_convert:
+                    self.imported_character = characters.convert_generic_to_non_standard(imported, self.filepath)
 
-            if prefs.import_auto_convert:
-                self.imported_character = characters.convert_generic_to_non_standard(imported, self.filepath)
+                utils.log_timer("Done .vrm Import.")
 
-            utils.log_timer("Done .vrm Import.")
+        finally:
+            # the timer is only logged for the supported file types, or not at all on errors
+            utils.end_timers(timer_depth)
 
 
+    @utils.profiled("build_materials")
     def build_materials(self, context):
         objects_processed = []
         props: properties.CC3ImportProps = bpy.context.scene.CC3ImportProps
@@ -733,54 +743,59 @@ class CC3Import(bpy.types.Operator):
         utils.log_info("-----------------------------")
 
         nodeutils.check_node_groups()
+        shaders.compile_shader_matrix()
+
+        with utils.image_path_index():
+            chr_cache: properties.CC3CharacterCache = None
+            if self.imported_character:
+                chr_cache = self.imported_character
+                json_data = jsonutils.read_json(self.filepath)
+            else:
+                chr_cache = props.get_context_character_cache(context)
+                if chr_cache:
+                    self.imported_character = chr_cache
+                    json_data = jsonutils.read_json(chr_cache.import_file)
+                    # when rebuilding, use the currently selected render target
+                    chr_cache.render_target = prefs.render_target
 
-        chr_cache: properties.CC3CharacterCache = None
-        if self.imported_character:
-            chr_cache = self.imported_character
-            json_data = jsonutils.read_json(self.filepath)
-        else:
-            chr_cache = props.get_context_character_cache(context)
             if chr_cache:
-                self.imported_character = chr_cache
-                json_data = jsonutils.read_json(chr_cache.import_file)
-                # when rebuilding, use the currently selected render target
-                chr_cache.render_target = prefs.render_target
 
-        if chr_cache:
+                chr_json = jsonutils.get_character_json(json_data, chr_cache.character_id)
 
-            chr_json = jsonutils.get_character_json(json_data, chr_cache.character_id)
+                if self.param == "BUILD":
+                    chr_cache.check_material_types(chr_json)
 
-            if self.param == "BUILD":
-                chr_cache.check_material_types(chr_json)
+                if prefs.import_deduplicate:
+                    processed_images = {}
+                    processed_materials = {}
+                else:
+                    processed_images = None
+                    processed_materials = None
 
-            if prefs.import_deduplicate:
-                processed_images = []
-                processed_materials = []
-            else:
-                processed_images = None
-                processed_materials = None
-
-            if props.build_mode == "IMPORTED":
-                for obj_cache in chr_cache.object_cache:
-                    if obj_cache.object:
-                        process_object(chr_cache, obj_cache.object, objects_processed, chr_json, processed_materials, processed_images)
+                if props.build_mode == "IMPORTED":
+                    for obj_cache in chr_cache.object_cache:
+                        if obj_cache.object:
+                            with utils.profile_phase("process_object", object = obj_cache.object.name):
+                                process_object(chr_cache, obj_cache.object, objects_processed, chr_json, processed_materials, processed_images)
 
-            # only processes the selected objects that are listed in the import_cache (character)
-            elif props.build_mode == "SELECTED":
-                for obj_cache in chr_cache.object_cache:
-                    if obj_cache.object and obj_cache.object in bpy.context.selected_objects:
-                        process_object(chr_cache, obj_cache.object, objects_processed, chr_json, processed_materials, processed_images)
+                # only processes the selected objects that are listed in the import_cache (character)
+                elif props.build_mode == "SELECTED":
+                    for obj_cache in chr_cache.object_cache:
+                        if obj_cache.object and obj_cache.object in bpy.context.selected_objects:
+                            with utils.profile_phase("process_object", object = obj_cache.object.name):
+                                process_object(chr_cache, obj_cache.object, objects_processed, chr_json, processed_materials, processed_images)
 
-            # setup default physics
-            if prefs.physics == "ENABLED" and props.physics_mode == "ON":
-                utils.log_info("")
-                physics.add_all_physics(chr_cache)
+                # setup default physics
+                if prefs.physics == "ENABLED" and props.physics_mode == "ON":
+                    utils.log_info("")
+                    physics.add_all_physics(chr_cache)
 
-            # enable SSR
-            if prefs.refractive_eyes == "SSR":
-                bpy.context.scene.eevee.use_ssr = True
-                bpy.context.scene.eevee.use_ssr_refraction = True
+                # enable SSR
+                if prefs.refractive_eyes == "SSR":
+                    bpy.context.scene.eevee.use_ssr = True
+                    bpy.context.scene.eevee.use_ssr_refraction = True
 
+        utils.save_md5_cache()
         utils.log_timer("Done Build.", "s")
 
 
@@ -853,6 +868,7 @@ class CC3Import(bpy.types.Operator):
         self.built = True
 
 
+    @utils.profiled("run_finish")
     def run_finish(self, context):
         props = bpy.context.scene.CC3ImportProps
         prefs = bpy.context.preferences.addons[__name__.partition(".")[0]].preferences
@@ -903,7 +919,7 @@ class CC3Import(bpy.types.Operator):
                 for img in self.imported_images:
                     num_users = img.users
                     if (img.use_fake_user and img.users == 1) or img.users == 0:
-                        utils.log_info("Removing Image: " + img.name)
+                        utils.log_info("Removing Image: %s", img.name)
                         bpy.data.images.remove(img)
             utils.clean_collection(bpy.data.images)
 
@@ -1090,7 +1106,7 @@ class CC3ImportAnimations(bpy.types.Operator):
         path = os.path.join(dir, file)
         name = file[:-4]
 
-        utils.log_info(f"Importing Fbx file: {path}")
+        utils.log_info("Importing Fbx file: %s", path)
 
         # invoke the fbx importer
         utils.tag_objects()
@@ -1127,21 +1143,21 @@ class CC3ImportAnimations(bpy.types.Operator):
             # only interested in actions, delete the rest
             for obj in objects:
                 if obj.type != "ARMATURE":
-                    utils.log_info(f"Removing Object: {obj.name}")
+                    utils.log_info("Removing Object: %s", obj.name)
                     utils.delete_mesh_object(obj)
             # and optionally remove the shape keys
             if self.remove_shape_keys:
                 for action in shapekey_actions:
-                    utils.log_info(f"Removing Shapekey Action: {action.name}")
+                    utils.log_info("Removing Shapekey Action: %s", action.name)
                     bpy.data.actions.remove(action)
 
         if self.remove_materials_images:
             for img in images:
-                utils.log_info(f"Removing Image: {img.name}")
+                utils.log_info("Removing Image: %s", img.name)
                 bpy.data.images.remove(img)
 
             for mat in materials:
-                utils.log_info(f"Removing Material: {mat.name}")
+                utils.log_info("Removing Material: %s", mat.name)
                 bpy.data.materials.remove(mat)
 
         utils.log_recess()
@@ -16,7 +16,6 @@
 
 import json
 import os
-import bpy
 
 from . import utils
 
@@ -48,7 +47,7 @@ def read_json(fbx_path):
             text_data = file.read()
             json_data = json.loads(text_data)
             file.close()
-            utils.log_info("Json data successfully parsed: " + json_path)
+            utils.log_info("Json data successfully parsed: %s", json_path)
             return json_data
 
         utils.log_info("No Json data to parse, using defaults...")
@@ -114,7 +113,7 @@ def get_character_json(json_data, character_id):
         return None
     try:
         chr_json = json_data[character_id]["Object"][character_id]
-        utils.log_detail("Character Json data found for: " + character_id)
+        utils.log_detail("Character Json data found for: %s", character_id)
         return chr_json
     except:
         utils.log_warn("Failed to get character Json data!")
@@ -153,7 +152,7 @@ def get_object_json(chr_json, obj):
         meshes_json = chr_json["Meshes"]
         for object_name in meshes_json.keys():
             if object_name.lower() == name:
-                utils.log_detail("Object Json data found for: " + obj.name)
+                utils.log_detail("Object Json data found for: %s", obj.name)
                 return meshes_json[object_name]
     except:
         utils.log_warn("Failed to get object Json data!")
@@ -166,7 +165,7 @@ def get_physics_mesh_json(physics_json, obj):
         name = utils.strip_name(obj.name).lower()
         for object_name in physics_json.keys():
             if object_name.lower() == name:
-                utils.log_detail("Physics Object Json data found for: " + obj.name)
+                utils.log_detail("Physics Object Json data found for: %s", obj.name)
                 return physics_json[object_name]
     except:
         utils.log_warn("Failed to get physics object Json data!")
@@ -191,7 +190,7 @@ def get_material_json(obj_json, material):
         materials_json = obj_json["Materials"]
         for material_name in materials_json.keys():
             if material_name.lower() == name:
-                utils.log_detail("Material Json data found for: " + material.name)
+                utils.log_detail("Material Json data found for: %s", material.name)
                 return materials_json[material_name]
     except:
         utils.log_warn("Failed to get material Json data!")
@@ -205,7 +204,7 @@ def get_physics_material_json(physics_mesh_json, material):
         materials_json = physics_mesh_json["Materials"]
         for material_name in materials_json.keys():
             if material_name.lower() == name:
-                utils.log_detail("Physics Material Json data found for: " + material.name)
+                utils.log_detail("Physics Material Json data found for: %s", material.name)
                 return materials_json[material_name]
     except:
         utils.log_warn("Failed to get physics material Json data!")
@@ -73,9 +73,9 @@ def detect_scalp_material(mat):
     hints = prefs.hair_scalp_hint.split(",")
     detect = detect_key_words(hints, material_name)
     if detect == "Deny":
-        utils.log_info(f"{mat.name}: has deny keywords, defininately not scalp!")
+        utils.log_info("%s: has deny keywords, defininately not scalp!", mat.name)
     elif detect == "True":
-        utils.log_info(f"{mat.name}: has keywords, is scalp.")
+        utils.log_info("%s: has keywords, is scalp.", mat.name)
     return detect
 
 
@@ -151,17 +151,17 @@ def detect_hair_material(obj, mat, tex_dirs, base_dir, mat_json = None):
 
     # try to find one of the new hair maps: "Flow Map" or "Root Map"
     if detect_smart_hair_maps(mat, tex_dirs, base_dir) == "True":
-        utils.log_info(f"{obj.name} / {mat.name}: has hair shader textures, is hair.")
+        utils.log_info("%s / %s: has hair shader textures, is hair.", obj.name, mat.name)
         return "True"
 
     detect_mat = detect_key_words(hints, material_name)
 
     if detect_mat == "Deny":
-        utils.log_info(f"{obj.name} / {mat.name}: Material has deny keywords, definitely not hair!")
+        utils.log_info("%s / %s: Material has deny keywords, definitely not hair!", obj.name, mat.name)
         return "Deny"
 
     if detect_mat == "True":
-        utils.log_info(f"{obj.name} / {mat.name}: Material has hair keywords, is hair.")
+        utils.log_info("%s / %s: Material has hair keywords, is hair.", obj.name, mat.name)
         return "True"
 
     return "False"
@@ -178,7 +178,7 @@ def detect_hair_object(obj, tex_dirs, base_dir, obj_json = None):
                 mat_json = jsonutils.get_material_json(obj_json, mat)
                 shader = jsonutils.get_custom_shader(mat_json)
                 if shader == "RLHair":
-                    utils.log_info(f"{obj.name} / {mat.name}: Hair material found in JSON data, Object is hair.")
+                    utils.log_info("%s / %s: Hair material found in JSON data, Object is hair.", obj.name, mat.name)
                     return "True"
 
         return "False"
@@ -190,17 +190,17 @@ def detect_hair_object(obj, tex_dirs, base_dir, obj_json = None):
             mat_json = jsonutils.get_material_json(obj_json, mat)
             detect_mat = detect_hair_material(obj, mat, tex_dirs, base_dir, mat_json)
             if detect_mat == "True":
-                utils.log_info(f"{obj.name} / {mat.name}: Hair material found, Object is hair.")
+                utils.log_info("%s / %s: Hair material found, Object is hair.", obj.name, mat.name)
                 return "True"
 
     detect_obj = detect_key_words(hints, object_name)
 
     if detect_obj == "Deny":
-        utils.log_info(f"{obj.name} / {mat.name}: Object has deny keywords, definitely not hair!")
+        utils.log_info("%s / %s: Object has deny keywords, definitely not hair!", obj.name, mat.name)
         return "Deny"
 
     if detect_obj == "True":
-        utils.log_info(f"{obj.name} / {mat.name}: Object has hair keywords, is hair.")
+        utils.log_info("%s / %s: Object has hair keywords, is hair.", obj.name, mat.name)
         return "True"
 
     return "False"
@@ -317,7 +317,7 @@ def detect_materials_by_name(chr_cache, obj, mat):
     elif detect_sss_maps(mat, tex_dirs, chr_cache.import_dir) == "True":
         material_type = "SSS"
 
-    utils.log_info(f"Material: {mat_name} detected by name as: {material_type}")
+    utils.log_info("Material: %s detected by name as: %s", mat_name, material_type)
     return object_type, material_type
 
 
@@ -329,7 +329,7 @@ def detect_materials_from_json(chr_cache, obj, mat, obj_json, mat_json):
     object_type = "DEFAULT"
     tex_dirs = imageutils.get_material_tex_dirs(chr_cache, obj, mat)
 
-    utils.log_info(f"Material Shader: {shader}")
+    utils.log_info("Material Shader: %s", shader)
 
     if shader == "Pbr" or shader == "Tra":
         # PBR materials can also refer to the scalp/base on hair objects,
@@ -415,7 +415,7 @@ def detect_materials_from_json(chr_cache, obj, mat, obj_json, mat_json):
         object_type = "DEFAULT"
         material_type = "DEFAULT"
 
-    utils.log_info(f"Material: {mat_name} detected from Json data as: {material_type}")
+    utils.log_info("Material: %s detected from Json data as: %s", mat_name, material_type)
     return object_type, material_type
 
 
@@ -528,12 +528,12 @@ def detect_mixer_masks(chr_cache, obj, obj_cache, mat, mat_cache):
         mixer_settings = mat_cache.mixer_settings
 
         if rgb_mask:
-            utils.log_info(f"Mixer RGB Mask found: {rgb_mask.filepath}")
+            utils.log_info("Mixer RGB Mask found: %s", rgb_mask.filepath)
             mixer_settings.rgb_image = rgb_mask
             rgb_mask.use_fake_user = True
 
         if color_id_mask:
-            utils.log_info(f"Mixer Color Id Mask found: {color_id_mask.filepath}")
+            utils.log_info("Mixer Color Id Mask found: %s", color_id_mask.filepath)
             mixer_settings.id_image = color_id_mask
             color_id_mask.use_fake_user = True
 
@@ -740,29 +740,56 @@ def has_same_parameters(cache_a, cache_b):
     return False
 
 
+def get_parameters_fingerprint(mat_cache):
+    """Returns the parameter property group as a canonical tuple of (prop_name, value) pairs,
+       with any array values as tuples so they can be hashed and compared.
+    """
+    fingerprint = []
+    for prop_name, value in mat_cache.parameters.items():
+        if type(value) is not str:
+            try:
+                value = tuple(value)
+            except:
+                pass
+        fingerprint.append((prop_name, value))
+    return tuple(fingerprint)
+
+
+def get_material_fingerprint(mat, mat_cache):
+    """Returns a hashable fingerprint of the material: the stripped name, the material type,
+       the set of images used by the material's image nodes and the material parameters.
+       Materials with the same fingerprint are duplicates of each other.
+    """
+    images = set()
+    if mat.node_tree:
+        for node in mat.node_tree.nodes:
+            if node.type == "TEX_IMAGE":
+                images.add(node.image.as_pointer() if node.image else 0)
+    return (utils.strip_name(mat.name),
+            mat_cache.material_type,
+            frozenset(images),
+            get_parameters_fingerprint(mat_cache))
+
+
+@utils.profiled("find_duplicate_material")
 def find_duplicate_material(chr_cache, mat, processed_materials):
+    """processed_materials: dictionary of { fingerprint: material }
+       Returns the first processed material with the same fingerprint as mat,
+       otherwise adds mat to the processed materials and returns None.
+    """
     source_name = utils.strip_name(mat.name)
     mat_cache = chr_cache.get_material_cache(mat)
     if mat_cache and processed_materials is not None:
-        for processed_mat in processed_materials:
-            if mat != processed_mat:
-                processed_name = utils.strip_name(processed_mat.name)
-                # only consider materials with the same base name
-                if processed_name == source_name:
-                    processed_cache = chr_cache.get_material_cache(processed_mat)
-                    if processed_cache:
-                        # with the same material type
-                        if mat_cache.material_type == processed_cache.material_type:
-                            # that use the same textures
-                            if has_same_textures(mat, processed_mat):
-                                # and have the same parameters
-                                if has_same_parameters(mat_cache, processed_cache):
-                                    # if there is a matching material that is the base name,
-                                    # then set the first material name to this base name
-                                    if mat.name == source_name:
-                                        processed_mat.name = source_name
-                                        processed_mat.name = source_name
-                                    return processed_mat
+        fingerprint = get_material_fingerprint(mat, mat_cache)
+        processed_mat = processed_materials.get(fingerprint)
+        if processed_mat and processed_mat != mat:
+            # if there is a matching material that is the base name,
+            # then set the first material name to this base name
+            if mat.name == source_name:
+                processed_mat.name = source_name
+                processed_mat.name = source_name
+            return processed_mat
+        processed_materials[fingerprint] = mat
     return None
 
 
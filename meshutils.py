@@ -14,7 +14,8 @@
 # You should have received a copy of the GNU General Public License
 # along with CC/iC Blender Tools.  If not, see <https://www.gnu.org/licenses/>.
 
-import math
+import zlib
+import numpy
 
 import bpy
 
@@ -40,19 +41,76 @@ def get_vertex_group(obj, name):
 
 
 def clear_vertex_group(obj, vertex_group):
-    all_verts = []
-    for v in obj.data.vertices:
-        all_verts.append(v.index)
+    all_verts = list(range(len(obj.data.vertices)))
     vertex_group.remove(all_verts)
 
 
 def set_vertex_group(obj, vertex_group, value):
-    all_verts = []
-    for v in obj.data.vertices:
-        all_verts.append(v.index)
+    all_verts = list(range(len(obj.data.vertices)))
     vertex_group.add(all_verts, value, 'ADD')
 
 
+def get_vertex_group_weight(vertex_group, index, default = -1):
+    """Returns the weight of a single vertex in the vertex group, or the default if not in the group."""
+    try:
+        return vertex_group.weight(index)
+    except RuntimeError:
+        return default
+
+
+def set_vertex_group_weights(vertex_group, indices, weights, levels = 1024):
+    """Writes the weights of the vertices into the vertex group in bulk,
+       with one VertexGroup.add call for each distinct weight.
+       Weights are clamped to 0 - 1 and quantized to 1 / levels steps, which is the precision
+       they are stored at, so there are at most levels + 1 add calls however many vertices are written.
+       levels = None groups the weights by their exact (single precision) value instead,
+       which can need up to one add call per vertex for smoothly varying weights."""
+    if len(indices) == 0:
+        return
+    weights = numpy.clip(numpy.asarray(weights, dtype = numpy.float32), 0.0, 1.0)
+    if levels:
+        weights = numpy.rint(weights * levels).astype(numpy.int32)
+    buckets, bucket_index = numpy.unique(weights, return_inverse = True)
+    if levels:
+        buckets = buckets / levels
+    bucket_index = bucket_index.reshape(-1)
+    order = numpy.argsort(bucket_index, kind = "stable")
+    splits = numpy.cumsum(numpy.bincount(bucket_index))[:-1]
+    for weight, bucket_indices in zip(buckets, numpy.split(numpy.asarray(indices)[order], splits)):
+        vertex_group.add(bucket_indices.tolist(), float(weight), 'REPLACE')
+
+
+def get_material_vertex_uvs(obj, mat, uv_layer = None):
+    """Returns numpy arrays of the unique indices of the vertices in the material's polygons
+       and the uv coordinate of each vertex (from the last loop of the vertex).
+    """
+    mesh = obj.data
+    if uv_layer is None:
+        uv_layer = mesh.uv_layers[0]
+    slot_indices = get_material_slot_indices(obj, mat)
+    num_polys = len(mesh.polygons)
+    num_loops = len(mesh.loops)
+    if not slot_indices or num_polys == 0:
+        return numpy.empty(0, dtype = numpy.int32), numpy.empty((0, 2), dtype = numpy.float32)
+
+    material_indices = numpy.empty(num_polys, dtype = numpy.int32)
+    loop_totals = numpy.empty(num_polys, dtype = numpy.int32)
+    loop_verts = numpy.empty(num_loops, dtype = numpy.int32)
+    loop_uvs = numpy.empty(num_loops * 2, dtype = numpy.float32)
+    mesh.polygons.foreach_get("material_index", material_indices)
+    mesh.polygons.foreach_get("loop_total", loop_totals)
+    mesh.loops.foreach_get("vertex_index", loop_verts)
+    uv_layer.data.foreach_get("uv", loop_uvs)
+    loop_mask = numpy.repeat(numpy.isin(material_indices, slot_indices), loop_totals)
+    verts = loop_verts[loop_mask]
+    uvs = loop_uvs.reshape(-1, 2)[loop_mask]
+
+    # the last loop of each vertex
+    indices, reverse_first = numpy.unique(verts[::-1], return_index = True)
+    last = len(verts) - 1 - reverse_first
+    return indices, uvs[last]
+
+
 def generate_eye_occlusion_vertex_groups(obj, mat_left, mat_right):
 
     vertex_group_inner_l = add_vertex_group(obj, vars.OCCLUSION_GROUP_INNER + "_L")
@@ -67,29 +125,17 @@ def generate_eye_occlusion_vertex_groups(obj, mat_left, mat_right):
     vertex_group_bottom_r = add_vertex_group(obj, vars.OCCLUSION_GROUP_BOTTOM + "_R")
     vertex_group_all_r = add_vertex_group(obj, vars.OCCLUSION_GROUP_ALL + "_R")
 
-    mesh = obj.data
-    ul = mesh.uv_layers[0]
-    index = [0]
-    for poly in mesh.polygons:
-        for loop_index in poly.loop_indices:
-            loop_entry = mesh.loops[loop_index]
-            vertex = mesh.vertices[loop_entry.vertex_index]
-            uv = ul.data[loop_entry.index].uv
-            index[0] = vertex.index
-
-            slot = obj.material_slots[poly.material_index]
-            if slot.material == mat_left:
-                vertex_group_inner_l.add(index, uv.x, 'REPLACE')
-                vertex_group_outer_l.add(index, 1.0 - uv.x, 'REPLACE')
-                vertex_group_top_l.add(index, uv.y, 'REPLACE')
-                vertex_group_bottom_l.add(index, 1.0 - uv.y, 'REPLACE')
-                vertex_group_all_l.add([vertex.index], 1.0, 'REPLACE')
-            elif slot.material == mat_right:
-                vertex_group_inner_r.add(index, uv.x, 'REPLACE')
-                vertex_group_outer_r.add(index, 1.0 - uv.x, 'REPLACE')
-                vertex_group_top_r.add(index, uv.y, 'REPLACE')
-                vertex_group_bottom_r.add(index, 1.0 - uv.y, 'REPLACE')
-                vertex_group_all_r.add([vertex.index], 1.0, 'REPLACE')
+    groups = [ (mat_left, vertex_group_inner_l, vertex_group_outer_l, vertex_group_top_l, vertex_group_bottom_l, vertex_group_all_l),
+               (mat_right, vertex_group_inner_r, vertex_group_outer_r, vertex_group_top_r, vertex_group_bottom_r, vertex_group_all_r) ]
+
+    for mat, group_inner, group_outer, group_top, group_bottom, group_all in groups:
+        indices, uvs = get_material_vertex_uvs(obj, mat)
+        if len(indices) > 0:
+            set_vertex_group_weights(group_inner, indices, uvs[:, 0])
+            set_vertex_group_weights(group_outer, indices, 1.0 - uvs[:, 0])
+            set_vertex_group_weights(group_top, indices, uvs[:, 1])
+            set_vertex_group_weights(group_bottom, indices, 1.0 - uvs[:, 1])
+            group_all.add(indices.tolist(), 1.0, 'REPLACE')
 
 
 def generate_tearline_vertex_groups(obj, mat_left, mat_right):
@@ -99,23 +145,17 @@ def generate_tearline_vertex_groups(obj, mat_left, mat_right):
     vertex_group_inner_r = add_vertex_group(obj, vars.TEARLINE_GROUP_INNER + "_R")
     vertex_group_all_r = add_vertex_group(obj, vars.TEARLINE_GROUP_ALL + "_R")
 
-    mesh = obj.data
-    ul = mesh.uv_layers[0]
-    for poly in mesh.polygons:
-        for loop_index in poly.loop_indices:
-            loop_entry = mesh.loops[loop_index]
-            vertex = mesh.vertices[loop_entry.vertex_index]
-            uv = ul.data[loop_entry.index].uv
-            weight = 1.0 - utils.smoothstep(0, 0.1, abs(uv.x - 0.5))
-
-            slot = obj.material_slots[poly.material_index]
-            if slot.material == mat_left:
-                vertex_group_inner_l.add([vertex.index], weight, 'REPLACE')
-                vertex_group_all_l.add([vertex.index], 1.0, 'REPLACE')
+    groups = [ (mat_left, vertex_group_inner_l, vertex_group_all_l),
+               (mat_right, vertex_group_inner_r, vertex_group_all_r) ]
 
-            elif slot.material == mat_right:
-                vertex_group_inner_r.add([vertex.index], weight, 'REPLACE')
-                vertex_group_all_r.add([vertex.index], 1.0, 'REPLACE')
+    for mat, group_inner, group_all in groups:
+        indices, uvs = get_material_vertex_uvs(obj, mat)
+        if len(indices) > 0:
+            # 1.0 - smoothstep(0, 0.1, abs(uv.x - 0.5))
+            x = numpy.clip(numpy.abs(uvs[:, 0] - 0.5) / 0.1, 0.0, 1.0)
+            weights = 1.0 - x * x * (3 - 2 * x)
+            set_vertex_group_weights(group_inner, indices, weights)
+            group_all.add(indices.tolist(), 1.0, 'REPLACE')
 
 
 def rebuild_eye_vertex_groups(chr_cache):
@@ -131,65 +171,128 @@ def rebuild_eye_vertex_groups(chr_cache):
                 generate_eye_vertex_groups(obj, mat_left, mat_right, cache_left, cache_right)
 
 
+def get_uv_checksum(mesh, uv_layer = None):
+    if uv_layer is None:
+        uv_layer = mesh.uv_layers[0]
+    loop_uvs = numpy.empty(len(mesh.loops) * 2, dtype = numpy.float32)
+    uv_layer.data.foreach_get("uv", loop_uvs)
+    return zlib.crc32(loop_uvs.tobytes())
+
+
+def get_eye_radial_distances(obj, mat):
+    """Returns the indices of the eye material's vertices and their radial uv distance from the center of the eye,
+       cached per mesh so that iris slider changes only need to remap the distances.
+       The cache is keyed by the mesh layout and a checksum of the uvs, so editing the uvs invalidates it."""
+    mesh = obj.data
+    key = (get_mesh_layout_key(obj), get_uv_checksum(mesh))
+    cached_key, cache = EYE_RADIAL_CACHE.get(mesh.as_pointer(), (None, None))
+    if cached_key != key:
+        cache = {}
+        EYE_RADIAL_CACHE[mesh.as_pointer()] = (key, cache)
+    mat_pointer = mat.as_pointer()
+    if mat_pointer not in cache:
+        indices, uvs = get_material_vertex_uvs(obj, mat)
+        radial = numpy.sqrt(numpy.sum((uvs - 0.5) ** 2, axis = 1))
+        cache[mat_pointer] = (indices, radial)
+    return cache[mat_pointer]
+
+
 def generate_eye_vertex_groups(obj, mat_left, mat_right, cache_left, cache_right):
     prefs = bpy.context.preferences.addons[__name__.partition(".")[0]].preferences
 
     vertex_group_l = add_vertex_group(obj, prefs.eye_displacement_group + "_L")
     vertex_group_r = add_vertex_group(obj, prefs.eye_displacement_group + "_R")
 
+    groups = [ (mat_left, cache_left, vertex_group_l),
+               (mat_right, cache_right, vertex_group_r) ]
+
+    for mat, mat_cache, vertex_group in groups:
+        indices, radial = get_eye_radial_distances(obj, mat)
+        if len(indices) > 0:
+            iris_scale = mat_cache.parameters.eye_iris_scale
+            iris_radius = mat_cache.parameters.eye_iris_radius
+            depth_radius = mat_cache.parameters.eye_iris_depth_radius
+            radius = iris_scale * iris_radius * depth_radius
+            #weight = 1.0 - utils.saturate(utils.smoothstep(0, radius, radial))
+            if radius > 0:
+                weights = numpy.clip(1.0 - radial / radius, 0.0, 1.0)
+            else:
+                weights = numpy.zeros(len(radial), dtype = numpy.float32)
+            set_vertex_group_weights(vertex_group, indices, weights)
+
+
+# mesh pointer -> (mesh layout key, { material slot indices: vertex index array })
+# the layout key is the polygon count, loop count, material slot layout and material / loop vertex index checksums of the mesh
+MATERIAL_VERTEX_CACHE = {}
+# mesh pointer -> ((mesh layout key, uv checksum), { material pointer: (vertex index array, radial uv distance array) })
+EYE_RADIAL_CACHE = {}
+
+
+def clear_material_vertex_cache():
+    MATERIAL_VERTEX_CACHE.clear()
+    EYE_RADIAL_CACHE.clear()
+
+
+def get_mesh_layout_key(obj):
+    """Returns a key of the mesh layout: the polygon and loop counts, the material slot layout
+       and checksums of the polygon material indices and the loop vertex indices,
+       so that reassigning polygons to another material slot (or editing the topology) changes the key."""
     mesh = obj.data
-    ul = mesh.uv_layers[0]
-    for poly in mesh.polygons:
-        for loop_index in poly.loop_indices:
-            loop_entry = mesh.loops[loop_index]
-            vertex = mesh.vertices[loop_entry.vertex_index]
-            uv = ul.data[loop_entry.index].uv
-            x = uv.x - 0.5
-            y = uv.y - 0.5
-            radial = math.sqrt(x * x + y * y)
-
-            slot = obj.material_slots[poly.material_index]
-            if slot.material == mat_left:
-                iris_scale = cache_left.parameters.eye_iris_scale
-                iris_radius = cache_left.parameters.eye_iris_radius
-                depth_radius = cache_left.parameters.eye_iris_depth_radius
-                radius = iris_scale * iris_radius * depth_radius
-                #weight = 1.0 - utils.saturate(utils.smoothstep(0, radius, radial))
-                weight = utils.saturate(utils.remap(0, radius, 1.0, 0.0, radial))
-                vertex_group_l.add([vertex.index], weight, 'REPLACE')
-
-            elif slot.material == mat_right:
-                iris_scale = cache_right.parameters.eye_iris_scale
-                iris_radius = cache_right.parameters.eye_iris_radius
-                depth_radius = cache_right.parameters.eye_iris_depth_radius
-                radius = iris_scale * iris_radius * depth_radius
-                #weight = 1.0 - utils.saturate(utils.smoothstep(0, radius, radial))
-                weight = utils.saturate(utils.remap(0, radius, 1.0, 0.0, radial))
-                vertex_group_r.add([vertex.index], weight, 'REPLACE')
-
-
-def get_material_vertex_indices(obj, mat):
-    vert_indices = []
+    num_polys = len(mesh.polygons)
+    num_loops = len(mesh.loops)
+    material_indices = numpy.empty(num_polys, dtype = numpy.int32)
+    loop_verts = numpy.empty(num_loops, dtype = numpy.int32)
+    mesh.polygons.foreach_get("material_index", material_indices)
+    mesh.loops.foreach_get("vertex_index", loop_verts)
+    return (num_polys, num_loops,
+            tuple(slot.material.as_pointer() if slot.material else 0 for slot in obj.material_slots),
+            zlib.crc32(material_indices.tobytes()), zlib.crc32(loop_verts.tobytes()))
+
+
+def get_material_slot_indices(obj, mat):
+    return tuple(i for i, slot in enumerate(obj.material_slots) if slot.material == mat)
+
+
+def get_material_vertex_index_array(obj, mat, use_cache = False):
+    """Returns a sorted numpy array of the unique indices of the vertices used by the material's polygons."""
     mesh = obj.data
-    for poly in mesh.polygons:
-        poly_mat = obj.material_slots[poly.material_index].material
-        if poly_mat == mat:
-            for vert_index in poly.vertices:
-                if vert_index not in vert_indices:
-                    vert_indices.append(vert_index)
+    slot_indices = get_material_slot_indices(obj, mat)
+    num_polys = len(mesh.polygons)
+    num_loops = len(mesh.loops)
+
+    if use_cache:
+        key = get_mesh_layout_key(obj)
+        cached_key, cache = MATERIAL_VERTEX_CACHE.get(mesh.as_pointer(), (None, None))
+        if cached_key != key:
+            cache = {}
+            MATERIAL_VERTEX_CACHE[mesh.as_pointer()] = (key, cache)
+        if slot_indices in cache:
+            return cache[slot_indices]
+
+    if slot_indices and num_polys:
+        material_indices = numpy.empty(num_polys, dtype = numpy.int32)
+        loop_totals = numpy.empty(num_polys, dtype = numpy.int32)
+        loop_verts = numpy.empty(num_loops, dtype = numpy.int32)
+        mesh.polygons.foreach_get("material_index", material_indices)
+        mesh.polygons.foreach_get("loop_total", loop_totals)
+        mesh.loops.foreach_get("vertex_index", loop_verts)
+        poly_mask = numpy.isin(material_indices, slot_indices)
+        vert_indices = numpy.unique(loop_verts[numpy.repeat(poly_mask, loop_totals)])
+    else:
+        vert_indices = numpy.empty(0, dtype = numpy.int32)
+
+    if use_cache:
+        cache[slot_indices] = vert_indices
     return vert_indices
 
 
-def get_material_vertices(obj, mat):
-    verts = []
+def get_material_vertex_indices(obj, mat, use_cache = False):
+    return get_material_vertex_index_array(obj, mat, use_cache).tolist()
+
+
+def get_material_vertices(obj, mat, use_cache = False):
     mesh = obj.data
-    for poly in mesh.polygons:
-        poly_mat = obj.material_slots[poly.material_index].material
-        if poly_mat == mat:
-            for vert_index in poly.vertices:
-                if vert_index not in verts:
-                    verts.append(mesh.vertices[vert_index])
-    return verts
+    return [ mesh.vertices[i] for i in get_material_vertex_index_array(obj, mat, use_cache) ]
 
 
 def remove_material_verts(obj, mat):
@@ -198,13 +301,10 @@ def remove_material_verts(obj, mat):
     if utils.edit_mode_to(obj):
         bpy.ops.mesh.select_all(action="DESELECT")
     if utils.object_mode_to(obj):
-        for vert in mesh.vertices:
-            vert.select = False
-        for poly in mesh.polygons:
-            poly_mat = obj.material_slots[poly.material_index].material
-            if poly_mat == mat:
-                for vert_index in poly.vertices:
-                    mesh.vertices[vert_index].select = True
+        select = numpy.zeros(len(mesh.vertices), dtype = bool)
+        select[get_material_vertex_index_array(obj, mat)] = True
+        mesh.vertices.foreach_set("select", select)
+        mesh.update()
     if utils.edit_mode_to(obj):
         bpy.ops.mesh.delete(type='VERT')
     utils.object_mode_to(obj)
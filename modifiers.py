@@ -214,7 +214,7 @@ def add_eye_modifiers(obj):
         move_mod_first(obj, warp_mod_r)
         move_mod_first(obj, displace_mod_r)
 
-    utils.log_info("Eye Displacement modifiers applied to: " + obj.name)
+    utils.log_info("Eye Displacement modifiers applied to: %s", obj.name)
 
 
 def add_eye_occlusion_modifiers(obj):
@@ -268,7 +268,7 @@ def add_eye_occlusion_modifiers(obj):
         move_mod_first(obj, displace_mod_bottom_r)
         move_mod_first(obj, displace_mod_all_r)
 
-    utils.log_info("Eye Occlusion Displacement modifiers applied to: " + obj.name)
+    utils.log_info("Eye Occlusion Displacement modifiers applied to: %s", obj.name)
 
 
 def add_tearline_modifiers(obj):
@@ -305,7 +305,7 @@ def add_tearline_modifiers(obj):
         move_mod_first(obj, displace_mod_inner_r)
         move_mod_first(obj, displace_mod_all_r)
 
-    utils.log_info("Tearline Displacement modifiers applied to: " + obj.name)
+    utils.log_info("Tearline Displacement modifiers applied to: %s", obj.name)
 
 
 def add_decimate_modifier(obj, ratio):
@@ -26,6 +26,16 @@ cursor_top = mathutils.Vector((0,0))
 max_cursor = mathutils.Vector((0,0))
 new_nodes = []
 
+# material node tree pointer -> { node role: node name }
+# node roles are ("ID", id) or ("TYPE", type, *keywords) tuples,
+# names are re-validated on lookup and roles with no node are never cached (always re-scanned),
+# as nodes can be added, removed or renamed anywhere without going through these helpers.
+NODE_ROLE_CACHE = {}
+
+# library name -> node group / image datablock, appended from or found for the _LIB.blend library
+LIB_NODE_GROUPS = {}
+LIB_IMAGES = {}
+
 
 def get_shader_input(mat, input):
     if mat.node_tree is not None:
@@ -95,6 +105,71 @@ def get_node_by_id(nodes, id):
     return None
 
 
+def clear_node_cache(nodes = None):
+    if nodes is None:
+        NODE_ROLE_CACHE.clear()
+    else:
+        try:
+            NODE_ROLE_CACHE.pop(nodes.id_data.as_pointer(), None)
+        except:
+            NODE_ROLE_CACHE.clear()
+
+
+def node_has_role(node, role):
+    if role[0] == "ID":
+        return vars.NODE_PREFIX in node.name and role[1] in node.name
+    elif node.type == role[1]:
+        for keyword in role[2:]:
+            if keyword not in node.name:
+                return False
+        return True
+    return False
+
+
+def get_cached_nodes(nodes, *roles):
+    """Returns the first node matching each role, remembering the found nodes per node tree,
+       so repeated lookups don't re-scan the whole tree.
+       Cached nodes are checked with nodes.get(name), any roles not found are searched for in one scan."""
+    try:
+        cache = NODE_ROLE_CACHE.setdefault(nodes.id_data.as_pointer(), {})
+    except:
+        cache = {}
+    found = {}
+    search = []
+    for role in roles:
+        name = cache.get(role)
+        if name is not None:
+            node = nodes.get(name)
+            if node and node_has_role(node, role):
+                found[role] = node
+                continue
+            del cache[role]
+        search.append(role)
+    if search:
+        for role in search:
+            found[role] = None
+        for node in nodes:
+            for role in search:
+                if found[role] is None and node_has_role(node, role):
+                    found[role] = node
+        for role in search:
+            if found[role]:
+                cache[role] = found[role].name
+    return [found[role] for role in roles]
+
+
+def get_cached_nodes_by_id(nodes, *ids):
+    return get_cached_nodes(nodes, *(("ID", id) for id in ids))
+
+
+def get_image_node(nodes, texture_type):
+    return get_cached_nodes(nodes, ("ID", "(" + texture_type + ")"))[0]
+
+
+def get_output_node(nodes):
+    return get_cached_nodes(nodes, ("TYPE", "OUTPUT_MATERIAL"))[0]
+
+
 def get_node_by_id_and_type(nodes, id, type):
     for node in nodes:
         if vars.NODE_PREFIX in node.name and id in node.name and node.type == type:
@@ -319,7 +394,7 @@ def set_node_input(node, socket, value):
         try:
             node.inputs[socket].default_value = utils.match_dimensions(node.inputs[socket].default_value, value)
         except:
-            utils.log_detail("Unable to set input: " + node.name + "[" + str(socket) + "]")
+            utils.log_detail("Unable to set input: %s[%s]", node.name, socket)
 
 
 def set_node_output(node, socket, value):
@@ -327,7 +402,7 @@ def set_node_output(node, socket, value):
         try:
             node.outputs[socket].default_value = utils.match_dimensions(node.outputs[socket].default_value, value)
         except:
-            utils.log_detail("Unable to set output: " + node.name + "[" + str(socket) + "]")
+            utils.log_detail("Unable to set output: %s[%s]", node.name, socket)
 
 
 def link_nodes(links, from_node, from_socket, to_node, to_socket):
@@ -335,8 +410,7 @@ def link_nodes(links, from_node, from_socket, to_node, to_socket):
         try:
             links.new(from_node.outputs[from_socket], to_node.inputs[to_socket])
         except:
-            utils.log_detail("Unable to link: " + from_node.name + "[" + str(from_socket) + "] to " +
-                  to_node.name + "[" + str(to_socket) + "]")
+            utils.log_detail("Unable to link: %s[%s] to %s[%s]", from_node.name, from_socket, to_node.name, to_socket)
 
 
 def unlink_node(links, node, socket):
@@ -347,7 +421,7 @@ def unlink_node(links, node, socket):
                 if link is not None:
                     links.remove(link)
         except:
-            utils.log_info("Unable to remove links from: " + node.name + "[" + str(socket) + "]")
+            utils.log_info("Unable to remove links from: %s[%s]", node.name, socket)
 
 
 def reset_shader(mat_cache, nodes, links, shader_label, shader_name, shader_group, mix_shader_group):
@@ -355,6 +429,8 @@ def reset_shader(mat_cache, nodes, links, shader_label, shader_name, shader_grou
     bsdf_id = "(" + str(shader_name) + "_BSDF)"
     mix_id = "(" + str(shader_name) + "_MIX)"
 
+    clear_node_cache(nodes)
+
     group_node: bpy.types.Node = None
     mix_node: bpy.types.Node = None
     bsdf_node: bpy.types.Node = None
@@ -371,7 +447,7 @@ def reset_shader(mat_cache, nodes, links, shader_label, shader_name, shader_grou
         if n.type == "BSDF_PRINCIPLED" and has_bsdf and shader_name in n.name:
 
             if not bsdf_node:
-                utils.log_info("Keeping old BSDF: " + n.name)
+                utils.log_info("Keeping old BSDF: %s", n.name)
                 bsdf_node = n
             else:
                 nodes.remove(n)
@@ -380,14 +456,14 @@ def reset_shader(mat_cache, nodes, links, shader_label, shader_name, shader_grou
 
             if has_group_node and shader_group in n.node_tree.name:
                 if not group_node:
-                    utils.log_info("Keeping old shader group: " + n.name)
+                    utils.log_info("Keeping old shader group: %s", n.name)
                     group_node = n
                 else:
                     nodes.remove(n)
 
             elif has_mix_node and mix_shader_group in n.node_tree.name:
                 if not mix_node:
-                    utils.log_info("Keeping old mix shader group: " + n.name)
+                    utils.log_info("Keeping old mix shader group: %s", n.name)
                     mix_node = n
                 else:
                     nodes.remove(n)
@@ -422,7 +498,7 @@ def reset_shader(mat_cache, nodes, links, shader_label, shader_name, shader_grou
         group_node.name = utils.unique_name(shader_id)
         group_node.label = shader_label
         group_node.width = 240
-        utils.log_info("Creating new shader group: " + group_node.name)
+        utils.log_info("Creating new shader group: %s", group_node.name)
 
     if has_mix_node and not mix_node:
         group = get_node_group(mix_shader_group)
@@ -431,7 +507,7 @@ def reset_shader(mat_cache, nodes, links, shader_label, shader_name, shader_grou
         mix_node.name = utils.unique_name(mix_id)
         mix_node.label = shader_label
         mix_node.width = 240
-        utils.log_info("Creating new mix shader group: " + mix_node.name)
+        utils.log_info("Creating new mix shader group: %s", mix_node.name)
 
     # if the mix node has no BSDF input, then it doesn't need the Principled BSDF to mix:
     if has_mix_node and has_bsdf:
@@ -446,7 +522,7 @@ def reset_shader(mat_cache, nodes, links, shader_label, shader_name, shader_grou
         bsdf_node.name = utils.unique_name(bsdf_id)
         bsdf_node.label = shader_label
         bsdf_node.width = 240
-        utils.log_info("Creating new BSDF: " + bsdf_node.name)
+        utils.log_info("Creating new BSDF: %s", bsdf_node.name)
 
     if not output_node:
         output_node = nodes.new("ShaderNodeOutputMaterial")
@@ -504,28 +580,70 @@ def clean_unused_image_nodes(nodes):
                 to_remove.append(node)
 
     for node in to_remove:
-        utils.log_info("Removing unused image node: " + node.name)
+        utils.log_info("Removing unused image node: %s", node.name)
         nodes.remove(node)
 
+    if to_remove:
+        clear_node_cache(nodes)
+
+
+
+def clear_lib_cache():
+    LIB_NODE_GROUPS.clear()
+    LIB_IMAGES.clear()
+
+
+def get_lib_datablock(lib_cache, name):
+    datablock = lib_cache.get(name)
+    if datablock:
+        try:
+            if (vars.NODE_PREFIX in datablock.name and name in datablock.name and
+                vars.VERSION_STRING in datablock.name):
+                return datablock
+        except ReferenceError:
+            pass
+        del lib_cache[name]
+    return None
+
+
+def find_lib_datablocks(lib_cache, collection, names):
+    """Finds the current version of each named library datablock in one pass of the collection,
+       adding them to the library cache. Returns the names that were not found."""
+    missing = [ name for name in names if not get_lib_datablock(lib_cache, name) ]
+    if missing:
+        for datablock in collection:
+            if vars.NODE_PREFIX in datablock.name and vars.VERSION_STRING in datablock.name:
+                for name in missing:
+                    if name not in lib_cache and name in datablock.name:
+                        lib_cache[name] = datablock
+        missing = [ name for name in missing if name not in lib_cache ]
+    return missing
 
 
 def get_node_group(name):
-    for group in bpy.data.node_groups:
-        if vars.NODE_PREFIX in group.name and name in group.name:
-            if vars.VERSION_STRING in group.name:
-                return group
+    group = get_lib_datablock(LIB_NODE_GROUPS, name)
+    if group:
+        return group
+    if not find_lib_datablocks(LIB_NODE_GROUPS, bpy.data.node_groups, [name]):
+        return LIB_NODE_GROUPS[name]
     return fetch_node_group(name)
 
 
 def check_node_groups():
-    for name in vars.NODE_GROUPS:
-        get_node_group(name)
+    missing = find_lib_datablocks(LIB_NODE_GROUPS, bpy.data.node_groups, vars.NODE_GROUPS)
+    if missing:
+        append_lib_datablocks(missing, [])
+        for name in missing:
+            if name not in LIB_NODE_GROUPS:
+                utils.log_error("Trying to append group: " + name + ", _LIB.blend library file not found?")
+                raise ValueError(f"Unable to append node group: {name} from library file!")
 
 
 def remove_all_groups():
     for group in bpy.data.node_groups:
         if vars.NODE_PREFIX in group.name:
             bpy.data.node_groups.remove(group)
+    LIB_NODE_GROUPS.clear()
 
 
 def rebuild_node_groups():
@@ -554,16 +672,7 @@ def find_node_by_type(nodes, type):
 
 
 def find_node_by_type_and_keywords(nodes, type, *keywords):
-    for node in nodes:
-        if node.type == type:
-            match = True
-            for keyword in keywords:
-                if not keyword in node.name:
-                    match = False
-                    break
-            if match:
-                return node
-    return None
+    return get_cached_nodes(nodes, ("TYPE", type) + keywords)[0]
 
 
 def find_node_group_by_keywords(nodes, *keywords):
@@ -603,77 +712,77 @@ def store_texture_mapping(image_node, mat_cache, texture_type):
         embedded = image_node.image.packed_file is not None
         image = image_node.image
         mat_cache.set_texture_mapping(texture_type, texture_path, embedded, image, location, rotation, scale)
-        utils.log_info("Storing texture Mapping for: " + mat_cache.material.name + " texture: " + texture_type)
+        utils.log_info("Storing texture Mapping for: %s texture: %s", mat_cache.material.name, texture_type)
         image_id = "(" + texture_type + ")"
         image_node.name = utils.unique_name(image_id)
 
 
 # link utils
 
-def append_node_group(path, object_name):
-    filename = "_LIB.blend"
-    datablock = "NodeTree"
-    file = os.path.join(path, filename)
-    appended_group = None
-
-    if os.path.exists(file):
-        bpy.ops.wm.append(directory=os.path.join(path, filename, datablock), filename=object_name, set_fake=False, link=False)
-
-        for g in bpy.data.node_groups:
-            if object_name in g.name and vars.NODE_PREFIX not in g.name:
-                appended_group = g
-                g.name = utils.unique_name(object_name)
-
-    return appended_group
-
-
-def fetch_node_group(name):
+def get_lib_files():
+    files = []
     paths = []
     local_path = utils.local_path()
     if local_path:
         paths.append(local_path)
     paths.append(os.path.dirname(os.path.realpath(__file__)))
-
     for path in paths:
-        utils.log_info("Trying to append: " + path + " > " + name)
-        if os.path.exists(path):
-            group = append_node_group(path, name)
-            if group is not None:
-                return group
-    utils.log_error("Trying to append group: " + name + ", _LIB.blend library file not found?")
-    raise ValueError(f"Unable to append node group: {name} from library file!")
-
-
-def append_lib_image(path, object_name):
-    filename = "_LIB.blend"
-    datablock = "Image"
-    file = os.path.join(path, filename)
-    appended_image = None
+        file = os.path.join(path, "_LIB.blend")
+        if os.path.exists(file):
+            files.append(file)
+    return files
+
+
+def append_lib_datablocks(group_names, image_names):
+    """Appends all the named node groups and images from the _LIB.blend library,
+       in a single library load per library file, without using any operators.
+       Each appended datablock is given a unique versioned name and added to the library cache."""
+    group_names = [ name for name in group_names if name not in LIB_NODE_GROUPS ]
+    image_names = [ name for name in image_names if name not in LIB_IMAGES ]
+
+    for file in get_lib_files():
+        if not group_names and not image_names:
+            break
+
+        utils.log_info("Appending from library: %s", file)
+
+        with bpy.data.libraries.load(file, link = False) as (data_from, data_to):
+            group_names_from = [ name for name in group_names if name in data_from.node_groups ]
+            image_names_from = [ name for name in image_names if name in data_from.images ]
+            data_to.node_groups = group_names_from
+            data_to.images = image_names_from
+
+        for name, group in zip(group_names_from, data_to.node_groups):
+            if group:
+                utils.log_info("Appended node group: %s", name)
+                group.name = utils.unique_name(name)
+                LIB_NODE_GROUPS[name] = group
+
+        for name, image in zip(image_names_from, data_to.images):
+            if image:
+                utils.log_info("Appended image: %s", name)
+                image.name = utils.unique_name(name)
+                LIB_IMAGES[name] = image
 
-    if os.path.exists(file):
-        bpy.ops.wm.append(directory=os.path.join(path, filename, datablock), filename=object_name, set_fake=False, link=False)
+        group_names = [ name for name in group_names if name not in LIB_NODE_GROUPS ]
+        image_names = [ name for name in image_names if name not in LIB_IMAGES ]
 
-        for i in bpy.data.images:
-            if object_name in i.name and vars.NODE_PREFIX not in i.name:
-                appended_image = i
-                i.name = utils.unique_name(object_name)
 
-    return appended_image
+def fetch_node_group(name):
+    append_lib_datablocks([name], [])
+    if name in LIB_NODE_GROUPS:
+        return LIB_NODE_GROUPS[name]
+    utils.log_error("Trying to append group: " + name + ", _LIB.blend library file not found?")
+    raise ValueError(f"Unable to append node group: {name} from library file!")
 
 
 def fetch_lib_image(name):
-    paths = []
-    local_path = utils.local_path()
-    if local_path:
-        paths.append(local_path)
-    paths.append(os.path.dirname(os.path.realpath(__file__)))
-
-    for path in paths:
-        utils.log_info("Trying to append image: " + path + " > " + name)
-        if os.path.exists(path):
-            image = append_lib_image(path, name)
-            if image:
-                return image
+    image = get_lib_datablock(LIB_IMAGES, name)
+    if image:
+        return image
+    append_lib_datablocks([], [name])
+    if name in LIB_IMAGES:
+        return LIB_IMAGES[name]
     utils.log_error("Trying to append image: " + name + ", _LIB.blend library file not found?")
     raise ValueError("Unable to append iamge from library file!")
 
@@ -684,15 +793,7 @@ def get_shader_nodes(mat, shader_name):
         shader_id = "(" + str(shader_name) + ")"
         bsdf_id = "(" + str(shader_name) + "_BSDF)"
         mix_id = "(" + str(shader_name) + "_MIX)"
-        shader_node = bsdf_node = mix_node = None
-        for node in nodes:
-            if vars.NODE_PREFIX in node.name:
-                if shader_id in node.name:
-                    shader_node = node
-                elif bsdf_id in node.name:
-                    bsdf_node = node
-                elif mix_id in node.name:
-                    mix_node = node
+        shader_node, bsdf_node, mix_node = get_cached_nodes_by_id(nodes, shader_id, bsdf_id, mix_id)
         return bsdf_node, shader_node, mix_node
     return None, None, None
 
@@ -710,13 +811,13 @@ def get_tiling_node(mat, shader_name, texture_type):
     if mat and mat.node_tree:
         nodes = mat.node_tree.nodes
         shader_id = "(tiling_" + shader_name + "_" + texture_type + "_mapping)"
-        return get_node_by_id(nodes, shader_id)
+        return get_cached_nodes_by_id(nodes, shader_id)[0]
     return None
 
 
 def get_tiling_node_from_nodes(nodes, shader_name, texture_type):
     shader_id = "(tiling_" + shader_name + "_" + texture_type + "_mapping)"
-    return get_node_by_id(nodes, shader_id)
+    return get_cached_nodes_by_id(nodes, shader_id)[0]
 
 
 def get_custom_image_node(nodes, node_name, image, location = (0, 0)):
@@ -19,7 +19,10 @@ import bpy
 import textwrap
 
 from . import addon_updater_ops
-from . import rigging, rigify_mapping_data, characters, sculpting, physics, modifiers, channel_mixer, nodeutils, utils, params, vars
+from . import rigging, characters, sculpting, physics, modifiers, channel_mixer, nodeutils, utils, params, vars
+
+# the rigify mapping tables are only loaded on first use
+rigify_mapping_data = utils.lazy_import("rigify_mapping_data")
 
 PIPELINE_TAB_NAME = "CC/iC Pipeline"
 CREATE_TAB_NAME = "CC/iC Create"
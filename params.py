@@ -1778,21 +1778,56 @@ SHADER_LOOKUP = [
 ]
 
 
-def get_texture_type(json_id):
+# lookup tables compiled from the definitions above (first definition wins, as with the linear searches)
+TEXTURE_TYPE_BY_JSON_ID = {}
+TEXTURE_JSON_ID_BY_TYPE = {}
+TEXTURE_SUFFIXES_BY_TYPE = {}
+SHADER_LOOKUP_BY_MATERIAL_TYPE = {}
+SHADER_DEF_BY_NAME = {}
+SHADER_DEF_BY_RL_SHADER = {}
+SHADER_TEXTURE_SOCKETS = {}
+PROP_MATRIX = {}
+
+
+def compile_lookup_tables():
     for tex_info in TEXTURE_TYPES:
-        if tex_info[1] == json_id:
-            return tex_info[0]
-    return "NONE"
+        TEXTURE_TYPE_BY_JSON_ID.setdefault(tex_info[1], tex_info[0])
+        TEXTURE_JSON_ID_BY_TYPE.setdefault(tex_info[0], tex_info[1])
+        TEXTURE_SUFFIXES_BY_TYPE.setdefault(tex_info[0], tex_info[2])
+
+    for shader in SHADER_LOOKUP:
+        SHADER_LOOKUP_BY_MATERIAL_TYPE.setdefault(shader[0], shader)
+
+    for shader_def in SHADER_MATRIX:
+        names = shader_def["name"] if type(shader_def["name"]) is list else [shader_def["name"]]
+        for name in names:
+            SHADER_DEF_BY_NAME.setdefault(name, shader_def)
+        SHADER_DEF_BY_RL_SHADER.setdefault(shader_def["rl_shader"], shader_def)
+        sockets = {}
+        if "textures" in shader_def.keys():
+            for tex_def in shader_def["textures"]:
+                sockets.setdefault(tex_def[2], tex_def[0])
+        SHADER_TEXTURE_SOCKETS[id(shader_def)] = sockets
+        for input in shader_def["inputs"]:
+            PROP_MATRIX.setdefault(input[1], []).append([shader_def, input])
+
+
+def get_texture_type(json_id):
+    return TEXTURE_TYPE_BY_JSON_ID.get(json_id, "NONE")
 
 
 def get_texture_json_id(tex_type):
-    for tex_info in TEXTURE_TYPES:
-        if tex_info[0] == tex_type:
-            return tex_info[1]
-    return None
+    return TEXTURE_JSON_ID_BY_TYPE.get(tex_type)
+
+
+def get_texture_suffix_list(tex_type):
+    return TEXTURE_SUFFIXES_BY_TYPE.get(tex_type, [])
 
 
 def get_shader_texture_socket(shader_def, tex_type):
+    sockets = SHADER_TEXTURE_SOCKETS.get(id(shader_def))
+    if sockets is not None:
+        return sockets.get(tex_type)
     if "textures" in shader_def.keys():
         for tex_def in shader_def["textures"]:
             if tex_def[2] == tex_type:
@@ -1801,29 +1836,24 @@ def get_shader_texture_socket(shader_def, tex_type):
 
 
 def get_shader_name(mat_cache):
-    for shader in SHADER_LOOKUP:
-        if shader[0] == mat_cache.material_type:
-            return shader[2]
+    shader = SHADER_LOOKUP_BY_MATERIAL_TYPE.get(mat_cache.material_type)
+    if shader:
+        return shader[2]
     return "rl_pbr_shader"
 
 
 def get_rl_shader_name(mat_cache):
-    for shader in SHADER_LOOKUP:
-        if shader[0] == mat_cache.material_type:
-            return shader[1]
+    shader = SHADER_LOOKUP_BY_MATERIAL_TYPE.get(mat_cache.material_type)
+    if shader:
+        return shader[1]
     return "Pbr"
 
 
 def get_prop_matrix(prop_name):
-    matrix = []
-    for shader in SHADER_MATRIX:
-        for input in shader["inputs"]:
-            if input[1] == prop_name:
-                matrix.append([shader, input])
-    return matrix
+    return list(PROP_MATRIX.get(prop_name, []))
 
 
-def get_shader_def(shader_name):
+def find_shader_def(shader_name):
     for shader_def in SHADER_MATRIX:
         if type(shader_def["name"]) is list:
             for name in shader_def["name"]:
@@ -1835,13 +1865,75 @@ def get_shader_def(shader_name):
     return None
 
 
+def get_shader_def(shader_name):
+    # shader names that are not exact definition names are matched by substring once and remembered
+    if shader_name not in SHADER_DEF_BY_NAME:
+        SHADER_DEF_BY_NAME[shader_name] = find_shader_def(shader_name)
+    return SHADER_DEF_BY_NAME[shader_name]
+
+
 def get_rl_shader_def(rl_shader_name):
     if rl_shader_name == "Tra":
         rl_shader_name = "Pbr"
-    for shader_def in SHADER_MATRIX:
-        if shader_def["rl_shader"] == rl_shader_name:
-            return shader_def
-    return None
+    return SHADER_DEF_BY_RL_SHADER.get(rl_shader_name)
+
+
+# per shader definition update plans: { id(shader_def): { prop_name: plan } }
+PROP_UPDATE_PLANS = {}
+
+
+def compile_prop_update_plans(shader_def):
+    plans = {}
+
+    def get_plan(prop_name):
+        if prop_name not in plans:
+            plans[prop_name] = { "inputs": [], "bsdf": [], "textures": [], "mapping": [], "modifiers": [], "settings": [] }
+        return plans[prop_name]
+
+    for key in ["inputs", "bsdf"]:
+        if key in shader_def.keys():
+            for input_def in shader_def[key]:
+                for prop_name in set(input_def[2:]):
+                    get_plan(prop_name)[key].append(input_def)
+
+    if "textures" in shader_def.keys():
+        for texture_def in shader_def["textures"]:
+            if len(texture_def) > 5:
+                for prop_name in set(texture_def[5:]):
+                    get_plan(prop_name)["textures"].append(texture_def)
+
+    if "mapping" in shader_def.keys():
+        # mapping defs follow the [texture_type] of the mapping node they belong to,
+        # so keep the texture type header in front of the dependent mapping defs.
+        header = None
+        for mapping_def in shader_def["mapping"]:
+            if len(mapping_def) == 1:
+                header = mapping_def
+            elif header:
+                for prop_name in set(mapping_def[3:]):
+                    mapping = get_plan(prop_name)["mapping"]
+                    if header not in mapping:
+                        mapping.append(header)
+                    mapping.append(mapping_def)
+
+    for key in ["modifiers", "settings"]:
+        if key in shader_def.keys():
+            for item_def in shader_def[key]:
+                get_plan(item_def[0])[key].append(item_def)
+
+    return plans
+
+
+def get_prop_update_plan(shader_def, prop_name):
+    """Returns the parts of the shader definition that depend on prop_name:
+       { "inputs": [], "bsdf": [], "textures": [], "mapping": [], "modifiers": [], "settings": [] }
+       or None if nothing in the shader depends on it.
+    """
+    plans = PROP_UPDATE_PLANS.get(id(shader_def))
+    if plans is None:
+        plans = compile_prop_update_plans(shader_def)
+        PROP_UPDATE_PLANS[id(shader_def)] = plans
+    return plans.get(prop_name)
 
 
 def get_mat_shader_def(mat_cache):
@@ -1945,4 +2037,7 @@ JSON_PHYSICS_MATERIAL = {
     "Self Collision": False,
     "Self Collision Margin": 0.0,
     "Stiffness Frequency": 10.0
-}
\ No newline at end of file
+}
+
+
+compile_lookup_tables()
@@ -16,6 +16,7 @@
 
 import math
 import os
+import numpy
 
 import bpy
 
@@ -36,7 +37,7 @@ def apply_cloth_settings(obj, cloth_type):
     obj_cache = props.get_object_cache(obj)
     obj_cache.cloth_settings = cloth_type
 
-    utils.log_info("Setting " + obj.name + " cloth settings to: " + cloth_type)
+    utils.log_info("Setting %s cloth settings to: %s", obj.name, cloth_type)
     mod.settings.vertex_group_mass = prefs.physics_group + "_Pin"
     mod.settings.time_scale = 1
     if cloth_type == "HAIR":
@@ -179,12 +180,12 @@ def add_collision_physics(chr_cache, obj, obj_cache):
         if not collision_mod:
             collision_mod = obj.modifiers.new(utils.unique_name("Collision"), type="COLLISION")
         collision_mod.settings.thickness_outer = COLLISION_THICKESS
-        utils.log_info("Collision Modifier: " + collision_mod.name + " applied to " + obj.name)
+        utils.log_info("Collision Modifier: %s applied to %s", collision_mod.name, obj.name)
 
     elif obj_cache.collision_physics == "OFF":
 
         remove_collision_physics(chr_cache, obj, obj_cache)
-        utils.log_info("Collision Physics disabled for: " + obj.name)
+        utils.log_info("Collision Physics disabled for: %s", obj.name)
 
 
 def remove_collision_physics(chr_cache, obj, obj_cache):
@@ -197,7 +198,7 @@ def remove_collision_physics(chr_cache, obj, obj_cache):
 
     for mod in obj.modifiers:
         if mod.type == "COLLISION":
-            utils.log_info("Removing Collision modifer: " + mod.name + " from: " + obj.name)
+            utils.log_info("Removing Collision modifer: %s from: %s", mod.name, obj.name)
             obj.modifiers.remove(mod)
 
 
@@ -219,7 +220,7 @@ def add_cloth_physics(chr_cache, obj, add_weight_maps = False):
 
         # Create the Cloth modifier
         cloth_mod = obj.modifiers.new(utils.unique_name("Cloth"), type="CLOTH")
-        utils.log_info("Cloth Modifier: " + cloth_mod.name + " applied to " + obj.name)
+        utils.log_info("Cloth Modifier: %s applied to %s", cloth_mod.name, obj.name)
 
         # Create the physics pin vertex group if it doesn't exist
         pin_group = prefs.physics_group + "_Pin"
@@ -234,7 +235,7 @@ def add_cloth_physics(chr_cache, obj, add_weight_maps = False):
         if parent_action:
             frame_start = math.floor(parent_action.frame_range[0])
             frame_count = math.ceil(parent_action.frame_range[1])
-        utils.log_info("Setting " + obj.name + " bake cache frame range to [1-" + str(frame_count) + "]")
+        utils.log_info("Setting %s bake cache frame range to [1-%s]", obj.name, frame_count)
         cloth_mod.point_cache.frame_start = frame_start
         cloth_mod.point_cache.frame_end = frame_count
 
@@ -260,7 +261,7 @@ def add_cloth_physics(chr_cache, obj, add_weight_maps = False):
         modifiers.move_mod_last(obj, cloth_mod)
 
     elif obj_cache.cloth_physics == "OFF":
-        utils.log_info("Cloth Physics disabled for: " + obj.name)
+        utils.log_info("Cloth Physics disabled for: %s", obj.name)
 
 
 def remove_cloth_physics(obj):
@@ -274,7 +275,7 @@ def remove_cloth_physics(obj):
     # Remove the Cloth modifier
     for mod in obj.modifiers:
         if mod.type == "CLOTH":
-            utils.log_info("Removing Cloth modifer: " + mod.name + " from: " + obj.name)
+            utils.log_info("Removing Cloth modifer: %s from: %s", mod.name, obj.name)
             obj.modifiers.remove(mod)
 
     # Remove any weight maps
@@ -293,7 +294,7 @@ def remove_cloth_physics(obj):
 
     pin_group = prefs.physics_group + "_Pin"
     if mods == 0 and pin_group in obj.vertex_groups:
-        utils.log_info("Removing vertex group: " + pin_group + " from: " + obj.name)
+        utils.log_info("Removing vertex group: %s from: %s", pin_group, obj.name)
         obj.vertex_groups.remove(obj.vertex_groups[pin_group])
 
 
@@ -303,7 +304,7 @@ def remove_all_physics_mods(obj):
     Used when (re)building the character materials.
     """
 
-    utils.log_info("Removing all related physics modifiers from: " + obj.name)
+    utils.log_info("Removing all related physics modifiers from: %s", obj.name)
     for mod in obj.modifiers:
         if mod.type == "VERTEX_WEIGHT_EDIT" and vars.NODE_PREFIX in mod.name:
             obj.modifiers.remove(mod)
@@ -319,7 +320,7 @@ def enable_collision_physics(chr_cache, obj):
     props = bpy.context.scene.CC3ImportProps
     obj_cache = chr_cache.get_object_cache(obj)
     obj_cache.collision_physics = "ON"
-    utils.log_info("Enabling Collision physics for: " + obj.name)
+    utils.log_info("Enabling Collision physics for: %s", obj.name)
     add_collision_physics(chr_cache, obj, obj_cache)
 
 
@@ -327,7 +328,7 @@ def disable_collision_physics(chr_cache, obj):
     props = bpy.context.scene.CC3ImportProps
     obj_cache = chr_cache.get_object_cache(obj)
     obj_cache.collision_physics = "OFF"
-    utils.log_info("Disabling Collision physics for: " + obj.name)
+    utils.log_info("Disabling Collision physics for: %s", obj.name)
     remove_collision_physics(chr_cache, obj, obj_cache)
 
 
@@ -335,7 +336,7 @@ def enable_cloth_physics(chr_cache, obj, add_weight_maps = True):
     props = bpy.context.scene.CC3ImportProps
     obj_cache = chr_cache.get_object_cache(obj)
     obj_cache.cloth_physics = "ON"
-    utils.log_info("Enabling Cloth physics for: " + obj.name)
+    utils.log_info("Enabling Cloth physics for: %s", obj.name)
     add_cloth_physics(chr_cache, obj, add_weight_maps)
 
 
@@ -343,16 +344,16 @@ def disable_cloth_physics(chr_cache, obj):
     props = bpy.context.scene.CC3ImportProps
     obj_cache = chr_cache.get_object_cache(obj)
     obj_cache.cloth_physics = "OFF"
-    utils.log_info("Removing cloth physics for: " + obj.name)
+    utils.log_info("Removing cloth physics for: %s", obj.name)
     remove_cloth_physics(obj)
 
 
 def create_body_collision_mesh(chr_cache, obj):
-    utils.log_info(f"Creating body collision mesh from: {obj.name}")
+    utils.log_info("Creating body collision mesh from: %s", obj.name)
     # remove old collsion mesh
     collision_body = None
     if utils.object_exists_is_mesh(chr_cache.collision_body) and collision_body != obj:
-        utils.log_info(f"Removing old collision mesh: {chr_cache.collision_body}")
+        utils.log_info("Removing old collision mesh: %s", chr_cache.collision_body)
         utils.delete_mesh_object(chr_cache.collision_body)
     # clone obj
     collision_body = utils.duplicate_object(obj)
@@ -369,7 +370,7 @@ def create_body_collision_mesh(chr_cache, obj):
         modifiers.move_mod_first(collision_body, mod)
         # remove materials
         collision_body.data.materials.clear()
-    utils.log_info(f"Storing collision mesh: {collision_body.name}")
+    utils.log_info("Storing collision mesh: %s", collision_body.name)
     chr_cache.collision_body = collision_body
     collision_body.hide_set(True)
     collision_body.hide_render = True
@@ -411,7 +412,7 @@ def get_weight_map_image(chr_cache, obj, mat, create = False):
         weight_map.save()
         # keep track of which weight maps we created:
         mat_cache.temp_weight_map = weight_map
-        utils.log_info("Weight-map image: " + weight_map.name + " created and saved.")
+        utils.log_info("Weight-map image: %s created and saved.", weight_map.name)
 
     return weight_map
 
@@ -433,7 +434,7 @@ def add_material_weight_map(chr_cache, obj, mat, create = False):
         if weight_map is not None:
             attach_material_weight_map(obj, mat, weight_map)
     else:
-        utils.log_info("Cloth Physics has been disabled for: " + obj.name)
+        utils.log_info("Cloth Physics has been disabled for: %s", obj.name)
         return
 
 
@@ -446,10 +447,10 @@ def remove_material_weight_maps(obj, mat):
 
     edit_mod, mix_mod = modifiers.get_material_weight_map_mods(obj, mat)
     if edit_mod is not None:
-        utils.log_info("Removing weight map vertex edit modifer: " + edit_mod.name)
+        utils.log_info("Removing weight map vertex edit modifer: %s", edit_mod.name)
         obj.modifiers.remove(edit_mod)
     if mix_mod is not None:
-        utils.log_info("Removing weight map vertex mix modifer: " + mix_mod.name)
+        utils.log_info("Removing weight map vertex mix modifer: %s", mix_mod.name)
         obj.modifiers.remove(mix_mod)
 
 
@@ -512,6 +513,7 @@ def is_cloth_physics_enabled(mat_cache, mat, obj):
     return False
 
 
+@utils.profiled("attach_material_weight_map")
 def attach_material_weight_map(obj, mat, weight_map):
     """Attaches a weight map to the object's material via a 'Vertex Weight Edit' modifier.
 
@@ -531,9 +533,9 @@ def attach_material_weight_map(obj, mat, weight_map):
                 tex = t
         if tex is None:
             tex = bpy.data.textures.new(utils.unique_name(tex_name), "IMAGE")
-            utils.log_info("Texture: " + tex.name + " created for weight map transfer")
+            utils.log_info("Texture: %s created for weight map transfer", tex.name)
         else:
-            utils.log_info("Texture: " + tex.name + " already exists for weight map transfer")
+            utils.log_info("Texture: %s already exists for weight map transfer", tex.name)
         tex.image = weight_map
 
         # Create the physics pin vertex group and the material weightmap group if they don't exist:
@@ -549,7 +551,7 @@ def attach_material_weight_map(obj, mat, weight_map):
             weight_vertex_group = obj.vertex_groups[material_group]
         # The material weight map group should contain only those vertices affected by the material, default weight to 1.0
         meshutils.clear_vertex_group(obj, weight_vertex_group)
-        mat_vert_indices = meshutils.get_material_vertex_indices(obj, mat)
+        mat_vert_indices = meshutils.get_material_vertex_indices(obj, mat, use_cache = True)
         weight_vertex_group.add(mat_vert_indices, 1.0, 'ADD')
         # The pin group should contain all vertices in the mesh default weighted to 1.0
         meshutils.set_vertex_group(obj, pin_vertex_group, 1.0)
@@ -592,74 +594,168 @@ def attach_material_weight_map(obj, mat, weight_map):
         mix_mod.mix_set = 'B' #'ALL'
         mix_mod.mix_mode = 'SET'
         mix_mod.invert_mask_vertex_group = False
-        utils.log_info("Weight map: " + weight_map.name + " applied to: " + obj.name + "/" + mat.name)
+        utils.log_info("Weight map: %s applied to: %s/%s", weight_map.name, obj.name, mat.name)
 
 
 def get_physx_weight_range(obj):
-    props = bpy.context.scene.CC3ImportProps
-    prefs = bpy.context.preferences.addons[__name__.partition(".")[0]].preferences
-
-    vertex_group_name = prefs.physics_group + "_Pin"
-
+    """Returns the range of the pin weights sampled from the material weight maps."""
     weight_min = 1.0
     weight_max = 0.0
 
-    if obj.type == "MESH" and vertex_group_name in obj.vertex_groups:
+    pin_weights = get_pin_weights(obj)
+    if pin_weights is not None and len(pin_weights) > 0:
+        weight_min = min(float(pin_weights.min()), weight_min)
+        weight_max = max(float(pin_weights.max()), weight_max)
 
-        if utils.set_active_object(obj):
+    return weight_min, weight_max
 
-            # normalize pin vertex group range
-            pin_vg = obj.vertex_groups[vertex_group_name]
-            pin_vg_index = pin_vg.index
 
-            # determine range
-            for vertex in obj.data.vertices:
-                for vg in vertex.groups:
-                    if vg.group == pin_vg_index:
-                        w = vg.weight
-                        weight_min = min(w, weight_min)
-                        weight_max = max(w, weight_max)
+def get_image_intensity(image):
+    """Reads the image pixels once into a (height, width) numpy array of the pixel intensities.
+       Returns None if the image has no pixels (e.g. the image file is missing)."""
+    width, height = image.size
+    channels = image.channels
+    if width == 0 or height == 0 or channels == 0:
+        return None
+    pixels = numpy.empty(width * height * channels, dtype = numpy.float32)
+    image.pixels.foreach_get(pixels)
+    pixels = pixels.reshape(height, width, channels)
+    if channels >= 3:
+        return pixels[:, :, :3].mean(axis = 2)
+    return pixels[:, :, 0]
+
+
+def sample_image_intensity(intensity, uvs):
+    """Bilinear sample of the image intensity at the uv coordinates, repeating the image outside 0 - 1."""
+    height, width = intensity.shape
+    x = numpy.mod(uvs[:, 0], 1.0) * width - 0.5
+    y = numpy.mod(uvs[:, 1], 1.0) * height - 0.5
+    x0 = numpy.floor(x)
+    y0 = numpy.floor(y)
+    fx = x - x0
+    fy = y - y0
+    x0 = x0.astype(numpy.int64) % width
+    y0 = y0.astype(numpy.int64) % height
+    x1 = (x0 + 1) % width
+    y1 = (y0 + 1) % height
+    top = intensity[y0, x0] * (1 - fx) + intensity[y0, x1] * fx
+    bottom = intensity[y1, x0] * (1 - fx) + intensity[y1, x1] * fx
+    return top * (1 - fy) + bottom * fy
+
+
+def get_material_pin_weights(obj, mat, weight_map, uv_layer_name = "", intensity = None):
+    """Samples the weight map at the uv coordinates of the material's vertices
+       and returns the vertex indices and their pin weights.
+
+    This reproduces the weight map modifiers: the inverse of the weight map intensity,
+    normalized across the material's vertices. As with the modifier's uv texture coordinates,
+    each vertex takes the uv of its first loop over all the polygons of the mesh.
+    Returns empty arrays if the weight map has no pixels.
+    """
+    mesh = obj.data
+    uv_layer = None
+    if uv_layer_name and uv_layer_name in mesh.uv_layers:
+        uv_layer = mesh.uv_layers[uv_layer_name]
+    elif mesh.uv_layers.active:
+        uv_layer = mesh.uv_layers.active
+    slot_indices = meshutils.get_material_slot_indices(obj, mat)
+    num_polys = len(mesh.polygons)
+    num_loops = len(mesh.loops)
+    if intensity is None:
+        intensity = get_image_intensity(weight_map)
+    if intensity is None or uv_layer is None or not slot_indices or num_polys == 0:
+        return numpy.empty(0, dtype = numpy.int32), numpy.empty(0, dtype = numpy.float32)
+
+    material_indices = numpy.empty(num_polys, dtype = numpy.int32)
+    loop_totals = numpy.empty(num_polys, dtype = numpy.int32)
+    loop_verts = numpy.empty(num_loops, dtype = numpy.int32)
+    loop_uvs = numpy.empty(num_loops * 2, dtype = numpy.float32)
+    mesh.polygons.foreach_get("material_index", material_indices)
+    mesh.polygons.foreach_get("loop_total", loop_totals)
+    mesh.loops.foreach_get("vertex_index", loop_verts)
+    uv_layer.data.foreach_get("uv", loop_uvs)
+    loop_mask = numpy.repeat(numpy.isin(material_indices, slot_indices), loop_totals)
+
+    indices = numpy.unique(loop_verts[loop_mask])
+    if len(indices) == 0:
+        return indices, numpy.empty(0, dtype = numpy.float32)
+    # one uv per vertex, from the first loop of each vertex in any polygon (not just the material's)
+    loop_vert_indices, first = numpy.unique(loop_verts, return_index = True)
+    texco = loop_uvs.reshape(-1, 2)[first[numpy.searchsorted(loop_vert_indices, indices)]]
+
+    weights = 1.0 - sample_image_intensity(intensity, texco)
+    weight_min = weights.min()
+    weight_max = weights.max()
+    if weight_max > weight_min:
+        weights = (weights - weight_min) / (weight_max - weight_min)
+    return indices, numpy.clip(weights, 0.0, 1.0)
+
+
+def get_pin_weights(obj):
+    """Samples the material weight map images into a numpy array of pin weights for every vertex in the mesh,
+       with vertices not covered by a weight map weighted 1.0.
+       Returns None if the object has no pin vertex group.
+    """
+    prefs = bpy.context.preferences.addons[__name__.partition(".")[0]].preferences
 
-    return weight_min, weight_max
+    vertex_group_name = prefs.physics_group + "_Pin"
 
+    if obj.type != "MESH" or vertex_group_name not in obj.vertex_groups:
+        return None
 
-def remap_physx_weight_maps(obj):
-    props = bpy.context.scene.CC3ImportProps
+    pin_weights = numpy.ones(len(obj.data.vertices), dtype = numpy.float32)
+    intensities = {}
+    done = []
+
+    for mat in obj.data.materials:
+        if mat and mat not in done:
+            done.append(mat)
+            edit_mod, mix_mod = modifiers.get_material_weight_map_mods(obj, mat)
+            if edit_mod and edit_mod.mask_texture and edit_mod.mask_texture.image:
+                weight_map = edit_mod.mask_texture.image
+                if weight_map not in intensities:
+                    intensities[weight_map] = get_image_intensity(weight_map)
+                if intensities[weight_map] is None:
+                    utils.log_warn("Weight map image %s has no pixels, skipping.", weight_map.name)
+                    continue
+                indices, weights = get_material_pin_weights(obj, mat, weight_map, edit_mod.mask_tex_uv_layer, intensities[weight_map])
+                pin_weights[indices] = weights
+
+    return pin_weights
+
+
+def sample_pin_weights(obj, bake = False):
+    """Writes the pin vertex group directly from the material weight map images, without applying any modifiers.
+
+    Live mode (bake = False) updates the pin group and keeps the weight map modifiers (e.g. while painting).
+    Bake mode (bake = True) also remaps the pin weight range to 0 - 1 and removes the weight map modifiers (e.g. for export).
+    """
     prefs = bpy.context.preferences.addons[__name__.partition(".")[0]].preferences
 
-    vertex_group_name = prefs.physics_group + "_Pin"
+    pin_weights = get_pin_weights(obj)
 
-    if obj.type == "MESH" and vertex_group_name in obj.vertex_groups:
+    if pin_weights is not None:
 
-        if utils.set_active_object(obj):
+        pin_vg = obj.vertex_groups[prefs.physics_group + "_Pin"]
+        num_verts = len(pin_weights)
 
-            # apply vg mods
+        if bake:
+            # remap range to 0->1
+            weight_min = pin_weights.min() if num_verts else 0.0
+            weight_max = pin_weights.max() if num_verts else 1.0
+            if weight_max > weight_min:
+                pin_weights = (pin_weights - weight_min) / (weight_max - weight_min)
             edit_mods, mix_mods = modifiers.get_weight_map_mods(obj)
-            for mod in edit_mods:
-                bpy.ops.object.modifier_apply(modifier=mod.name)
-            for mod in mix_mods:
-                bpy.ops.object.modifier_apply(modifier=mod.name)
-
-            # normalize pin vertex group range
-            pin_vg = obj.vertex_groups[vertex_group_name]
-            pin_vg_index = pin_vg.index
-            weight_min = 1.0
-            weight_max = 0.0
-
-            # determine range
-            for vertex in obj.data.vertices:
-                for vg in vertex.groups:
-                    if vg.group == pin_vg_index:
-                        w = vg.weight
-                        weight_min = min(w, weight_min)
-                        weight_max = max(w, weight_max)
+            for mod in edit_mods + mix_mods:
+                obj.modifiers.remove(mod)
 
-            # remap range to 0->1
-            for vertex in obj.data.vertices:
-                for vg in vertex.groups:
-                    if vg.group == pin_vg_index:
-                        w = utils.inverse_lerp(weight_min, weight_max, vg.weight)
-                        vg.weight = w
+        meshutils.set_vertex_group_weights(pin_vg, numpy.arange(num_verts, dtype = numpy.int32), pin_weights)
+
+
+@utils.profiled("remap_physx_weight_maps")
+def remap_physx_weight_maps(obj):
+    """Bakes the weight map modifiers into the pin vertex group, remapped to the range 0 - 1."""
+    sample_pin_weights(obj, bake = True)
 
 
 def count_weightmaps(objects):
@@ -762,6 +858,10 @@ def end_paint_weight_map(chr_cache, op):
         if bpy.context.mode != "OBJECT":
             bpy.ops.object.mode_set(mode="OBJECT")
         bpy.context.space_data.shading.type = props.paint_store_render
+        # update the pin weights from the painted weight map
+        obj = bpy.context.object
+        if obj and obj.type == "MESH":
+            sample_pin_weights(obj, bake = False)
         #props.paint_image.save()
         op.report({'INFO'}, f"Weightmap painting done, Save the weightmap to preserve changes.")
     except Exception as e:
@@ -778,13 +878,13 @@ def save_dirty_weight_maps(chr_cache, objects):
 
     for weight_map in maps:
         if weight_map.is_dirty:
-            utils.log_info("Dirty weight map: " + weight_map.name + " : " + weight_map.filepath)
+            utils.log_info("Dirty weight map: %s : %s", weight_map.name, weight_map.filepath)
             weight_map.save()
-            utils.log_info("Weight Map: " + weight_map.name + " saved to: " + weight_map.filepath)
+            utils.log_info("Weight Map: %s saved to: %s", weight_map.name, weight_map.filepath)
         if not os.path.exists(weight_map.filepath):
-            utils.log_info("Missing weight map: " + weight_map.name + " : " + weight_map.filepath)
+            utils.log_info("Missing weight map: %s : %s", weight_map.name, weight_map.filepath)
             weight_map.save()
-            utils.log_info("Weight Map: " + weight_map.name + " saved to: " + weight_map.filepath)
+            utils.log_info("Weight Map: %s saved to: %s", weight_map.name, weight_map.filepath)
 
 
 def delete_selected_weight_map(chr_cache, obj, mat):
@@ -795,7 +895,7 @@ def delete_selected_weight_map(chr_cache, obj, mat):
             abs_image_path = bpy.path.abspath(image.filepath)
             try:
                 if image.filepath != "" and os.path.exists(abs_image_path):
-                    utils.log_info("Removing weight map file: " + abs_image_path)
+                    utils.log_info("Removing weight map file: %s", abs_image_path)
                     os.remove(abs_image_path)
             except Exception as e:
                 utils.log_error("Removing weight map file: " + abs_image_path, e)
@@ -822,7 +922,7 @@ def set_physics_bake_range(obj, start, end):
                 if frame_end > end:
                     end = frame_end
 
-            utils.log_info("Setting " + obj.name + " bake cache frame range to [" + str(start) + " -" + str(end) + "]")
+            utils.log_info("Setting %s bake cache frame range to [%s -%s]", obj.name, start, end)
             cloth_mod.point_cache.frame_start = start
             cloth_mod.point_cache.frame_end = end
             return True
@@ -907,7 +1007,7 @@ def enable_physics(chr_cache, physics_objects = None):
 
 def add_all_physics(chr_cache):
     if chr_cache:
-        utils.log_info(f"Adding all Physics modifiers to: {chr_cache.character_name}")
+        utils.log_info("Adding all Physics modifiers to: %s", chr_cache.character_name)
         utils.log_indent()
         arm = chr_cache.get_armature()
         objects = chr_cache.get_all_objects(False, False)
@@ -916,7 +1016,7 @@ def add_all_physics(chr_cache):
         for obj_cache in chr_cache.object_cache:
             obj = obj_cache.object
             if utils.object_exists_is_mesh(obj) and obj not in objects_processed:
-                utils.log_info(f"Object: {obj.name}:")
+                utils.log_info("Object: %s:", obj.name)
                 utils.log_indent()
                 remove_all_physics_mods(obj)
                 for mat in obj.data.materials:
@@ -937,7 +1037,7 @@ def add_all_physics(chr_cache):
 
 def remove_all_physics(chr_cache):
     if chr_cache:
-        utils.log_info(f"Removing all Physics modifiers from: {chr_cache.character_name}")
+        utils.log_info("Removing all Physics modifiers from: %s", chr_cache.character_name)
         utils.log_indent()
         objects_processed = []
         for obj_cache in chr_cache.object_cache:
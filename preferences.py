@@ -19,6 +19,10 @@ import bpy
 from . import addon_updater_ops, utils, vars
 
 
+def update_log_level(self, context):
+    utils.set_log_level(self.log_level)
+
+
 def reset_preferences():
     prefs = bpy.context.preferences.addons[__name__.partition(".")[0]].preferences
     prefs.render_target = "EEVEE"
@@ -143,7 +147,7 @@ class CC3ToolsAddonPreferences(bpy.types.AddonPreferences):
                         ("ALL","All","Log everything to console."),
                         ("WARN","Warnings & Errors","Log warnings and error messages to console."),
                         ("ERRORS","Just Errors","Log only errors to console."),
-                    ], default="ERRORS", name = "(Debug) Log Level")
+                    ], default="ERRORS", name = "(Debug) Log Level", update=update_log_level)
 
     render_target: bpy.props.EnumProperty(items=[
                         ("EEVEE","Eevee","Build shaders for Eevee rendering."),
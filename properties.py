@@ -15,8 +15,50 @@
 # along with CC/iC Blender Tools.  If not, see <https://www.gnu.org/licenses/>.
 
 import bpy, os
+from bpy.app.handlers import persistent
 
-from . import channel_mixer, imageutils, meshutils, sculpting, materials, rigify_mapping_data, modifiers, nodeutils, shaders, params, physics, basic, jsonutils, utils, vars
+from . import channel_mixer, imageutils, meshutils, sculpting, materials, modifiers, nodeutils, shaders, params, physics, basic, jsonutils, utils, vars
+
+# the rigify mapping tables are only loaded on first use
+rigify_mapping_data = utils.lazy_import("rigify_mapping_data")
+
+
+# runtime (non-RNA) lookup index of the character material and object caches:
+#   { chr_cache pointer: ({ material pointer: mat_cache }, { object pointer: obj_cache }) }
+# python references to collection items are invalidated when their collections change,
+# so any change to the cache collections must clear this index.
+CACHE_INDEX = {}
+
+
+def clear_cache_index():
+    CACHE_INDEX.clear()
+
+
+def clear_runtime_caches():
+    clear_cache_index()
+    nodeutils.clear_node_cache()
+    nodeutils.clear_lib_cache()
+    meshutils.clear_material_vertex_cache()
+    clear_property_updates()
+
+
+@persistent
+def clear_cache_index_handler(*args):
+    clear_runtime_caches()
+    PROPERTY_UPDATE_HISTORY.clear()
+
+
+@persistent
+def undo_redo_handler(*args):
+    clear_runtime_caches()
+    reapply_property_updates()
+
+
+def get_id_pointer(id):
+    try:
+        return id.as_pointer()
+    except:
+        return None
 
 
 def open_mouth_update(self, context):
@@ -79,11 +121,128 @@ def eye_close_update(self, context):
             pass
 
 
+# pending property updates: { (update function, character index, object name, material name, prop_name, update_mode): None }
+# RNA update callbacks are coalesced and flushed once per UI tick, unless in immediate mode.
+PROPERTY_UPDATE_QUEUE = {}
+# the property updates flushed since the file was loaded, in the order they were last applied (same keys as the queue).
+# Blender pushes the undo step straight after the RNA update callback, before the flush writes the shader nodes,
+# so the undo steps hold the new parameter values with the old node values: undo and redo re-apply these.
+PROPERTY_UPDATE_HISTORY = {}
+PROPERTY_UPDATE_IMMEDIATE = False
+PROPERTY_UPDATE_TIMER_RUNNING = False
+PROPERTY_UPDATES_DROPPED = 0
+
+
+def set_property_updates_immediate(immediate):
+    """Scripted and batch changes to the material parameters should set immediate mode
+       so that each change is applied to the shader nodes before returning.
+       Returns the previous mode."""
+    global PROPERTY_UPDATE_IMMEDIATE
+    previous = PROPERTY_UPDATE_IMMEDIATE
+    PROPERTY_UPDATE_IMMEDIATE = immediate
+    if immediate:
+        flush_property_updates()
+    return previous
+
+
+def is_property_update_immediate():
+    return PROPERTY_UPDATE_IMMEDIATE or bpy.app.background
+
+
+def get_character_cache_index(chr_cache):
+    props = bpy.context.scene.CC3ImportProps
+    for i, imp_cache in enumerate(props.import_cache):
+        if imp_cache == chr_cache:
+            return i
+    return -1
+
+
+def queue_property_update(func, chr_cache, context_obj, context_mat, prop_name, update_mode):
+    global PROPERTY_UPDATE_TIMER_RUNNING, PROPERTY_UPDATES_DROPPED
+
+    key = (func,
+           get_character_cache_index(chr_cache),
+           context_obj.name if context_obj else "",
+           context_mat.name if context_mat else "",
+           prop_name,
+           update_mode)
+
+    if key in PROPERTY_UPDATE_QUEUE:
+        PROPERTY_UPDATES_DROPPED += 1
+    else:
+        PROPERTY_UPDATE_QUEUE[key] = None
+
+    if not PROPERTY_UPDATE_TIMER_RUNNING:
+        PROPERTY_UPDATE_TIMER_RUNNING = True
+        bpy.app.timers.register(property_update_timer, first_interval = 0.0)
+
+
+def property_update_timer():
+    global PROPERTY_UPDATE_TIMER_RUNNING
+    PROPERTY_UPDATE_TIMER_RUNNING = False
+    flush_property_updates()
+    return None
+
+
+def flush_property_updates():
+    """Applies all pending property updates, in the order they were first changed."""
+    if not PROPERTY_UPDATE_QUEUE:
+        return
+
+    queue = list(PROPERTY_UPDATE_QUEUE.keys())
+    PROPERTY_UPDATE_QUEUE.clear()
+
+    props = bpy.context.scene.CC3ImportProps
+
+    for func, chr_index, obj_name, mat_name, prop_name, update_mode in queue:
+        if chr_index < 0 or chr_index >= len(props.import_cache):
+            continue
+        chr_cache = props.import_cache[chr_index]
+        context_obj = bpy.data.objects.get(obj_name) if obj_name else None
+        context_mat = bpy.data.materials.get(mat_name) if mat_name else None
+        try:
+            func(chr_cache, context_obj, context_mat, prop_name, update_mode)
+        except Exception as e:
+            utils.log_error("flush_property_updates(): unable to update property: " + prop_name, e)
+        key = (func, chr_index, obj_name, mat_name, prop_name, update_mode)
+        PROPERTY_UPDATE_HISTORY.pop(key, None)
+        PROPERTY_UPDATE_HISTORY[key] = None
+
+    if PROPERTY_UPDATES_DROPPED:
+        utils.log_detail("Property updates: %d applied, %d redundant updates dropped in total.", len(queue), PROPERTY_UPDATES_DROPPED)
+
+
+def reapply_property_updates():
+    """Re-applies the flushed property updates from the current (undone or redone) parameter values,
+       so the shader nodes match the restored parameters."""
+    global PROPERTY_UPDATE_TIMER_RUNNING
+
+    if not PROPERTY_UPDATE_HISTORY:
+        return
+
+    for key in PROPERTY_UPDATE_HISTORY.keys():
+        PROPERTY_UPDATE_QUEUE[key] = None
+
+    if is_property_update_immediate():
+        flush_property_updates()
+    elif not PROPERTY_UPDATE_TIMER_RUNNING:
+        PROPERTY_UPDATE_TIMER_RUNNING = True
+        bpy.app.timers.register(property_update_timer, first_interval = 0.0)
+
+
+def clear_property_updates():
+    global PROPERTY_UPDATE_TIMER_RUNNING
+    PROPERTY_UPDATE_QUEUE.clear()
+    # the (non persistent) timer is removed by loading a file but survives an undo,
+    # so make sure it is gone before clearing the flag, or no further updates would be flushed.
+    if bpy.app.timers.is_registered(property_update_timer):
+        bpy.app.timers.unregister(property_update_timer)
+    PROPERTY_UPDATE_TIMER_RUNNING = False
+
+
 def update_property(self, context, prop_name, update_mode = None):
     if vars.block_property_update: return
 
-    utils.start_timer()
-
     props = bpy.context.scene.CC3ImportProps
     chr_cache: CC3CharacterCache = props.get_context_character_cache(context)
 
@@ -92,40 +251,51 @@ def update_property(self, context, prop_name, update_mode = None):
         # get the context (currently active) material
         context_obj = context.object
         context_mat = utils.context_material(context)
-        context_mat_cache = chr_cache.get_material_cache(context_mat)
 
-        if context_obj and context_mat and context_mat_cache:
+        if update_mode is None:
+            update_mode = props.update_mode
+
+        if is_property_update_immediate():
+            apply_property_update(chr_cache, context_obj, context_mat, prop_name, update_mode)
+        else:
+            queue_property_update(apply_property_update, chr_cache, context_obj, context_mat, prop_name, update_mode)
 
-            if update_mode is None:
-                update_mode = props.update_mode
 
-            all_materials_cache = chr_cache.get_all_materials_cache()
-            linked = get_linked_material_types(context_mat_cache)
-            paired = get_paired_material_types(context_mat_cache)
+def apply_property_update(chr_cache, context_obj, context_mat, prop_name, update_mode):
 
-            for mat_cache in all_materials_cache:
-                mat = mat_cache.material
+    utils.start_timer()
 
-                if mat:
+    context_mat_cache = chr_cache.get_material_cache(context_mat)
 
-                    if mat == context_mat:
-                        # Always update the currently active material
-                        update_shader_property(context_obj, mat, mat_cache, prop_name)
+    if context_obj and context_mat and context_mat_cache:
+
+        all_materials_cache = chr_cache.get_all_materials_cache()
+        linked = get_linked_material_types(context_mat_cache)
+        paired = get_paired_material_types(context_mat_cache)
+
+        for mat_cache in all_materials_cache:
+            mat = mat_cache.material
+
+            if mat:
 
-                    elif mat_cache.material_type in paired:
-                        # Update paired materials
+                if mat == context_mat:
+                    # Always update the currently active material
+                    update_shader_property(context_obj, mat, mat_cache, prop_name)
+
+                elif mat_cache.material_type in paired:
+                    # Update paired materials
+                    set_linked_property(prop_name, context_mat_cache, mat_cache)
+                    update_shader_property(context_obj, mat, mat_cache, prop_name)
+
+                elif update_mode == "UPDATE_LINKED":
+                    # Update all other linked materials in the imported objects material cache:
+                    if mat_cache.material_type in linked:
                         set_linked_property(prop_name, context_mat_cache, mat_cache)
                         update_shader_property(context_obj, mat, mat_cache, prop_name)
 
-                    elif update_mode == "UPDATE_LINKED":
-                        # Update all other linked materials in the imported objects material cache:
-                        if mat_cache.material_type in linked:
-                            set_linked_property(prop_name, context_mat_cache, mat_cache)
-                            update_shader_property(context_obj, mat, mat_cache, prop_name)
-
-            # these properties will cause the eye displacement vertex group to change...
-            if prop_name in ["eye_iris_depth_radius", "eye_iris_scale", "eye_iris_radius"]:
-                meshutils.rebuild_eye_vertex_groups(chr_cache)
+        # these properties will cause the eye displacement vertex group to change...
+        if prop_name in ["eye_iris_depth_radius", "eye_iris_scale", "eye_iris_radius"]:
+            meshutils.rebuild_eye_vertex_groups(chr_cache)
 
     utils.log_timer("update_property()", "ms")
 
@@ -133,16 +303,26 @@ def update_property(self, context, prop_name, update_mode = None):
 def update_basic_property(self, context, prop_name, update_mode = None):
     if vars.block_property_update: return
 
-    utils.start_timer()
-
     props = bpy.context.scene.CC3ImportProps
     chr_cache: CC3CharacterCache = props.get_context_character_cache(context)
+
     if chr_cache:
-        all_materials_cache = chr_cache.get_all_materials_cache()
-        for mat_cache in all_materials_cache:
-            mat = mat_cache.material
-            if mat:
-                basic.update_basic_material(mat, mat_cache, prop_name)
+
+        if is_property_update_immediate():
+            apply_basic_property_update(chr_cache, None, None, prop_name, update_mode)
+        else:
+            queue_property_update(apply_basic_property_update, chr_cache, None, None, prop_name, update_mode)
+
+
+def apply_basic_property_update(chr_cache, context_obj, context_mat, prop_name, update_mode):
+
+    utils.start_timer()
+
+    all_materials_cache = chr_cache.get_all_materials_cache()
+    for mat_cache in all_materials_cache:
+        mat = mat_cache.material
+        if mat:
+            basic.update_basic_material(mat, mat_cache, prop_name)
 
     utils.log_timer("update_property()", "ms")
 
@@ -165,15 +345,11 @@ def get_paired_material_types(mat_cache):
 
 def set_linked_property(prop_name, active_mat_cache, mat_cache):
     vars.block_property_update = True
-    code = ""
 
     try:
-        parameters = mat_cache.parameters
-        active_parameters = active_mat_cache.parameters
-        code = "parameters." + prop_name + " = active_parameters." + prop_name
-        exec(code, None, locals())
+        setattr(mat_cache.parameters, prop_name, getattr(active_mat_cache.parameters, prop_name))
     except Exception as e:
-        utils.log_error("set_linked_property(): Unable to evaluate: " + code, e)
+        utils.log_error("set_linked_property(): Unable to evaluate: parameters." + prop_name + " = active_parameters." + prop_name, e)
 
     vars.block_property_update = False
 
@@ -184,28 +360,35 @@ def update_shader_property(obj, mat, mat_cache, prop_name):
     if mat and mat.node_tree and mat_cache:
 
         shader_name = params.get_shader_name(mat_cache)
-        bsdf_node, shader_node, mix_node = nodeutils.get_shader_nodes(mat, shader_name)
         shader_def = params.get_shader_def(shader_name)
 
         if shader_def:
 
-            if "inputs" in shader_def.keys():
-                update_shader_input(shader_node, mat_cache, prop_name, shader_def["inputs"])
+            # only update the sockets, mappings, modifiers and settings that depend on this property
+            plan = params.get_prop_update_plan(shader_def, prop_name)
+            if not plan:
+                return
 
-            if "bsdf" in shader_def.keys():
-                update_bsdf_input(bsdf_node, mat_cache, prop_name, shader_def["bsdf"])
+            if plan["inputs"] or plan["bsdf"]:
+                bsdf_node, shader_node, mix_node = nodeutils.get_shader_nodes(mat, shader_name)
 
-            if "textures" in shader_def.keys():
-                update_shader_tiling(shader_name, mat, mat_cache, prop_name, shader_def["textures"])
+                if plan["inputs"]:
+                    update_shader_input(shader_node, mat_cache, prop_name, plan["inputs"])
 
-            if "mapping" in shader_def.keys():
-                update_shader_mapping(shader_name, mat, mat_cache, prop_name, shader_def["mapping"])
+                if plan["bsdf"]:
+                    update_bsdf_input(bsdf_node, mat_cache, prop_name, plan["bsdf"])
 
-            if "modifiers" in shader_def.keys():
-                update_object_modifier(obj, mat_cache, prop_name, shader_def["modifiers"])
+            if plan["textures"]:
+                update_shader_tiling(shader_name, mat, mat_cache, prop_name, plan["textures"])
 
-            if "settings" in shader_def.keys():
-                update_material_setting(mat, mat_cache, prop_name, shader_def["settings"])
+            if plan["mapping"]:
+                update_shader_mapping(shader_name, mat, mat_cache, prop_name, plan["mapping"])
+
+            if plan["modifiers"]:
+                update_object_modifier(obj, mat_cache, prop_name, plan["modifiers"])
+
+            if plan["settings"]:
+                update_material_setting(mat, mat_cache, prop_name, plan["settings"])
 
         else:
             utils.log_error("No shader definition for: " + shader_name)
@@ -258,8 +441,7 @@ def update_object_modifier(obj, mat_cache, prop_name, mod_defs):
                 mod = modifiers.get_object_modifier(obj, mod_type, mod_name)
                 if mod:
                     try:
-                        parameters = mat_cache.parameters
-                        exec(code, None, locals())
+                        exec(shaders.compile_code(code), None, { "mod": mod, "parameters": mat_cache.parameters })
                     except:
                         utils.log_error("update_object_modifier(): unable to execute: " + code)
 
@@ -273,8 +455,7 @@ def update_material_setting(mat, mat_cache, prop_name, setting_defs):
 
             if mat_cache.material_type == material_type:
                 try:
-                    parameters = mat_cache.parameters
-                    exec(code, None, locals())
+                    exec(shaders.compile_code(code), None, { "mat": mat, "parameters": mat_cache.parameters })
                 except:
                     utils.log_error("update_material_setting(): unable to execute: " + code)
 
@@ -298,6 +479,7 @@ def reset_parameters(context = bpy.context):
     return
 
 
+@utils.profiled("update_all_properties")
 def update_all_properties(context, update_mode = None):
     if vars.block_property_update: return
 
@@ -377,7 +559,7 @@ def init_character_property_defaults(chr_cache, chr_json):
             processed.append(obj)
 
             obj_json = jsonutils.get_object_json(chr_json, obj)
-            utils.log_info("Object: " + obj.name + " (" + obj_cache.object_type + ")")
+            utils.log_info("Object: %s (%s)", obj.name, obj_cache.object_type)
             utils.log_indent()
 
             for mat in obj.data.materials:
@@ -388,7 +570,7 @@ def init_character_property_defaults(chr_cache, chr_json):
                     if mat_cache and not mat_cache.user_added:
 
                         mat_json = jsonutils.get_material_json(obj_json, mat)
-                        utils.log_info("Material: " + mat.name + " (" + mat_cache.material_type + ")")
+                        utils.log_info("Material: %s (%s)", mat.name, mat_cache.material_type)
                         utils.log_indent()
 
                         if mat_cache.is_eye():
@@ -407,7 +589,7 @@ def init_character_property_defaults(chr_cache, chr_json):
 
 def init_material_property_defaults(obj, mat, obj_cache, mat_cache, obj_json, mat_json):
     if obj and obj_cache and mat and mat_cache:
-        utils.log_info("Re-Initializing Material Property Defaults: " + mat.name + " (" + mat_cache.material_type + ")")
+        utils.log_info("Re-Initializing Material Property Defaults: %s (%s)", mat.name, mat_cache.material_type)
         if mat_cache.is_eye():
             cornea_mat, cornea_mat_cache = materials.get_cornea_mat(obj, mat, mat_cache)
             mat_json = jsonutils.get_material_json(obj_json, cornea_mat)
@@ -1174,12 +1356,12 @@ class CC3CharacterCache(bpy.types.PropertyGroup):
     def check_paths(self):
         local_dir = utils.local_path()
         if local_dir and self.import_file and not os.path.exists(self.import_file):
-            utils.log_info(f"Import source file no longer exists: {self.import_file}")
+            utils.log_info("Import source file no longer exists: %s", self.import_file)
             dir, name = os.path.split(self.import_file)
             local_file = os.path.join(local_dir, name)
-            utils.log_info(f"Looking for moved source file: {local_file}")
+            utils.log_info("Looking for moved source file: %s", local_file)
             if os.path.exists(local_file):
-                utils.log_info(f"Updating paths to source file: {local_file}")
+                utils.log_info("Updating paths to source file: %s", local_file)
                 self.import_dir = local_dir
                 self.import_file = local_file
                 key_file, key_ext = os.path.splitext(self.import_key_file)
@@ -1332,42 +1514,52 @@ class CC3CharacterCache(bpy.types.PropertyGroup):
         if mat:
             for mat_cache in self.tongue_material_cache:
                 if mat_cache.material == mat:
+                    clear_cache_index()
                     utils.remove_from_collection(self.tongue_material_cache, mat_cache)
                     return
             for mat_cache in self.teeth_material_cache:
                 if mat_cache.material == mat:
+                    clear_cache_index()
                     utils.remove_from_collection(self.teeth_material_cache, mat_cache)
                     return
             for mat_cache in self.head_material_cache:
                 if mat_cache.material == mat:
+                    clear_cache_index()
                     utils.remove_from_collection(self.head_material_cache, mat_cache)
                     return
             for mat_cache in self.skin_material_cache:
                 if mat_cache.material == mat:
+                    clear_cache_index()
                     utils.remove_from_collection(self.skin_material_cache, mat_cache)
                     return
             for mat_cache in self.tearline_material_cache:
                 if mat_cache.material == mat:
+                    clear_cache_index()
                     utils.remove_from_collection(self.tearline_material_cache, mat_cache)
                     return
             for mat_cache in self.eye_occlusion_material_cache:
                 if mat_cache.material == mat:
+                    clear_cache_index()
                     utils.remove_from_collection(self.eye_occlusion_material_cache, mat_cache)
                     return
             for mat_cache in self.eye_material_cache:
                 if mat_cache.material == mat:
+                    clear_cache_index()
                     utils.remove_from_collection(self.eye_material_cache, mat_cache)
                     return
             for mat_cache in self.hair_material_cache:
                 if mat_cache.material == mat:
+                    clear_cache_index()
                     utils.remove_from_collection(self.hair_material_cache, mat_cache)
                     return
             for mat_cache in self.pbr_material_cache:
                 if mat_cache.material == mat:
+                    clear_cache_index()
                     utils.remove_from_collection(self.pbr_material_cache, mat_cache)
                     return
             for mat_cache in self.sss_material_cache:
                 if mat_cache.material == mat:
+                    clear_cache_index()
                     utils.remove_from_collection(self.sss_material_cache, mat_cache)
                     return
 
@@ -1375,9 +1567,14 @@ class CC3CharacterCache(bpy.types.PropertyGroup):
         """Returns the object cache for this object.
         """
         if obj:
-            for obj_cache in self.object_cache:
-                if obj_cache.object == obj:
-                    return obj_cache
+            pointer = get_id_pointer(obj)
+            if pointer:
+                obj_cache = self.get_cache_index()[1].get(pointer)
+                if obj_cache and obj_cache.object != obj:
+                    # stale index entry, rebuild and try again
+                    clear_cache_index()
+                    obj_cache = self.get_cache_index()[1].get(pointer)
+                return obj_cache
         return None
 
     def remove_object_cache(self, obj):
@@ -1388,24 +1585,22 @@ class CC3CharacterCache(bpy.types.PropertyGroup):
         if obj:
             for obj_cache in self.object_cache:
                 if obj_cache.object == obj:
+                    clear_cache_index()
                     utils.remove_from_collection(self.object_cache, obj_cache)
                     return
 
     def has_objects(self, objects):
         """Returns True if any of the objects are in the object cache.
         """
-        for obj_cache in self.object_cache:
-            if obj_cache.object in objects:
+        for obj in objects:
+            if self.get_object_cache(obj) is not None:
                 return True
         return False
 
     def has_object(self, obj):
         """Returns True if any of the objects are in the object cache.
         """
-        for obj_cache in self.object_cache:
-            if obj_cache.object == obj:
-                return True
-        return False
+        return self.get_object_cache(obj) is not None
 
     def get_armature(self):
         try:
@@ -1432,6 +1627,7 @@ class CC3CharacterCache(bpy.types.PropertyGroup):
                 if obj_cache.object and obj_cache.object.type == "ARMATURE":
                     self.rig_original_rig = obj_cache.object
                     obj_cache.object = new_arm
+                    clear_cache_index()
         except:
             pass
 
@@ -1443,7 +1639,8 @@ class CC3CharacterCache(bpy.types.PropertyGroup):
 
         obj_cache = self.get_object_cache(obj)
         if obj_cache is None:
-            utils.log_info(f"Creating Object Cache for: {obj.name}")
+            utils.log_info("Creating Object Cache for: %s", obj.name)
+            clear_cache_index()
             obj_cache = self.object_cache.add()
             obj_cache.object = obj
             obj_cache.source_name = utils.strip_name(obj.name)
@@ -1467,6 +1664,30 @@ class CC3CharacterCache(bpy.types.PropertyGroup):
         return True
 
 
+    def get_cache_index(self):
+        """Returns the (material, object) lookup index for this character cache, building it if needed."""
+        key = self.as_pointer()
+        cache_index = CACHE_INDEX.get(key)
+        if cache_index is None:
+            mat_index = {}
+            obj_index = {}
+            # in the same order of precedence as the original collection scans
+            for collection in [ self.eye_material_cache, self.hair_material_cache, self.head_material_cache,
+                                self.skin_material_cache, self.tongue_material_cache, self.teeth_material_cache,
+                                self.tearline_material_cache, self.eye_occlusion_material_cache,
+                                self.pbr_material_cache, self.sss_material_cache ]:
+                for mat_cache in collection:
+                    pointer = get_id_pointer(mat_cache.material)
+                    if pointer and pointer not in mat_index:
+                        mat_index[pointer] = mat_cache
+            for obj_cache in self.object_cache:
+                pointer = get_id_pointer(obj_cache.object)
+                if pointer and pointer not in obj_index:
+                    obj_index[pointer] = obj_cache
+            cache_index = (mat_index, obj_index)
+            CACHE_INDEX[key] = cache_index
+        return cache_index
+
     def get_material_cache(self, mat):
         """Returns the material cache for this material.
 
@@ -1474,43 +1695,21 @@ class CC3CharacterCache(bpy.types.PropertyGroup):
         """
 
         if mat is not None:
-            for mat_cache in self.eye_material_cache:
-                if mat_cache.material == mat:
-                    return mat_cache
-            for mat_cache in self.hair_material_cache:
-                if mat_cache.material == mat:
-                    return mat_cache
-            for mat_cache in self.head_material_cache:
-                if mat_cache.material == mat:
-                    return mat_cache
-            for mat_cache in self.skin_material_cache:
-                if mat_cache.material == mat:
-                    return mat_cache
-            for mat_cache in self.tongue_material_cache:
-                if mat_cache.material == mat:
-                    return mat_cache
-            for mat_cache in self.teeth_material_cache:
-                if mat_cache.material == mat:
-                    return mat_cache
-            for mat_cache in self.tearline_material_cache:
-                if mat_cache.material == mat:
-                    return mat_cache
-            for mat_cache in self.eye_occlusion_material_cache:
-                if mat_cache.material == mat:
-                    return mat_cache
-            for mat_cache in self.pbr_material_cache:
-                if mat_cache.material == mat:
-                    return mat_cache
-            for mat_cache in self.sss_material_cache:
-                if mat_cache.material == mat:
-                    return mat_cache
+            pointer = get_id_pointer(mat)
+            if pointer:
+                mat_cache = self.get_cache_index()[0].get(pointer)
+                if mat_cache and mat_cache.material != mat:
+                    # stale index entry, rebuild and try again
+                    clear_cache_index()
+                    mat_cache = self.get_cache_index()[0].get(pointer)
+                return mat_cache
         return None
 
 
     def add_or_reuse_material_cache(self, collection):
         for i in range(0, len(collection)):
             if collection[i].material is None:
-                utils.log_info(f"Reusing material cache: {str(i)}")
+                utils.log_info("Reusing material cache: %s", str(i))
                 return collection[i]
         return collection.add()
 
@@ -1553,14 +1752,15 @@ class CC3CharacterCache(bpy.types.PropertyGroup):
 
         mat_cache = self.get_material_cache(mat)
         if mat_cache is None and mat:
-            utils.log_info(f"Creating Material Cache for: {mat.name} (type = {create_type})")
+            utils.log_info("Creating Material Cache for: %s (type = %s)", mat.name, create_type)
             collection = self.get_material_cache_collection(create_type)
+            clear_cache_index()
             mat_cache = self.add_or_reuse_material_cache(collection)
             mat_cache.material = mat
             mat_cache.source_name = utils.strip_name(mat.name)
             mat_cache.material_type = create_type
             if copy_from:
-                utils.log_info(f"Copying material cache settings and parameters: {mat.name} (type = {create_type})")
+                utils.log_info("Copying material cache settings and parameters: %s (type = %s)", mat.name, create_type)
                 mat_cache.copy_material_cache(copy_from)
         return mat_cache
 
@@ -1584,8 +1784,9 @@ class CC3CharacterCache(bpy.types.PropertyGroup):
     def recast_type(self, collection, index, chr_json):
         mat_cache = collection[index]
         mat = mat_cache.material
-        utils.log_info(f"Recasting material cache: {mat.name}")
+        utils.log_info("Recasting material cache: %s", mat.name)
         material_type = mat_cache.material_type
+        clear_cache_index()
         mat_cache.material = None
         mat_cache.source_name = ""
         new_mat_cache = self.add_material_cache(mat, material_type)
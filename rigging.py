@@ -27,7 +27,9 @@ from . import properties
 from . import modifiers
 from . import physics
 from . import bones
-from . import rigify_mapping_data
+
+# the rigify mapping tables are only loaded on first use
+rigify_mapping_data = utils.lazy_import("rigify_mapping_data")
 
 
 class BoundingBox:
@@ -96,6 +98,7 @@ def prune_meta_rig(meta_rig):
             pelvis_l.name = "pelvis"
 
 
+@utils.profiled("rigify.add_def_bones")
 def add_def_bones(chr_cache, cc3_rig, rigify_rig):
     """Adds and parents twist deformation bones to the rigify deformation bones.
        Twist bones are parented to their corresponding limb bones.
@@ -126,7 +129,7 @@ def add_def_bones(chr_cache, cc3_rig, rigify_rig):
         if len(def_copy) > 7:
             arg = def_copy[7]
 
-        utils.log_info(f"Adding/Processing: {dst_bone_name}")
+        utils.log_info("Adding/Processing: %s", dst_bone_name)
 
         # reparent an existing deformation bone
         if src_bone_name == "-":
@@ -155,6 +158,7 @@ def add_def_bones(chr_cache, cc3_rig, rigify_rig):
     utils.log_recess()
 
 
+@utils.profiled("rigify.add_accessory_bones")
 def add_accessory_bones(chr_cache, cc3_rig, rigify_rig, bone_mappings):
 
     # find all the accessories in the armature
@@ -166,7 +170,7 @@ def add_accessory_bones(chr_cache, cc3_rig, rigify_rig, bone_mappings):
 
         if bone:
 
-            utils.log_info(f"Processing accessory root bone: {bone_name}")
+            utils.log_info("Processing accessory root bone: %s", bone_name)
 
             cc3_parent_name = None
             rigify_parent_name = None
@@ -186,7 +190,7 @@ def add_accessory_bones(chr_cache, cc3_rig, rigify_rig, bone_mappings):
             if not (rigify_parent_name and rigify_parent_name in rigify_rig.data.bones):
                 utils.log_error(f"Unable to find matching accessory bone tree parent: {cc3_parent_name} in rigify bones!")
 
-            utils.log_info(f"Copying accessory bone tree into rigify rig: {bone.name} parent: {rigify_parent_name}")
+            utils.log_info("Copying accessory bone tree into rigify rig: %s parent: %s", bone.name, rigify_parent_name)
             bones.copy_rl_edit_bone_subtree(cc3_rig, rigify_rig, bone.name, bone.name, rigify_parent_name, 23)
 
 
@@ -202,6 +206,7 @@ def rl_vertex_group(obj, group):
     return None
 
 
+@utils.profiled("rigify.rename_vertex_groups")
 def rename_vertex_groups(cc3_rig, rigify_rig, vertex_groups):
     """Rename the CC3 rig vertex weight groups to the Rigify deformation bone names,
        removes matching existing vertex groups created by parent with automatic weights.
@@ -214,7 +219,7 @@ def rename_vertex_groups(cc3_rig, rigify_rig, vertex_groups):
     obj : bpy.types.Object
     for obj in rigify_rig.children:
 
-        utils.log_info(f"Remapping groups for: {obj.name}")
+        utils.log_info("Remapping groups for: %s", obj.name)
 
         for vgrn in vertex_groups:
 
@@ -347,6 +352,7 @@ def set_rigify_params(meta_rig):
                     pass
 
 
+@utils.profiled("rigify.map_face_bones")
 def map_face_bones(cc3_rig, meta_rig, cc3_head_bone):
     """Map positions of special face bones.
     """
@@ -457,6 +463,7 @@ def report_uv_face_targets(obj, meta_rig):
                 utils.log_always(f"{bone.name} - uv: {head_uv} -> {tail_uv}")
 
 
+@utils.profiled("rigify.map_uv_targets")
 def map_uv_targets(chr_cache, cc3_rig, meta_rig):
     """Fetch spacial coordinates for bone positions from UV coordinates.
     """
@@ -616,7 +623,7 @@ def map_bone(cc3_rig, meta_rig, mapping):
     src_bone_head_name = mapping[1]
     src_bone_tail_name = mapping[2]
 
-    utils.log_info(f"Mapping: {dst_bone_name} from: {src_bone_head_name}/{src_bone_tail_name}")
+    utils.log_info("Mapping: %s from: %s/%s", dst_bone_name, src_bone_head_name, src_bone_tail_name)
 
     dst_bone : bpy.types.EditBone
     dst_bone = bones.get_edit_bone(meta_rig, dst_bone_name)
@@ -755,11 +762,11 @@ def fix_bend(meta_rig, bone_one_name, bone_two_name, dir : mathutils.Vector):
             disp : mathutils.Vector = mid - line_mid
             d = disp.length
             if dir.dot(disp) < 0 or d < 0.001:
-                utils.log_info(f"Bend between {bone_one_name} and {bone_two_name} is too shallow or negative, fixing.")
+                utils.log_info("Bend between %s and %s is too shallow or negative, fixing.", bone_one_name, bone_two_name)
                 new_mid_dir : mathutils.Vector = dir - u.dot(dir) * u
                 new_mid_dir.normalize()
                 new_mid = line_mid + new_mid_dir * 0.001
-                utils.log_info(f"New joint position: {new_mid}")
+                utils.log_info("New joint position: %s", new_mid)
                 one.tail = new_mid
                 two.head = new_mid
 
@@ -782,6 +789,7 @@ def hide_face_bones(meta_rig):
                 bone.layers[31] = True
 
 
+@utils.profiled("rigify.convert_to_basic_face_rig")
 def convert_to_basic_face_rig(rigify_rig):
     if edit_rig(rigify_rig):
         for b in rigify_mapping_data.NON_BASIC_FACE_BONES:
@@ -793,6 +801,7 @@ def convert_to_basic_face_rig(rigify_rig):
     select_rig(rigify_rig)
 
 
+@utils.profiled("rigify.add_shape_key_drivers")
 def add_shape_key_drivers(chr_cache, rig):
     for obj in rig.children:
         if obj.type == "MESH" and obj.parent == rig:
@@ -836,6 +845,7 @@ def add_shape_key_driver(rig, obj, shape_key_name, driver_def, var_def):
                 var.targets[0].transform_space = var_def[4]
 
 
+@utils.profiled("rigify.correct_meta_rig")
 def correct_meta_rig(meta_rig):
     """Add a slight displacement (if needed) to the knee and elbow to ensure the poles are the right way.
     """
@@ -853,6 +863,7 @@ def correct_meta_rig(meta_rig):
     utils.log_recess()
 
 
+@utils.profiled("rigify.modify_rigify_rig")
 def modify_rigify_rig(cc3_rig, rigify_rig, rigify_data):
     """Resize and reposition Rigify control bones to make them easier to find.
        Note: scale, location, rotation modifiers for custom control shapes is Blender 3.0.0+ only
@@ -875,7 +886,7 @@ def modify_rigify_rig(cc3_rig, rigify_rig, rigify_data):
                 rotation = mod[3]
                 bone = bones.get_pose_bone(rigify_rig, bone_name)
                 if bone:
-                    utils.log_info(f"Altering: {bone.name}")
+                    utils.log_info("Altering: %s", bone.name)
                     bone.custom_shape_scale_xyz = scale
                     bone.custom_shape_translation = translation
                     bone.custom_shape_rotation_euler = rotation
@@ -890,12 +901,12 @@ def modify_rigify_rig(cc3_rig, rigify_rig, rigify_data):
             metarig_regex_list = chain_def[2]
             # if the chain parent is missing from the cc3 rig, hide the control rig in rigify
             if not bones.get_rl_bone(cc3_rig, rl_bone_name):
-                utils.log_info(f"Chain Parent missing from CC3 Rig: {rl_bone_name}")
+                utils.log_info("Chain Parent missing from CC3 Rig: %s", rl_bone_name)
                 utils.log_indent()
                 for regex in rigify_regex_list:
                     for bone in rigify_rig.data.bones:
                         if re.match(regex, bone.name):
-                            utils.log_info(f"Hiding control rig bone: {bone.name}")
+                            utils.log_info("Hiding control rig bone: %s", bone.name)
                             bones.set_pose_bone_layer(rigify_rig, bone.name, 22)
                             bone_list.append(bone.name)
                 utils.log_recess()
@@ -906,6 +917,7 @@ def modify_rigify_rig(cc3_rig, rigify_rig, rigify_data):
 
 
 
+@utils.profiled("rigify.reparent_to_rigify")
 def reparent_to_rigify(self, chr_cache, cc3_rig, rigify_rig):
     """Unparent (with transform) from the original CC3 rig and reparent to the new rigify rig (with automatic weights for the body),
        setting the armature modifiers to the new rig.
@@ -959,6 +971,7 @@ def reparent_to_rigify(self, chr_cache, cc3_rig, rigify_rig):
     return result
 
 
+@utils.profiled("rigify.clean_up")
 def clean_up(chr_cache, cc3_rig, rigify_rig, meta_rig):
     """Rename the rigs, hide the original CC3 Armature and remove the meta rig.
        Set the new rig into pose mode.
@@ -1034,16 +1047,8 @@ def test_face_vgroups(rig, obj):
         if is_face_def_bone(bone):
             vertex_group : bpy.types.VertexGroup = meshutils.get_vertex_group(obj, bone.name)
             if vertex_group:
-                first_vertex : bpy.types.MeshVertex = obj.data.vertices[0]
-                last_vertex : bpy.types.MeshVertex = obj.data.vertices[-1]
-                first_weight = -1
-                last_weight = -1
-                for vge in first_vertex.groups:
-                    if vge.group == vertex_group.index:
-                        first_weight = vge.weight
-                for vge in last_vertex.groups:
-                    if vge.group == vertex_group.index:
-                        last_weight = vge.weight
+                first_weight = meshutils.get_vertex_group_weight(vertex_group, 0)
+                last_weight = meshutils.get_vertex_group_weight(vertex_group, len(obj.data.vertices) - 1)
                 # if the test weights still exist in any vertex group in the mesh, the auto weights failed
                 if utils.float_equals(first_weight, PREP_VGROUP_VALUE_A) and utils.float_equals(last_weight, PREP_VGROUP_VALUE_B):
                     return False
@@ -1331,7 +1336,7 @@ def generate_retargeting_rig(chr_cache, source_rig, rigify_rig, retarget_data):
                     continue
 
                 org_parent_bone_name = retarget_def[1]
-                utils.log_info(f"Generating retarget ORG bone: {org_bone_name}")
+                utils.log_info("Generating retarget ORG bone: %s", org_bone_name)
                 flags = retarget_def[4]
                 head_pos = rigify_rig.matrix_world @ mathutils.Vector((0,0,0))
                 tail_pos = rigify_rig.matrix_world @ mathutils.Vector((0,0,0.01))
@@ -1377,7 +1382,7 @@ def generate_retargeting_rig(chr_cache, source_rig, rigify_rig, retarget_data):
                 # parent retarget correction, add corrective parent bone and insert into parent chain
                 if "P" in flags or "T" in flags:
                     pivot_bone_name = org_bone_name + "_pivot"
-                    utils.log_info(f"Adding parent correction pivot: {pivot_bone_name} -> {org_bone_name}")
+                    utils.log_info("Adding parent correction pivot: %s -> %s", pivot_bone_name, org_bone_name)
                     ORG_BONES[pivot_bone_name] = [org_parent_bone_name,
                             head_pos, tail_pos, parent_pos,
                             use_connect,
@@ -1564,14 +1569,14 @@ def generate_retargeting_rig(chr_cache, source_rig, rigify_rig, retarget_data):
             # add the org bones:
             for org_bone_name in ORG_BONES:
                 bone_def = ORG_BONES[org_bone_name]
-                utils.log_info(f"Building: {org_bone_name}")
+                utils.log_info("Building: %s", org_bone_name)
                 b = retarget_rig.data.edit_bones.new(org_bone_name)
                 b.head = bone_def[1]
                 b.tail = bone_def[2]
 
                 # very important to align the roll of the source and ORG bones.
                 if len(bone_def) >= 11:
-                    utils.log_info(f"Aligning bone roll: {org_bone_name}")
+                    utils.log_info("Aligning bone roll: %s", org_bone_name)
                     b.align_roll(bone_def[10])
                 else:
                     utils.log_warn(f"Bone roll axis not stored for {org_bone_name}")
@@ -1589,7 +1594,7 @@ def generate_retargeting_rig(chr_cache, source_rig, rigify_rig, retarget_data):
 
             # add the rigify control rig bones we want to retarget to:
             for rigify_bone_name in RIGIFY_BONES:
-                utils.log_info(f"Adding Rigify target control bone {rigify_bone_name}")
+                utils.log_info("Adding Rigify target control bone %s", rigify_bone_name)
                 bone_def = RIGIFY_BONES[rigify_bone_name]
                 b = retarget_rig.data.edit_bones.new(rigify_bone_name)
                 b.parent = bones.get_edit_bone(retarget_rig, bone_def[0])
@@ -2006,25 +2011,25 @@ def get_source_shape_key_actions(source_rig, source_action):
     if animation_name:
 
         # match actions by name (if imported using this add-on)
-        utils.log_info(f"looking for shape-key actions with animation name: {source_rig.name}|K|<obj>|{animation_name}")
+        utils.log_info("looking for shape-key actions with animation name: %s|K|<obj>|%s", source_rig.name, animation_name)
         for action in bpy.data.actions:
             names = action.name.split("|")
             if len(names) >= 4:
                 if names[0] == source_rig.name and names[1] == "K":
                     if utils.partial_match(names[3], animation_name):
                         if names[2] not in actions:
-                            utils.log_info(f"Found shape-key action: {action.name} for object {names[2]}")
+                            utils.log_info("Found shape-key action: %s for object %s", action.name, names[2])
                             actions[names[2]] = action
     else:
 
         # try and fetch shape-key actions from source armature child objects
-        utils.log_info(f"looking for shape-key actions in armature child objects: {source_rig.name}")
+        utils.log_info("looking for shape-key actions in armature child objects: %s", source_rig.name)
         for obj in source_rig.children:
             obj_name = utils.get_action_shape_key_object_name(obj.name)
             if obj.type == "MESH":
                 action = utils.safe_get_action(obj.data.shape_keys)
                 if action:
-                    utils.log_info(f"Found shape-key action: {action.name} for object {obj_name}")
+                    utils.log_info("Found shape-key action: %s for object %s", action.name, obj_name)
                     actions[obj_name] = action
 
     return actions
@@ -2049,7 +2054,7 @@ def remap_shape_key_actions(chr_cache, rigify_rig, shape_key_actions):
     for obj_name in shape_key_actions:
         if obj_name == "CC_Base_Body" or obj_name == "CC_Game_Body" or obj_name == "Body":
             body_action = shape_key_actions[obj_name]
-            utils.log_info(f"Body Action: {body_action.name}")
+            utils.log_info("Body Action: %s", body_action.name)
     if body_action:
         for child in rigify_rig.children:
             if child.type == "MESH":
@@ -2058,10 +2063,10 @@ def remap_shape_key_actions(chr_cache, rigify_rig, shape_key_actions):
                 if child_name not in shape_key_actions and is_face_object(obj_cache, child):
                     action = match_obj_shape_key_action_name(child_name, shape_key_actions)
                     if action:
-                        utils.log_info(f"Remapping Action {action.name} for object: {child_name}")
+                        utils.log_info("Remapping Action %s for object: %s", action.name, child_name)
                         shape_key_actions[child_name] = action
                     else:
-                        utils.log_info(f"Adding Body Action to object: {child_name}")
+                        utils.log_info("Adding Body Action to object: %s", child_name)
                         shape_key_actions[child_name] = body_action
     return shape_key_actions
 
@@ -2370,7 +2375,7 @@ def prep_rigify_export(chr_cache, bake_animation, baked_actions, include_t_pose
                 bpy.ops.anim.keyframe_insert_menu(type='BUILTIN_KSI_LocRot')
 
                 # push T-Pose to NLA first
-                utils.log_info(f"Adding {t_pose_action.name} to NLA strips")
+                utils.log_info("Adding %s to NLA strips", t_pose_action.name)
                 track = export_rig.animation_data.nla_tracks[0]
                 track.strips.new(t_pose_action.name, int(t_pose_action.frame_range[0]), t_pose_action)
 
@@ -2386,7 +2391,7 @@ def prep_rigify_export(chr_cache, bake_animation, baked_actions, include_t_pose
 
             # push baked action to NLA strip
             if bake_animation and action:
-                utils.log_info(f"Adding {action.name} to NLA strips")
+                utils.log_info("Adding %s to NLA strips", action.name)
                 track = export_rig.animation_data.nla_tracks.new()
                 strip = track.strips.new(action.name, int(action.frame_range[0]), action)
 
@@ -2472,7 +2477,7 @@ def bake_rig_animation(chr_cache, rig, action, shape_key_objects, clear_constrai
             action_name = action.name
         name = action_name.split("|")[-1]
         new_name = f"{rig.name}|A|{name}"
-        utils.log_info(f"Baking action: {name} to {new_name}")
+        utils.log_info("Baking action: %s to %s", name, new_name)
         # armature action
         baked_action = bpy.data.actions.new(new_name)
         baked_action.use_fake_user = True
@@ -2727,6 +2732,7 @@ class CC3Rigifier(bpy.types.Operator):
     auto_weight_failed = False
     auto_weight_report = ""
 
+    @utils.profiled("rigify.add_meta_rig")
     def add_meta_rig(self, chr_cache):
 
         utils.log_info("Generating Meta-Rig:")
@@ -2755,6 +2761,10 @@ class CC3Rigifier(bpy.types.Operator):
         utils.log_recess()
 
     def execute(self, context):
+        with utils.profile_phase("rigifier"):
+            return self.run_rigifier(context)
+
+    def run_rigifier(self, context):
         props: properties.CC3ImportProps = bpy.context.scene.CC3ImportProps
         chr_cache = props.get_context_character_cache(context)
 
@@ -2795,7 +2805,8 @@ class CC3Rigifier(bpy.types.Operator):
                         utils.log_info("Generating Rigify Control Rig:")
                         utils.log_info("------------------------------")
 
-                        bpy.ops.pose.rigify_generate()
+                        with utils.profile_phase("rigify.rigify_generate"):
+                            bpy.ops.pose.rigify_generate()
                         self.rigify_rig = bpy.context.active_object
 
                         utils.log_info("")
@@ -2868,7 +2879,8 @@ class CC3Rigifier(bpy.types.Operator):
                         utils.log_info("Generating Rigify Control Rig:")
                         utils.log_info("------------------------------")
 
-                        bpy.ops.pose.rigify_generate()
+                        with utils.profile_phase("rigify.rigify_generate"):
+                            bpy.ops.pose.rigify_generate()
                         self.rigify_rig = bpy.context.active_object
 
                         utils.log_info("")
@@ -38,7 +38,7 @@ def set_multi_res_level(obj, view_level = -1, sculpt_level = -1, render_level =
         mod : bpy.types.MultiresModifier
         mod = modifiers.get_object_modifier(obj, modifiers.MOD_MULTIRES, modifiers.MOD_MULTIRES_NAME)
         if mod:
-            utils.log_info(f"Setting Multi-res modifier to levels: {view_level}/{sculpt_level}/{render_level}")
+            utils.log_info("Setting Multi-res modifier to levels: %s/%s/%s", view_level, sculpt_level, render_level)
             if view_level >= 0:
                 mod.levels = max(0, min(view_level, mod.total_levels))
             if sculpt_level >= 0:
@@ -93,13 +93,13 @@ def do_multires_bake(chr_cache, body, layer_target):
         bpy.context.scene.render.engine = 'CYCLES'
 
         # bake the normals
-        utils.log_info(f"Baking {layer_target} normals...")
+        utils.log_info("Baking %s normals...", layer_target)
         select_bake_images(temp_body, BAKE_TYPE_NORMALS, layer_target)
         bpy.context.scene.render.bake_type = BAKE_TYPE_NORMALS
         bpy.ops.object.bake_image()
 
         # bake the displacement mask
-        utils.log_info(f"Baking {layer_target} displacement...")
+        utils.log_info("Baking %s displacement...", layer_target)
         select_bake_images(temp_body, BAKE_TYPE_DISPLACEMENT, layer_target)
         bpy.context.scene.render.bake_type = BAKE_TYPE_DISPLACEMENT
         bpy.ops.object.bake_image()
@@ -119,7 +119,7 @@ def save_skin_gen_bake(chr_cache, body, layer_target):
         base_dir = chr_cache.import_dir
 
     bake_dir = os.path.join(base_dir, BAKE_FOLDER)
-    utils.log_info(f"Texture save path: {bake_dir}")
+    utils.log_info("Texture save path: %s", bake_dir)
     os.makedirs(bake_dir, exist_ok=True)
 
     character_name = chr_cache.character_name
@@ -149,7 +149,7 @@ def save_skin_gen_bake(chr_cache, body, layer_target):
 
                     if image_path:
                         imageutils.save_scene_image(image, image_path, file_format, color_depth)
-                        utils.log_info(f"Saved baked Image: {image_path}")
+                        utils.log_info("Saved baked Image: %s", image_path)
 
 
 def select_bake_images(body, bake_type, layer_target):
@@ -166,7 +166,7 @@ def select_bake_images(body, bake_type, layer_target):
             bake_node = nodeutils.find_node_by_type_and_keywords(nodes, "TEX_IMAGE", bake_node_name)
 
             if bake_node:
-                utils.log_info(f"Selecting image {bake_node.name} for bake.")
+                utils.log_info("Selecting image %s for bake.", bake_node.name)
                 bake_node.select = True
                 nodes.active = bake_node
             else:
@@ -199,7 +199,7 @@ def bake_skingen(chr_cache, layer_target):
         base_dir = chr_cache.import_dir
 
     skin_gen_dir = os.path.join(base_dir, SKINGEN_FOLDER)
-    utils.log_info(f"Texture save path: {skin_gen_dir}")
+    utils.log_info("Texture save path: %s", skin_gen_dir)
     os.makedirs(skin_gen_dir, exist_ok=True)
 
     body = chr_cache.get_body()
@@ -241,14 +241,14 @@ def setup_bake_nodes(chr_cache, detail_body, layer_target):
         base_dir = chr_cache.import_dir
 
     bake_dir = os.path.join(base_dir, BAKE_FOLDER)
-    utils.log_info(f"Texture save path: {bake_dir}")
+    utils.log_info("Texture save path: %s", bake_dir)
     os.makedirs(bake_dir, exist_ok=True)
 
     for mat in detail_body.data.materials:
         nodes = mat.node_tree.nodes
         links = mat.node_tree.links
 
-        utils.log_info(f"Setting up {layer_target} bake and layer nodes for {mat.name}")
+        utils.log_info("Setting up %s bake and layer nodes for %s", layer_target, mat.name)
 
         mat_cache = chr_cache.get_material_cache(mat)
         shader_name = params.get_shader_name(mat_cache)
@@ -324,7 +324,7 @@ def setup_bake_nodes(chr_cache, detail_body, layer_target):
 def finish_bake(chr_cache, detail_body, layer_target):
     if detail_body:
         for mat in detail_body.data.materials:
-            utils.log_info(f"Finalizing bake node setup for {mat.name}")
+            utils.log_info("Finalizing bake node setup for %s", mat.name)
             nodes = mat.node_tree.nodes
             links = mat.node_tree.links
             mat_cache = chr_cache.get_material_cache(mat)
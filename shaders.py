@@ -15,156 +15,184 @@
 # along with CC/iC Blender Tools.  If not, see <https://www.gnu.org/licenses/>.
 
 import bpy
+import copy
 import math
 import os
+from operator import attrgetter
 
 from . import imageutils, jsonutils, materials, nodeutils, params, utils, vars
 
 
+# compiled shader matrix expressions, compiled once on first use (or by compile_shader_matrix() on registration):
+#   { (func, prop_args): callable(parameters) }
+COMPILED_FUNCS = {}
+#   { code: code object }
+COMPILED_CODE = {}
+SHADER_MATRIX_COMPILED = False
+
+
+def get_matrix_function(func):
+    """Returns the prop matrix conversion function (func_...) by name."""
+    function = globals().get(func)
+    if func.startswith("func_") and callable(function):
+        return function
+    raise NameError(f"Unknown prop matrix function: {func}")
+
+
+def matrix_expression(func, args):
+    if func == "" or func == "=":
+        return "parameters." + args[0]
+    return func + "(" + ", ".join([ "parameters." + arg for arg in args ]) + ")"
+
+
+def compile_parameters_func(func, args):
+    """Returns a callable(parameters) that evaluates func(parameters.arg1, parameters.arg2...)
+       or just parameters.arg1 if there is no func.
+    """
+    key = (func, tuple(args))
+    compiled = COMPILED_FUNCS.get(key)
+    if compiled is None:
+        if len(args) == 0:
+            raise ValueError(f"No property arguments for: {func}")
+        if func == "" or func == "=":
+            compiled = attrgetter(args[0])
+        else:
+            function = get_matrix_function(func)
+            getter = attrgetter(*args)
+            if len(args) == 1:
+                compiled = lambda parameters: function(getter(parameters))
+            else:
+                compiled = lambda parameters: function(*getter(parameters))
+        COMPILED_FUNCS[key] = compiled
+    return compiled
+
+
+def compile_code(code):
+    """Returns the compiled code object of a shader matrix modifier or setting expression."""
+    compiled = COMPILED_CODE.get(code)
+    if compiled is None:
+        compiled = compile(code, "<shader matrix>", "exec")
+        COMPILED_CODE[code] = compiled
+    return compiled
+
+
+def compile_shader_matrix():
+    """Compile all the expressions in the shader matrix and report any invalid definitions."""
+    global SHADER_MATRIX_COMPILED
+    if SHADER_MATRIX_COMPILED:
+        return True
+    SHADER_MATRIX_COMPILED = True
+    errors = 0
+    for shader_def in params.SHADER_MATRIX:
+        for key in ["inputs", "bsdf", "textures", "mapping", "vars", "export", "modifiers", "settings"]:
+            if key in shader_def.keys():
+                for item_def in shader_def[key]:
+                    try:
+                        if key == "inputs" or key == "bsdf":
+                            compile_parameters_func(item_def[1], item_def[2:])
+                        elif key == "textures":
+                            if len(item_def) > 5:
+                                compile_parameters_func(item_def[4], item_def[5:])
+                        elif key == "mapping":
+                            if len(item_def) > 1:
+                                compile_parameters_func(item_def[2], item_def[3:])
+                        elif key == "vars":
+                            if item_def[2] not in ["", "=", "DEF"]:
+                                get_matrix_function(item_def[2])
+                        elif key == "export":
+                            compile_parameters_func(item_def[2], item_def[3:])
+                        elif key == "modifiers":
+                            compile_code(item_def[4])
+                        elif key == "settings":
+                            compile_code(item_def[2])
+                    except Exception as e:
+                        errors += 1
+                        utils.log_error(f"Invalid shader matrix definition: {shader_def['name']} / {key}: {str(item_def)}", e)
+    return errors == 0
+
+
 def get_prop_value(mat_cache, prop_name):
-    parameters = mat_cache.parameters
     try:
-        return eval("parameters." + prop_name, None, locals())
+        return getattr(mat_cache.parameters, prop_name)
     except:
         return None
 
 
 def exec_var_param(var_def, mat_cache, mat_json):
+    prop_name = var_def[0]
+    value = var_def[1]
     try:
         parameters = mat_cache.parameters
 
-        prop_name = var_def[0]
-        default_value = var_def[1]
         func = var_def[2]
         args = var_def[3:]
 
-        exec_expression = str(default_value)
-
         if mat_json:
 
             if func == "" or func == "=":
                 # expression is json var value
                 json_value = jsonutils.get_material_json_var(mat_json, args[0])
                 if json_value is not None:
-                    exec_expression = str(json_value)
+                    value = json_value
 
             elif func != "DEF":
-                # construct eval function code
-                func_expression = func + "("
-                first = True
-                missing_args = False
+                # evaluate function with the json var values
+                arg_values = []
                 for arg in args:
-                    if not first:
-                        func_expression += ", "
-                    first = False
                     arg_value = jsonutils.get_material_json_var(mat_json, arg)
                     if arg_value is None:
-                        missing_args = True
-                    func_expression += str(arg_value)
-                func_expression += ")"
-                if not missing_args:
-                    exec_expression = func_expression
-
-        exec_code = "parameters." + prop_name + " = " + exec_expression
-        exec(exec_code, None, locals())
-        utils.log_info("Applying: " + exec_code)
+                        break
+                    # conversion functions can modify their arguments, so don't pass the json data directly
+                    arg_values.append(copy.deepcopy(arg_value))
+                else:
+                    value = get_matrix_function(func)(*arg_values)
+
+        setattr(parameters, prop_name, value)
+        utils.log_info("Applying: parameters.%s = %s", prop_name, value)
     except:
-        utils.log_error("exec_var_param(): error in expression: " + exec_code)
+        utils.log_error("exec_var_param(): error in expression: parameters." + prop_name + " = " + str(value))
         utils.log_error(str(var_def))
 
 
 def eval_input_param(input_def, mat_cache):
     try:
-        parameters = mat_cache.parameters
-
-        input_socket = input_def[0]
-        func = input_def[1]
-        args = input_def[2:]
-
-        if func == "" or func == "=":
-            # expression is mat_cache parameter
-            exec_expression = "parameters." + args[0]
-
-        else:
-            # construct eval function code
-            exec_expression = func + "("
-            first = True
-            for arg in args:
-                if not first:
-                    exec_expression += ", "
-                first = False
-                exec_expression += "parameters." + arg
-            exec_expression += ")"
-
-        return eval(exec_expression, None, locals())
+        return compile_parameters_func(input_def[1], input_def[2:])(mat_cache.parameters)
     except:
-        utils.log_error("eval_input_param(): error in expression: " + exec_expression)
+        utils.log_error("eval_input_param(): error in expression: " + matrix_expression(input_def[1], input_def[2:]))
         return None
 
 
 def eval_tiling_param(texture_def, mat_cache, start_index = 4):
+    func = texture_def[start_index]
+    args = texture_def[start_index + 1:]
     try:
-        parameters = mat_cache.parameters
-
-        func = texture_def[start_index]
-        args = texture_def[start_index + 1:]
-
-        if func == "" or func == "=":
-            # expression is mat_cache parameter
-            exec_expression = "parameters." + args[0]
-
-        else:
-            # construct eval function code
-            exec_expression = func + "("
-            first = True
-            for arg in args:
-                if not first:
-                    exec_expression += ", "
-                first = False
-                exec_expression += "parameters." + arg
-            exec_expression += ")"
-
-        return eval(exec_expression, None, locals())
+        return compile_parameters_func(func, args)(mat_cache.parameters)
     except:
-        utils.log_error("eval_tiling_param(): error in expression: " + exec_expression)
+        utils.log_error("eval_tiling_param(): error in expression: " + matrix_expression(func, args))
         return None
 
 
 def eval_parameters_func(parameters, func, args, default = None):
     try:
-        # construct eval function code
-        exec_expression = func + "("
-        first = True
-        for arg in args:
-            if not first:
-                exec_expression += ", "
-            first = False
-            exec_expression += "parameters." + arg
-        exec_expression += ")"
-
-        return eval(exec_expression, None, locals())
+        return compile_parameters_func(func, args)(parameters)
     except:
-        utils.log_error("eval_parameters_func(): error in expression: " + exec_expression)
+        utils.log_error("eval_parameters_func(): error in expression: " + matrix_expression(func, args))
         return default
 
 
 def eval_prop(prop_name, mat_cache):
     try:
-        parameters = mat_cache.parameters
-        exec_expression = "parameters." + prop_name
-        return eval(exec_expression, None, locals())
+        return getattr(mat_cache.parameters, prop_name)
     except:
-        utils.log_error("eval_prop(): error in expression: " + exec_expression)
+        utils.log_error("eval_prop(): error in expression: parameters." + prop_name)
         return None
 
 
 def exec_prop(prop_name, mat_cache, value):
     try:
-        parameters = mat_cache.parameters
-        exec_expression = "parameters." + prop_name + " = " + str(value)
-        exec(exec_expression, None, locals())
+        setattr(mat_cache.parameters, prop_name, value)
     except:
-        utils.log_error("exec_prop(): error in expression: " + exec_expression)
+        utils.log_error("exec_prop(): error in expression: parameters." + prop_name + " = " + str(value))
         return None
 
 
@@ -556,7 +584,7 @@ def apply_texture_matrix(nodes, links, shader_node, mat, mat_cache, shader_name,
                     tex_path = None
                     suffix = None
                     image_id = "(" + tex_type + ")"
-                    image_node = nodeutils.get_node_by_id(nodes, image_id)
+                    image_node = nodeutils.get_image_node(nodes, tex_type)
 
                     # for user added materials, don't mess with the users textures...
                     if image_node and image_node.image and mat_cache.user_added:
@@ -568,7 +596,7 @@ def apply_texture_matrix(nodes, links, shader_node, mat, mat_cache, shader_name,
 
                     if image_node and image_node.image and image:
                         if image != image_node.image:
-                            utils.log_info("Replacing image node image with: " + image.name)
+                            utils.log_info("Replacing image node image with: %s", image.name)
                             image_node.image = image
 
                     try:
@@ -638,7 +666,7 @@ def apply_texture_matrix(nodes, links, shader_node, mat, mat_cache, shader_name,
     if not mat_cache.user_added:
         for n in nodes:
             if n.type == "TEX_IMAGE" and n not in image_nodes:
-                utils.log_info("Removing unused image node: " + n.name)
+                utils.log_info("Removing unused image node: %s", n.name)
                 nodes.remove(n)
 
     # finally disconnect bump map if normal map is also present (this is only supposed to be one, but it is possible to bug CC3 and get both):
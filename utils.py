@@ -15,16 +15,150 @@
 # along with CC/iC Blender Tools.  If not, see <https://www.gnu.org/licenses/>.
 
 import os
+import sys
+import json
 import time
+import functools
+import threading
+import importlib.util
+import logging
+import logging.handlers
 from hashlib import md5
 import bpy
 
 from . import vars
 
+def lazy_import(name):
+    """Returns the add-on module, which is only executed on the first access to one of its attributes.
+       For large modules that registration doesn't need (e.g. data tables)."""
+    full_name = __name__.rpartition(".")[0] + "." + name
+    module = sys.modules.get(full_name)
+    if module is None:
+        spec = importlib.util.find_spec(full_name)
+        loader = importlib.util.LazyLoader(spec.loader)
+        spec.loader = loader
+        module = importlib.util.module_from_spec(spec)
+        sys.modules[full_name] = module
+        loader.exec_module(module)
+    return module
+
+
 timer = 0
+timer_stack = []
 
 LOG_INDENT = 0
 
+# cached from the add-on preferences log level (updated by the preference's update callback)
+LOG_LEVEL = None
+LOG_LEVELS = { "ERRORS": 0, "WARN": 1, "ALL": 2, "DETAILS": 3 }
+LOG_SINKS = []
+
+
+class LogConsoleSink():
+    """Prints log messages to the console."""
+
+    def write(self, level, msg, indent, e = None):
+        print(format_log_line(level, msg, indent, e))
+
+    def close(self):
+        return
+
+
+class LogFileSink():
+    """Writes log messages to a rotating log file."""
+
+    def __init__(self, path, max_bytes = 10000000, backup_count = 5):
+        self.logger = logging.getLogger("cc3_tools." + os.path.normcase(os.path.abspath(path)))
+        self.logger.propagate = False
+        self.logger.setLevel(logging.INFO)
+        self.handler = logging.handlers.RotatingFileHandler(path, maxBytes = max_bytes, backupCount = backup_count, encoding = "utf-8")
+        self.handler.setFormatter(logging.Formatter("%(message)s"))
+        self.logger.addHandler(self.handler)
+
+    def format(self, level, msg, indent, e = None):
+        return format_log_line(level, msg, indent, e)
+
+    def write(self, level, msg, indent, e = None):
+        self.logger.info(self.format(level, msg, indent, e))
+
+    def close(self):
+        self.logger.removeHandler(self.handler)
+        self.handler.close()
+
+
+class LogJsonSink(LogFileSink):
+    """Writes log messages to a rotating log file as JSON lines."""
+
+    def format(self, level, msg, indent, e = None):
+        record = { "time": time.time(), "level": level, "indent": indent // 3, "message": msg }
+        if e is not None:
+            record["exception"] = getattr(e, 'message', repr(e))
+        return json.dumps(record)
+
+
+def add_log_sink(sink):
+    LOG_SINKS.append(sink)
+    return sink
+
+
+def remove_log_sink(sink):
+    if sink in LOG_SINKS:
+        LOG_SINKS.remove(sink)
+        sink.close()
+
+
+def reset_log_sinks():
+    for sink in LOG_SINKS:
+        sink.close()
+    LOG_SINKS.clear()
+    LOG_SINKS.append(LogConsoleSink())
+
+
+reset_log_sinks()
+
+
+def format_log_line(level, msg, indent, e = None):
+    if level == "WARN":
+        return (" " * indent) + "Warning: " + msg
+    elif level == "ERROR":
+        if indent > 1: indent -= 1
+        line = "*" + (" " * indent) + "Error: " + msg
+        if e is not None:
+            line += "\n    -> " + getattr(e, 'message', repr(e))
+        return line
+    elif level == "TIMER":
+        return msg
+    else:
+        return (" " * indent) + msg
+
+
+def set_log_level(log_level):
+    global LOG_LEVEL
+    LOG_LEVEL = LOG_LEVELS.get(log_level, 0)
+
+
+def get_log_level():
+    if LOG_LEVEL is None:
+        try:
+            prefs = bpy.context.preferences.addons[__name__.partition(".")[0]].preferences
+            set_log_level(prefs.log_level)
+        except:
+            return 0
+    return LOG_LEVEL
+
+
+def is_logging(log_level):
+    return get_log_level() >= LOG_LEVELS[log_level]
+
+
+def log_message(level, msg, args, e = None):
+    """Sends the message to all log sinks, formatting any lazy message arguments (msg % args)."""
+    if args:
+        msg = msg % args
+    for sink in LOG_SINKS:
+        sink.write(level, msg, LOG_INDENT, e)
+
+
 def log_indent():
     global LOG_INDENT
     LOG_INDENT += 3
@@ -39,59 +173,210 @@ def log_spacing():
     return " " * LOG_INDENT
 
 
-def log_detail(msg):
-    prefs = bpy.context.preferences.addons[__name__.partition(".")[0]].preferences
-    """Log an info message to console."""
-    if prefs.log_level == "DETAILS":
-        print((" " * LOG_INDENT) + msg)
+def log_detail(msg, *args):
+    """Log a detail message to console."""
+    if get_log_level() >= 3:
+        log_message("DETAIL", msg, args)
 
 
-def log_info(msg):
-    prefs = bpy.context.preferences.addons[__name__.partition(".")[0]].preferences
+def log_info(msg, *args):
     """Log an info message to console."""
-    if prefs.log_level == "ALL" or prefs.log_level == "DETAILS":
-        print((" " * LOG_INDENT) + msg)
+    if get_log_level() >= 2:
+        log_message("INFO", msg, args)
 
 
-def log_always(msg):
-    prefs = bpy.context.preferences.addons[__name__.partition(".")[0]].preferences
+def log_always(msg, *args):
     """Log an info message to console."""
-    print((" " * LOG_INDENT) + msg)
+    log_message("ALWAYS", msg, args)
 
 
-def log_warn(msg):
-    prefs = bpy.context.preferences.addons[__name__.partition(".")[0]].preferences
+def log_warn(msg, *args):
     """Log a warning message to console."""
-    if prefs.log_level == "ALL" or prefs.log_level == "DETAILS" or prefs.log_level == "WARN":
-        print((" " * LOG_INDENT) + "Warning: " + msg)
+    if get_log_level() >= 1:
+        log_message("WARN", msg, args)
 
 
 def log_error(msg, e = None):
     """Log an error message to console and raise an exception."""
-    indent = LOG_INDENT
-    if indent > 1: indent -= 1
-    print("*" + (" " * indent) + "Error: " + msg)
-    if e is not None:
-        print("    -> " + getattr(e, 'message', repr(e)))
+    log_message("ERROR", msg, None, e)
 
 
 def start_timer():
+    """Starts a (nested) timer. Returns the timer depth before it started, for end_timers()."""
     global timer
+    depth = len(timer_stack)
+    # keep the outer timers so nested timings don't overwrite them
+    if len(timer_stack) < 100:
+        timer_stack.append(timer)
     timer = time.perf_counter()
+    return depth
+
+
+def end_timers(depth):
+    """Discards any timers started since depth that were not ended by log_timer()."""
+    global timer
+    while len(timer_stack) > depth:
+        timer = timer_stack.pop()
 
 
 def log_timer(msg, unit = "s"):
-    prefs = bpy.context.preferences.addons[__name__.partition(".")[0]].preferences
     global timer
-    if prefs.log_level == "ALL":
-        duration = time.perf_counter() - timer
+    start = timer
+    if timer_stack:
+        timer = timer_stack.pop()
+    if get_log_level() == 2:
+        duration = time.perf_counter() - start
         if unit == "ms":
             duration *= 1000
         elif unit == "us":
             duration *= 1000000
         elif unit == "ns":
             duration *= 1000000000
-        print(msg + ": " + str(duration) + " " + unit)
+        log_message("TIMER", msg + ": " + str(duration) + " " + unit, None)
+
+
+# phase profiler, only active between start_profiling() and stop_profiling()
+PROFILER = None
+
+
+class Profiler():
+    """Records nested profile phases as Chrome trace events (chrome://tracing, Perfetto)
+       with the wall time, the number of bpy.ops calls and the number of images,
+       materials and objects created in each phase."""
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.ops_count = 0
+        self.stack = []
+        self.events = []
+        self.ops_class = None
+        self.ops_call = None
+
+    def data_counts(self):
+        return len(bpy.data.images), len(bpy.data.materials), len(bpy.data.objects)
+
+    def begin(self, name, args):
+        self.stack.append((name, args, time.perf_counter(), self.ops_count, self.data_counts()))
+
+    def end(self):
+        if not self.stack:
+            return
+        name, args, start, ops_count, counts = self.stack.pop()
+        end = time.perf_counter()
+        images, materials, objects = self.data_counts()
+        event_args = { "ops": self.ops_count - ops_count,
+                       "images": images - counts[0],
+                       "materials": materials - counts[1],
+                       "objects": objects - counts[2] }
+        if args:
+            event_args.update(args)
+        self.events.append({ "name": name, "cat": "cc3", "ph": "X",
+                             "ts": (start - self.start) * 1000000,
+                             "dur": (end - start) * 1000000,
+                             "pid": os.getpid(), "tid": threading.get_ident(),
+                             "args": event_args })
+
+    def count_ops(self):
+        """Wraps the bpy.ops operator call to count operator invocations."""
+        # the operator wrapper class is BPyOpsSubModOp in older versions of Blender
+        self.ops_class = None
+        for class_name in ["_BPyOpsSubModOp", "BPyOpsSubModOp"]:
+            if hasattr(bpy.ops, class_name):
+                self.ops_class = getattr(bpy.ops, class_name)
+                break
+        if self.ops_class is None or not hasattr(self.ops_class, "__call__"):
+            self.ops_class = None
+            log_warn("Profiler: unable to count operator calls in this version of Blender.")
+            return
+        self.ops_call = self.ops_class.__call__
+        ops_call = self.ops_call
+        profiler = self
+
+        def counted_call(op, *args, **kwargs):
+            profiler.ops_count += 1
+            return ops_call(op, *args, **kwargs)
+
+        self.ops_class.__call__ = counted_call
+
+    def restore_ops(self):
+        if self.ops_class:
+            self.ops_class.__call__ = self.ops_call
+            self.ops_class = None
+
+    def summary(self):
+        """Returns the total and maximum time (ms) and the call count of each phase."""
+        phases = {}
+        for event in self.events:
+            phase = phases.setdefault(event["name"], { "calls": 0, "total_ms": 0.0, "max_ms": 0.0, "ops": 0 })
+            duration = event["dur"] / 1000
+            phase["calls"] += 1
+            phase["total_ms"] += duration
+            phase["max_ms"] = max(phase["max_ms"], duration)
+            phase["ops"] += event["args"]["ops"]
+        return phases
+
+    def write(self, path):
+        with open(path, "w") as write_file:
+            json.dump({ "traceEvents": self.events, "displayTimeUnit": "ms" }, write_file)
+
+
+class ProfilePhase():
+    """Context manager for a (nestable) profile phase: with utils.profile_phase("name"): ..."""
+
+    def __init__(self, name, args):
+        self.name = name
+        self.args = args
+
+    def __enter__(self):
+        if PROFILER:
+            PROFILER.begin(self.name, self.args)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if PROFILER:
+            PROFILER.end()
+        return False
+
+
+def profile_phase(name, **args):
+    return ProfilePhase(name, args)
+
+
+def profiled(name):
+    """Decorator to profile every call to the function as a phase."""
+    def decorator(func):
+        @functools.wraps(func)
+        def profiled_func(*args, **kwargs):
+            if PROFILER:
+                with ProfilePhase(name, None):
+                    return func(*args, **kwargs)
+            return func(*args, **kwargs)
+        return profiled_func
+    return decorator
+
+
+def start_profiling():
+    global PROFILER
+    if PROFILER:
+        PROFILER.restore_ops()
+    PROFILER = Profiler()
+    PROFILER.count_ops()
+
+
+def stop_profiling(path = None):
+    """Stops profiling, writing the Chrome trace json to path (if given).
+       Returns the profiler."""
+    global PROFILER
+    profiler = PROFILER
+    PROFILER = None
+    if profiler:
+        profiler.restore_ops()
+        while profiler.stack:
+            profiler.end()
+        if path:
+            profiler.write(path)
+            log_always(f"Profile written to: {path}")
+    return profiler
 
 
 def message_box(message = "", title = "Info", icon = 'INFO'):
@@ -256,52 +541,53 @@ def try_remove(item, force = False):
 
         if type(item) == bpy.types.Armature:
             if (item.use_fake_user and item.users == 1) or item.users == 0 or force:
-                log_info("Removing Armature: " + item.name)
+                log_info("Removing Armature: %s", item.name)
                 bpy.data.armatures.remove(item)
             else:
-                log_info("Armature: " + item.name + " still in use!")
+                log_info("Armature: %s still in use!", item.name)
 
         elif type(item) == bpy.types.Mesh:
             if (item.use_fake_user and item.users == 1) or item.users == 0 or force:
-                log_info("Removing Mesh: " + item.name)
+                log_info("Removing Mesh: %s", item.name)
                 bpy.data.meshes.remove(item)
             else:
-                log_info("Mesh: " + item.name + " still in use!")
+                log_info("Mesh: %s still in use!", item.name)
 
         elif type(item) == bpy.types.Object:
             if (item.use_fake_user and item.users == 1) or item.users == 0 or force:
-                log_info("Removing Object: " + item.name)
+                log_info("Removing Object: %s", item.name)
                 bpy.data.objects.remove(item)
             else:
-                log_info("Object: " + item.name + " still in use!")
+                log_info("Object: %s still in use!", item.name)
 
         elif type(item) == bpy.types.Material:
             if (item.use_fake_user and item.users == 1) or item.users == 0 or force:
-                log_info("Removing Material: " + item.name)
+                log_info("Removing Material: %s", item.name)
                 bpy.data.materials.remove(item)
             else:
-                log_info("Material: " + item.name + " still in use!")
+                log_info("Material: %s still in use!", item.name)
 
         elif type(item) == bpy.types.Image:
             if (item.use_fake_user and item.users == 1) or item.users == 0 or force:
-                log_info("Removing Image: " + item.name)
+                log_info("Removing Image: %s", item.name)
+                unindex_image_path(item)
                 bpy.data.images.remove(item)
             else:
-                log_info("Image: " + item.name + " still in use!")
+                log_info("Image: %s still in use!", item.name)
 
         elif type(item) == bpy.types.Texture:
             if (item.use_fake_user and item.users == 1) or item.users == 0 or force:
-                log_info("Removing Texture: " + item.name)
+                log_info("Removing Texture: %s", item.name)
                 bpy.data.textures.remove(item)
             else:
-                log_info("Texture: " + item.name + " still in use!")
+                log_info("Texture: %s still in use!", item.name)
 
         elif type(item) == bpy.types.Action:
             if (item.use_fake_user and item.users == 1) or item.users == 0 or force:
-                log_info("Removing Action: " + item.name)
+                log_info("Removing Action: %s", item.name)
                 bpy.data.textures.remove(item)
             else:
-                log_info("Action: " + item.name + " still in use!")
+                log_info("Action: %s still in use!", item.name)
 
 
 def clean_collection(collection, include_fake = False):
@@ -310,6 +596,97 @@ def clean_collection(collection, include_fake = False):
             collection.remove(item)
 
 
+IMAGE_PATH_INDEX = None
+
+
+def image_path_key(path):
+    return os.path.normcase(os.path.realpath(path))
+
+
+def get_image_file_key(image):
+    if image.type == "IMAGE" and image.filepath != "":
+        return image_path_key(bpy.path.abspath(image.filepath))
+    return None
+
+
+def begin_image_path_index():
+    """Index all file based images by their normalized absolute file path,
+       for the duration of a build or export pass."""
+    global IMAGE_PATH_INDEX
+    IMAGE_PATH_INDEX = {}
+    for image in bpy.data.images:
+        index_image_path(image)
+
+
+def end_image_path_index():
+    global IMAGE_PATH_INDEX
+    IMAGE_PATH_INDEX = None
+
+
+class ImagePathIndex():
+    """Context manager for the image path index of a build or export pass: with utils.image_path_index(): ...
+       The index is always cleared on exit, so a failed pass never leaves a stale index behind."""
+
+    def __enter__(self):
+        begin_image_path_index()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        end_image_path_index()
+        return False
+
+
+def image_path_index():
+    return ImagePathIndex()
+
+
+def index_image_path(image, key = None):
+    if IMAGE_PATH_INDEX is not None and image:
+        if not key:
+            key = get_image_file_key(image)
+        if key:
+            images = IMAGE_PATH_INDEX.setdefault(key, [])
+            if image not in images:
+                images.append(image)
+
+
+def unindex_image_path(image, key = None):
+    if IMAGE_PATH_INDEX is not None and image:
+        if not key:
+            key = get_image_file_key(image)
+        if key and key in IMAGE_PATH_INDEX:
+            images = IMAGE_PATH_INDEX[key]
+            if image in images:
+                images.remove(image)
+
+
+def reindex_image_path(image, old_path):
+    """Call after changing the file path of an image."""
+    unindex_image_path(image, image_path_key(old_path))
+    index_image_path(image)
+
+
+def find_images_by_path(path):
+    """Returns all the file based images that use the file at path.
+       Uses the image path index if a build or export pass is in progress,
+       falling back to a full scan on a miss (for images created or re-pathed during the pass)."""
+    key = image_path_key(path)
+    if IMAGE_PATH_INDEX is not None:
+        images = IMAGE_PATH_INDEX.get(key, [])
+        # drop any images removed from the blend data without going through try_remove()
+        valid = [ image for image in images if still_exists(image) ]
+        if len(valid) != len(images):
+            IMAGE_PATH_INDEX[key] = valid
+        if valid:
+            return valid
+    images = []
+    for image in bpy.data.images:
+        if get_image_file_key(image) == key:
+            images.append(image)
+            index_image_path(image, key)
+    return images
+
+
 def clamp(x, min = 0.0, max = 1.0):
     if x < min:
         x = min
@@ -846,7 +1223,7 @@ def force_visible_in_scene(collection_name, *objects):
     bpy.context.scene.collection.children.link(tmp_collection)
     for obj in objects:
         if not obj.visible_get():
-            log_info(f"Object: {obj.name} is not visible or in a hidden collection. Linking to temporary root collection and making visible.")
+            log_info("Object: %s is not visible or in a hidden collection. Linking to temporary root collection and making visible.", obj.name)
             obj.hide_set(False)
             tmp_collection.objects.link(obj)
     return tmp_collection
@@ -857,7 +1234,7 @@ def restore_visible_in_scene(tmp_collection : bpy.types.Collection):
     for obj in tmp_collection.objects:
         objects.append(obj)
     for obj in objects:
-        log_info(f"Object: {obj.name} Unlinking from temporary root collection and hiding.")
+        log_info("Object: %s Unlinking from temporary root collection and hiding.", obj.name)
         obj.hide_set(True)
         tmp_collection.objects.unlink(obj)
     bpy.context.scene.collection.children.unlink(tmp_collection)
@@ -1101,19 +1478,19 @@ def copy_property_group(props_a, props_b):
                 # first try setting directly
                 code = f"props_a.{prop_name} = props_b.{prop_name}"
                 exec(code, None, locals())
-                log_info(f"{code} ({value})")
+                log_info("%s (%s)", code, value)
             except:
                 props_to = eval(f"props_a.{prop_name}")
                 props_from = eval(f"props_b.{prop_name}")
                 try:
                     # only collections (should) have clear() so copy the collection
                     props_to.clear()
-                    log_info(f"Attepting to copy as collection property: {prop_name}")
+                    log_info("Attepting to copy as collection property: %s", prop_name)
                     copy_collection_property(props_to, props_from)
                 except:
                     try:
                         # finally try copying as a property group
-                        log_info(f"Attepting to copy as property group: {prop_name}")
+                        log_info("Attepting to copy as property group: %s", prop_name)
                         copy_property_group(props_to, props_from)
                     except:
                         log_error(f"Unable to copy property {prop_name} / {value_type}")
@@ -1147,6 +1524,78 @@ def md5sum(filename):
     return hash.hexdigest()
 
 
+MD5_CACHE_FILE = "md5_cache.json"
+MD5_CACHE = None
+MD5_CACHE_DIRTY = False
+
+
+def get_md5_cache_path():
+    # user_resource's create argument was named autocreate before Blender 3.0
+    if is_blender_version("3.0.0"):
+        config_dir = bpy.utils.user_resource("CONFIG", path = "cc3_tools", create = True)
+    else:
+        config_dir = bpy.utils.user_resource("CONFIG", path = "cc3_tools", autocreate = True)
+    return os.path.join(config_dir, MD5_CACHE_FILE)
+
+
+def get_md5_cache():
+    """Returns the persistent file hash cache: { abs_path: [size, mtime_ns, md5] },
+       loading it from the user config folder on first use.
+       Entries for files that no longer exist are pruned when it is loaded."""
+    global MD5_CACHE, MD5_CACHE_DIRTY
+    if MD5_CACHE is None:
+        MD5_CACHE = {}
+        try:
+            cache_path = get_md5_cache_path()
+            if os.path.exists(cache_path):
+                with open(cache_path, "r") as f:
+                    MD5_CACHE = json.load(f)
+        except Exception as e:
+            log_warn(f"Unable to read file hash cache: {e}")
+            MD5_CACHE = {}
+        stale = [ path for path in MD5_CACHE.keys() if not os.path.exists(path) ]
+        if stale:
+            for path in stale:
+                del MD5_CACHE[path]
+            MD5_CACHE_DIRTY = True
+            log_detail("Pruned %d missing files from the file hash cache.", len(stale))
+    return MD5_CACHE
+
+
+def save_md5_cache():
+    global MD5_CACHE_DIRTY
+    if MD5_CACHE is not None and MD5_CACHE_DIRTY:
+        try:
+            with open(get_md5_cache_path(), "w") as f:
+                json.dump(MD5_CACHE, f)
+            MD5_CACHE_DIRTY = False
+        except Exception as e:
+            log_warn(f"Unable to write file hash cache: {e}")
+
+
+def md5sum_cached(filename):
+    """Returns the md5 hash of the file, only reading the file if it has
+       changed size or modification time since it was last hashed."""
+    global MD5_CACHE_DIRTY
+    cache = get_md5_cache()
+    path = os.path.normpath(os.path.abspath(filename))
+    stat = os.stat(path)
+    entry = cache.get(path)
+    if entry and entry[0] == stat.st_size and entry[1] == stat.st_mtime_ns:
+        return entry[2]
+    hash = md5sum(path)
+    cache[path] = [stat.st_size, stat.st_mtime_ns, hash]
+    MD5_CACHE_DIRTY = True
+    return hash
+
+
+def is_same_file_contents(file_a, file_b):
+    """Compares the contents of two files by size and cached md5 hash."""
+    if os.path.getsize(file_a) != os.path.getsize(file_b):
+        return False
+    return md5sum_cached(file_a) == md5sum_cached(file_b)
+
+
 INVALID_EXPORT_CHARACTERS = "`¬!\"£$%^&*()+-=[]{}:@~;'#<>?,./\| "
 DIGITS = "0123456789"
 